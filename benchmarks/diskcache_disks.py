@@ -0,0 +1,122 @@
+"""Compare size & speed of diskcache's default (pickle) `Disk` against the `MsgpackDisk` variants.
+
+Writes `--records` JSON-like records (nested dicts, lists, strings & numbers, similar to cached API
+responses) to a fresh cache with each `Disk`, then reads them all back. Reports the time per write &
+read, the average serialized record size, and the cache's size on disk (`Cache.volume()`).
+
+`Cache.volume()` counts whole SQLite pages, so it only moves once records shrink enough to pack
+more of them into each page.
+
+Requires: pip install diskcache msgpack
+
+Usage:
+    python benchmarks/diskcache_disks.py --records 20000 --items 20
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import pickle
+import random
+import string
+import tempfile
+import time
+
+from red_utils.ext.diskcache_utils.disks import (
+    LzmaMsgpackDisk,
+    MsgpackDisk,
+    ZlibMsgpackDisk,
+)
+
+import diskcache
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument(
+        "--items", type=int, default=20, help="Line items per record, sets record size"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+    return parser.parse_args()
+
+
+def make_record(rng: random.Random, i: int, items: int) -> dict:
+    def _word(n: int = 8) -> str:
+        return "".join(rng.choices(string.ascii_lowercase, k=n))
+
+    return {
+        "id": i,
+        "uuid": f"{rng.getrandbits(128):032x}",
+        "name": f"{_word()} {_word(12)}",
+        "active": rng.random() > 0.5,
+        "score": rng.random() * 100,
+        "created_at": f"2024-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}T12:00:00+00:00",
+        "tags": [_word(5) for _ in range(4)],
+        "items": [
+            {
+                "sku": _word(10),
+                "qty": rng.randint(1, 10),
+                "price": round(rng.random() * 500, 2),
+                "status": rng.choice(["pending", "shipped", "delivered"]),
+            }
+            for _ in range(items)
+        ],
+    }
+
+
+def payload_size(disk: type[diskcache.Disk], records: list[dict]) -> float:
+    """Average size (in bytes) of a serialized record, before SQLite's own overhead."""
+    with tempfile.TemporaryDirectory() as tmp:
+        instance: diskcache.Disk = disk(tmp)
+        encode = getattr(
+            instance,
+            "encode",
+            lambda record: pickle.dumps(record, protocol=instance.pickle_protocol),
+        )
+
+        return sum(len(encode(record)) for record in records) / len(records)
+
+
+def run(disk: type[diskcache.Disk], records: list[dict]) -> tuple[float, float, int]:
+    with tempfile.TemporaryDirectory() as tmp:
+        with diskcache.Cache(directory=str(Path(tmp) / "cache"), disk=disk) as cache:
+            start: float = time.perf_counter()
+            ## One transaction, so the comparison measures serialization instead of SQLite commits
+            with cache.transact():
+                for i, record in enumerate(records):
+                    cache.set(i, record)
+            write: float = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for i in range(len(records)):
+                cache.get(i)
+            read: float = time.perf_counter() - start
+
+            assert cache.get(0) == records[0], f"{disk.__name__} did not round-trip"
+
+            return write, read, cache.volume()
+
+
+def main() -> None:
+    args: argparse.Namespace = parse_args()
+    rng: random.Random = random.Random(args.seed)
+    records: list[dict] = [make_record(rng, i, args.items) for i in range(args.records)]
+
+    print(f"{args.records} records, {args.items} items per record")
+    print(
+        f"  {'disk':<18} {'write us':>10} {'read us':>10} {'record B':>10} {'size MB':>10}"
+    )
+
+    for disk in (diskcache.Disk, MsgpackDisk, ZlibMsgpackDisk, LzmaMsgpackDisk):
+        write, read, size = run(disk, records)
+        print(
+            f"  {disk.__name__:<18} {write / len(records) * 1e6:10.1f} {read / len(records) * 1e6:10.1f} "
+            f"{payload_size(disk, records):10.0f} {size / 2**20:10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
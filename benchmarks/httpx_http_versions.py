@@ -0,0 +1,164 @@
+"""Compare HTTP/1.1 and HTTP/2 throughput of `AsyncHTTPXController` against a local test server.
+
+Starts a `hypercorn` server on localhost, whose single endpoint waits `--latency` ms before
+responding, then sends `--requests` requests with `--concurrency` in flight, over a pool of
+`--connections` connections. HTTP/1.1 can only have one request in flight per connection;
+HTTP/2 multiplexes every in-flight request over the same few connections.
+
+HTTP/2 is spoken over cleartext with "prior knowledge" (h2c), so no TLS certificates are needed.
+
+Requires: pip install "httpx[http2]" hypercorn
+
+Usage:
+    python benchmarks/httpx_http_versions.py --requests 2000 --concurrency 200 --connections 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+
+from red_utils.ext.httpx_utils import AsyncHTTPXController
+
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument(
+        "--latency", type=float, default=5, help="Server response delay, in ms"
+    )
+    parser.add_argument("--rounds", type=int, default=3)
+
+    return parser.parse_args()
+
+
+def make_app(latency: float):
+    body: bytes = b'{"ok": true}'
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+
+        await asyncio.sleep(latency / 1000)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, latency: float) -> threading.Event:
+    """Run the test server in a background thread. Set the returned event to stop it."""
+    stop: threading.Event = threading.Event()
+    started: threading.Event = threading.Event()
+
+    config: Config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.loglevel = "WARNING"
+    config.accesslog = None
+    ## Allow every benchmark request to be in flight on one connection
+    config.h2_max_concurrent_streams = 1000
+    ## Don't recycle connections mid-benchmark
+    config.keep_alive_max_requests = 1_000_000
+
+    async def _shutdown_trigger() -> None:
+        started.set()
+        while not stop.is_set():
+            await asyncio.sleep(0.05)
+
+    threading.Thread(
+        target=lambda: asyncio.run(
+            serve(make_app(latency), config, shutdown_trigger=_shutdown_trigger)
+        ),
+        daemon=True,
+    ).start()
+    started.wait()
+    ## Give the server a moment to bind
+    time.sleep(0.5)
+
+    return stop
+
+
+async def run_round(
+    url: str, total: int, concurrency: int, connections: int, http2: bool
+) -> float:
+    async with AsyncHTTPXController(
+        http1=not http2,
+        http2=http2,
+        max_connections=connections,
+        max_keepalive_connections=connections,
+        keepalive_expiry=30,
+        max_concurrency=concurrency,
+        timeout=120,
+    ) as ctl:
+        ## Open the connections before timing
+        await ctl.send_request(ctl.new_request(url=url))
+
+        start: float = time.perf_counter()
+        responses = await ctl.gather_requests(
+            ctl.new_request(url=url) for _ in range(total)
+        )
+        elapsed: float = time.perf_counter() - start
+
+    assert all(res.status_code == 200 for res in responses)
+
+    return elapsed
+
+
+def main() -> None:
+    args: argparse.Namespace = parse_args()
+    port: int = free_port()
+    url: str = f"http://127.0.0.1:{port}/"
+    stop: threading.Event = start_server(port=port, latency=args.latency)
+
+    print(
+        f"{args.requests} requests, {args.concurrency} in flight, {args.connections} connections, "
+        f"{args.latency}ms server latency, best of {args.rounds}"
+    )
+
+    try:
+        for label, http2 in [("HTTP/1.1", False), ("HTTP/2", True)]:
+            elapsed: float = min(
+                asyncio.run(
+                    run_round(
+                        url=url,
+                        total=args.requests,
+                        concurrency=args.concurrency,
+                        connections=args.connections,
+                        http2=http2,
+                    )
+                )
+                for _ in range(args.rounds)
+            )
+            print(
+                f"  {label:<9} {elapsed:8.3f}s  {args.requests / elapsed:10.1f} req/s"
+            )
+    finally:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare per-object overhead of `msgpack_serialize()`/`msgpack_deserialize()` against the batch functions.
+
+Packs `--records` small dicts (like cache entries or queue messages) one at a time with the existing
+functions, which build a response wrapper & a new packer per object, then as one batch with
+`serialize_many()`/`deserialize_many()`, in this process & across `--workers` processes. Reports the
+time per object.
+
+Worker processes only pay off when encoding dominates the cost of sending objects to them, so expect the
+pooled rows to be slower for small objects, and on machines with few cores.
+
+Requires: pip install msgpack
+
+Usage:
+    python benchmarks/msgpack_batch.py --records 100000 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta, timezone
+import os
+import random
+import string
+import time
+import typing as t
+from uuid import UUID
+
+from red_utils.ext.msgpack_utils import (
+    deserialize_many,
+    msgpack_deserialize,
+    msgpack_serialize,
+    serialize_many,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+
+    return parser.parse_args()
+
+
+def make_record(rng: random.Random, i: int) -> dict:
+    return {
+        "id": i,
+        "uuid": UUID(int=rng.getrandbits(128)),
+        "name": "".join(rng.choices(string.ascii_lowercase, k=12)),
+        "score": rng.random() * 100,
+        "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)
+        + timedelta(seconds=rng.randint(0, 10**7)),
+        "tags": ["a", "b", "c"],
+    }
+
+
+def timed(fn: t.Callable[[], t.Any]) -> tuple[float, t.Any]:
+    start: float = time.perf_counter()
+    result: t.Any = fn()
+
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    args: argparse.Namespace = parse_args()
+    rng: random.Random = random.Random(args.seed)
+    records: list[dict] = [make_record(rng, i) for i in range(args.records)]
+
+    rows: list[tuple[str, float, float]] = []
+
+    pack, responses = timed(lambda: [msgpack_serialize(record) for record in records])
+    packed: list[bytes] = [response.detail for response in responses]
+    unpack, _ = timed(lambda: [msgpack_deserialize(data) for data in packed])
+    rows.append(("msgpack_serialize", pack, unpack))
+
+    pack, packed = timed(lambda: serialize_many(records))
+    unpack, unpacked = timed(lambda: deserialize_many(packed))
+    assert unpacked == records, "serialize_many() did not round-trip"
+    rows.append(("serialize_many", pack, unpack))
+
+    if args.workers > 1:
+        pack, pooled = timed(lambda: serialize_many(records, workers=args.workers))
+        unpack, _ = timed(lambda: deserialize_many(pooled, workers=args.workers))
+        assert pooled == packed, "Pooled serialize_many() did not match"
+        rows.append((f"serialize_many x{args.workers}", pack, unpack))
+
+    print(f"{args.records} records, {args.workers} workers")
+    print(f"  {'function':<22} {'pack us':>10} {'unpack us':>10}")
+    for name, pack, unpack in rows:
+        print(
+            f"  {name:<22} {pack / len(records) * 1e6:10.2f} {unpack / len(records) * 1e6:10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
-from . import controllers, validators
+from importlib.util import find_spec
+
+from . import controllers, decorators, validators
 from .__defaults import (
     CACHE_DIR,
     DEFAULT_CACHE_TIMEOUT,
@@ -11,18 +13,42 @@ from .__defaults import (
     default_timeout_dict,
 )
 from .__methods import (
+    bump_cache_version,
     check_cache,
     check_cache_key_exists,
     clear_cache,
     convert_to_seconds,
+    delete_many,
     delete_val,
+    evict_tags,
+    expire_older_than,
     get_cache_size,
+    get_cache_version,
+    get_many,
     get_val,
     manage_cache_tag_index,
     new_cache,
     set_expire,
+    set_many,
     set_val,
+    touch_tag,
 )
 from .classes import CacheInstance
-from .constants import TimeoutConf
-from .controllers import DiskCacheController, FanoutDiskCacheController
+from .constants import DEFAULT_BATCH_SIZE, DEFAULT_SLICE_SIZE, MISSING, TimeoutConf
+from .controllers import (
+    AsyncDiskCacheController,
+    CacheInstrumentation,
+    CacheStatsSnapshot,
+    CacheSweeper,
+    DiskCacheController,
+    FanoutDiskCacheController,
+    LatencyHistogram,
+    LRUCache,
+    SweepResult,
+    TierStats,
+)
+from .decorators import cached
+
+if find_spec("msgpack"):
+    from . import disks
+    from .disks import LzmaMsgpackDisk, MsgpackDisk, ZlibMsgpackDisk
@@ -10,11 +10,23 @@ import logging
 
 log = logging.getLogger("red_utils.ext.diskcache_utils")
 
+from itertools import islice
 from pathlib import Path
+import random
+import sqlite3
+import time
+import typing as t
 from typing import Optional, Type, Union
 
 from red_utils.core.constants import CACHE_DIR
 
+from .constants import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_SLICE_SIZE,
+    L1_VERSION_KEY,
+    MISSING,
+    VERSION_TABLE,
+)
 from .validators import (
     validate_cache,
     validate_expire,
@@ -27,7 +39,8 @@ from .validators import (
 )
 
 import diskcache
-from diskcache import Cache
+from diskcache import Cache, FanoutCache
+from diskcache.core import EVICTION_POLICY
 
 
 def convert_to_seconds(amount: int = None, unit: str = None) -> int:
@@ -124,6 +137,69 @@ def new_cache(
         raise exc
 
 
+def _version_shard(cache: t.Union[Cache, FanoutCache]) -> Cache:
+    """Return the `Cache` (or a `FanoutCache`'s first shard) storing the version counter."""
+    return cache._shards[0] if isinstance(cache, FanoutCache) else cache
+
+
+def get_cache_version(cache: t.Union[Cache, FanoutCache] = None) -> int:
+    """Return the cache's version counter, incremented by every write through `diskcache_utils`.
+
+    Description:
+        The counter is stored in its own table of the cache's database, so `clear()`, `cull()` & expiring
+            keys never reset it. Writes made with `diskcache` methods directly don't increment it; call
+            `bump_cache_version()` after them to invalidate the in-memory tier of `DiskCacheController`s.
+
+    Params:
+        cache (diskcache.Cache|diskcache.FanoutCache): A `diskcache.Cache` instance to work on
+
+    Returns:
+        (int): The version counter, or `0` if the cache was never written through `diskcache_utils`
+
+    """
+    try:
+        row: tuple | None = (
+            _version_shard(cache)
+            ._sql(f"SELECT value FROM {VERSION_TABLE} WHERE key = ?", (L1_VERSION_KEY,))
+            .fetchone()
+        )
+    except sqlite3.OperationalError as exc:
+        if "no such table" in str(exc):
+            return 0
+
+        raise exc
+
+    return row[0] if row else 0
+
+
+def bump_cache_version(cache: t.Union[Cache, FanoutCache] = None) -> int:
+    """Increment the cache's version counter after a write, so `DiskCacheController`s clear their in-memory tier.
+
+    Description:
+        The counter starts at a random value, so a cache that was deleted & recreated doesn't repeat
+            versions a controller has already seen.
+
+    Params:
+        cache (diskcache.Cache|diskcache.FanoutCache): A `diskcache.Cache` instance to work on
+
+    Returns:
+        (int): The new version
+
+    """
+    with _version_shard(cache)._transact(retry=True) as (sql, _):
+        sql(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        sql(
+            f"INSERT INTO {VERSION_TABLE} VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = value + 1",
+            (L1_VERSION_KEY, random.getrandbits(62)),
+        )
+
+        return sql(
+            f"SELECT value FROM {VERSION_TABLE} WHERE key = ?", (L1_VERSION_KEY,)
+        ).fetchone()[0]
+
+
 def clear_cache(cache: Cache = None) -> bool:
     """Clear all items from the cache.
 
@@ -140,8 +216,9 @@ def clear_cache(cache: Cache = None) -> bool:
     try:
         with cache as ref:
             ref.clear()
+        bump_cache_version(cache)
 
-            return True
+        return True
 
     except Exception as exc:
         msg = Exception(
@@ -246,6 +323,7 @@ def set_val(
     try:
         with cache as ref:
             ref.set(key=key, value=val, expire=expire, read=read, tag=tag, retry=retry)
+        bump_cache_version(cache)
 
     except Exception as exc:
         msg = Exception(
@@ -278,6 +356,7 @@ def set_expire(
     try:
         with cache as ref:
             ref.touch(key, expire=expire)
+        bump_cache_version(cache)
 
     except Exception as exc:
         msg = Exception(
@@ -351,8 +430,9 @@ def delete_val(
     try:
         with cache as ref:
             _delete = ref.pop(key=key, tag=tag)
+        bump_cache_version(cache)
 
-            return _delete
+        return _delete
 
     except Exception as exc:
         msg = Exception(
@@ -363,6 +443,527 @@ def delete_val(
         raise exc
 
 
+def _chunked(items: t.Iterable[t.Any], size: int) -> t.Iterator[list[t.Any]]:
+    """Split an iterable into lists of up to `size` items."""
+    assert isinstance(size, int) and size > 0, ValueError(
+        f"chunk_size must be a positive int. Got: ({size})"
+    )
+
+    _items: t.Iterator[t.Any] = iter(items)
+
+    while _chunk := list(islice(_items, size)):
+        yield _chunk
+
+
+def _shard_groups(
+    cache: t.Union[Cache, FanoutCache],
+    items: list[t.Any],
+    key: t.Callable[[t.Any], t.Any] = lambda item: item,
+) -> t.Iterator[tuple[Cache, list[t.Any]]]:
+    """Group a chunk of items by the `Cache` (or `FanoutCache` shard) their key is stored in.
+
+    Description:
+        `FanoutCache.transact()` locks every shard, so a batch on a `FanoutCache` instead opens one
+            transaction per shard, on only the items that shard stores.
+    """
+    if not isinstance(cache, FanoutCache):
+        yield cache, items
+
+        return
+
+    groups: dict[int, list[t.Any]] = {}
+    for item in items:
+        ## Same shard selection as FanoutCache's own get/set/delete
+        groups.setdefault(cache._hash(key(item)) % cache._count, []).append(item)
+
+    for index, group in groups.items():
+        yield cache._shards[index], group
+
+
+def _key_rows(
+    sql: t.Callable,
+    shard: Cache,
+    keys: list[t.Any],
+    columns: str,
+    where: str = "",
+    args: tuple = (),
+) -> list[tuple[t.Any, tuple]]:
+    """Select the unexpired rows of `keys` with one query, returning `(key, columns)` pairs.
+
+    Description:
+        Keys are matched on the `key` & `raw` columns, as encoded by the shard's `Disk`, like diskcache's own
+            get/delete.
+    """
+    db_keys: dict[tuple[t.Any, bool], t.Any] = {}
+    for key in keys:
+        db_key, raw = shard._disk.put(key)
+        db_keys[(bytes(db_key) if isinstance(db_key, memoryview) else db_key, raw)] = (
+            key
+        )
+
+    rows: list[tuple] = sql(
+        f"SELECT key, raw, {columns} FROM Cache WHERE key IN ({','.join('?' * len(db_keys))})"
+        f" AND (expire_time IS NULL OR expire_time > ?){where}",
+        (*(db_key for db_key, _ in db_keys), time.time(), *args),
+    ).fetchall()
+
+    return [
+        (db_keys[(row[0], row[1])], row[2:])
+        for row in rows
+        if (row[0], row[1]) in db_keys
+    ]
+
+
+def set_many(
+    cache: Cache = None,
+    items: t.Union[dict[t.Any, t.Any], t.Iterable[tuple[t.Any, t.Any]]] = None,
+    expire: int = None,
+    tag: str = None,
+    retry: bool = False,
+    chunk_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Set many key value pairs in the cache, `chunk_size` pairs per transaction.
+
+    Description:
+        Each `set_val()` call is its own SQLite transaction, which dominates the time taken to write
+            many small values. `set_many()` writes each chunk inside a single `cache.transact()` block,
+            releasing the cache's write lock between chunks so other writers are not blocked for the
+            whole batch. On a `FanoutCache`, each chunk opens one transaction per shard instead.
+
+    Params:
+        cache (diskcache.Cache): A `diskcache.Cache` object to work on
+        items (dict|Iterable[tuple]): A dict of key/value pairs, or an iterable of `(key, value)` tuples
+        expire (int): Time (in seconds) before each value expires
+        tag (str): Applies a tag to each cached value
+        retry (bool): If `True`, retry a chunk's transaction if the database times out
+        chunk_size (int): Number of key/value pairs written per transaction
+
+    Returns:
+        (int): The number of key/value pairs written
+
+    """
+    assert items is not None, ValueError("Missing items to set")
+    validate_expire(expire, none_ok=True)
+    validate_tag(tag=tag, none_ok=True)
+    validate_retry(retry=retry, none_ok=True)
+    validate_cache(cache=cache)
+
+    _items: t.Iterable[tuple[t.Any, t.Any]] = (
+        items.items() if isinstance(items, dict) else items
+    )
+    written: int = 0
+
+    for _chunk in _chunked(_items, chunk_size):
+        for key, val in _chunk:
+            validate_key(key)
+            validate_val(val)
+
+        try:
+            for shard, group in _shard_groups(cache, _chunk, key=lambda item: item[0]):
+                with shard.transact(retry=retry):
+                    for key, val in group:
+                        shard.set(
+                            key=key, value=val, expire=expire, tag=tag, retry=retry
+                        )
+
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception setting batch of {len(_chunk)} key/value pairs, after writing {written}. Details: {exc}"
+            )
+            log.error(msg)
+            ## Earlier chunks (& shards) were written
+            bump_cache_version(cache)
+
+            raise exc
+
+        written += len(_chunk)
+
+    bump_cache_version(cache)
+
+    return written
+
+
+def get_many(
+    cache: Cache = None,
+    keys: t.Iterable[Union[str, int, tuple, frozenset]] = None,
+    default: t.Any = MISSING,
+    retry: bool = False,
+    chunk_size: int = DEFAULT_BATCH_SIZE,
+) -> dict[t.Any, t.Any]:
+    """Get many keys from the cache, reading `chunk_size` keys per query.
+
+    Description:
+        Each chunk is read with one `SELECT` per shard, without taking the write lock. Caches whose eviction
+            policy updates a key's access time on reads (or with diskcache's statistics enabled) must write on
+            every read, so their keys are read with `cache.get()` one at a time instead.
+
+    Params:
+        cache (diskcache.Cache): A `diskcache.Cache` instance to work on
+        keys (Iterable): The keys to retrieve from the cache
+        default (Any): The value returned for keys not in the cache. Defaults to the `MISSING` sentinel, so
+            a miss can be told apart from a cached `None`.
+        retry (bool): If `True`, retry a read if the database times out
+        chunk_size (int): Number of keys read per query
+
+    Returns:
+        (dict): A dict of each key & its cached value, or `default` if the key was not found
+
+    """
+    assert keys is not None, ValueError("Missing keys to get")
+    validate_cache(cache)
+
+    _vals: dict[t.Any, t.Any] = {}
+
+    for _chunk in _chunked(keys, chunk_size):
+        for key in _chunk:
+            validate_key(key)
+
+        ## Keep the caller's key order when a FanoutCache reads keys shard by shard
+        _vals.update(dict.fromkeys(_chunk, default))
+
+        try:
+            for shard, group in _shard_groups(cache, _chunk):
+                if shard.statistics or EVICTION_POLICY[shard.eviction_policy]["get"]:
+                    for key in group:
+                        _vals[key] = shard.get(key=key, default=default, retry=retry)
+
+                    continue
+
+                for key, (mode, filename, value) in _key_rows(
+                    shard._sql_retry if retry else shard._sql,
+                    shard,
+                    group,
+                    "mode, filename, value",
+                ):
+                    try:
+                        _vals[key] = shard._disk.fetch(mode, filename, value, False)
+                    except IOError:
+                        ## Deleted before its file could be read
+                        continue
+
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception retrieving batch of {len(_chunk)} keys. Details: {exc}"
+            )
+            log.error(msg)
+
+            raise exc
+
+    return _vals
+
+
+def delete_many(
+    cache: Cache = None,
+    keys: t.Iterable[Union[str, int, tuple, frozenset]] = None,
+    tag: str = None,
+    retry: bool = False,
+    chunk_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Delete many keys from the cache, `chunk_size` keys per transaction.
+
+    If a tag is provided, only keys that also have that tag will be deleted.
+
+    Params:
+        cache (diskcache.Cache): A `diskcache.Cache` instance to work on
+        keys (Iterable): The keys to delete
+        tag (str): Tag to filter by
+        retry (bool): If `True`, retry a chunk's transaction if the database times out
+        chunk_size (int): Number of keys deleted per transaction
+
+    Returns:
+        (int): The number of keys deleted
+
+    """
+    assert keys is not None, ValueError("Missing keys to delete")
+    validate_cache(cache)
+    validate_tag(tag)
+
+    deleted: int = 0
+
+    for _chunk in _chunked(keys, chunk_size):
+        for key in _chunk:
+            validate_key(key)
+
+        try:
+            for shard, group in _shard_groups(cache, _chunk):
+                with shard._transact(retry) as (sql, cleanup):
+                    ## Filter on the tag column, instead of reading each value to compare its tag
+                    rows: list[tuple] = [
+                        row
+                        for _, row in _key_rows(
+                            sql,
+                            shard,
+                            group,
+                            "rowid, filename",
+                            where=" AND tag = ?" if tag is not None else "",
+                            args=(tag,) if tag is not None else (),
+                        )
+                    ]
+                    if rows:
+                        _delete_rows(sql, rows, cleanup)
+
+                deleted += len(rows)
+
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception deleting batch of {len(_chunk)} keys from cache at {cache.directory}/. Details: {exc}"
+            )
+            log.error(msg)
+            ## Earlier chunks (& shards) were deleted
+            bump_cache_version(cache)
+
+            raise exc
+
+    bump_cache_version(cache)
+
+    return deleted
+
+
+def _shards(cache: t.Union[Cache, FanoutCache]) -> list[Cache]:
+    """Return the `Cache` shards of a `FanoutCache`, or a list of just `cache`."""
+    return list(cache._shards) if isinstance(cache, FanoutCache) else [cache]
+
+
+def _delete_rows(sql: t.Callable, rows: list[tuple], cleanup: t.Callable) -> None:
+    """Delete selected `(rowid, ..., filename)` rows, & queue their value files for removal."""
+    sql(f"DELETE FROM Cache WHERE rowid IN ({','.join(str(row[0]) for row in rows)})")
+
+    for row in rows:
+        cleanup(row[-1])
+
+
+def _sliced(
+    shard: Cache,
+    select: str,
+    args: list[t.Any],
+    apply: t.Callable[[t.Callable, list[tuple], t.Callable], None] = _delete_rows,
+    cursor_index: int | None = None,
+    retry: bool = False,
+    slice_size: int = DEFAULT_SLICE_SIZE,
+    max_slices: int | None = None,
+    pause: float = 0.0,
+) -> tuple[int, bool]:
+    """Apply a change to the rows matched by `select`, `slice_size` rows per transaction.
+
+    Description:
+        For changes diskcache has no public method for. Like diskcache's own `evict()`/`expire()`, each
+            slice is a separate transaction, so other
+            readers & writers get the database between slices instead of waiting for the whole operation.
+
+    Params:
+        shard (diskcache.Cache): The cache (or `FanoutCache` shard) to work on
+        select (str): SQL selecting `rowid` first, ending in `LIMIT ?`. The slice size is appended to `args`.
+        args (list): Arguments of `select`
+        apply (Callable): Called as `apply(sql, rows, cleanup)` in each slice's transaction. Deletes the rows by
+            default (`select` must then end its columns with `filename`).
+        cursor_index (int|None): When `apply` leaves the rows in place, the index in `args` of a `rowid > ?`
+            argument, advanced to the last row of each slice.
+        retry (bool): If `True`, retry a slice's transaction if the database times out
+        slice_size (int): Number of rows per transaction
+        max_slices (int|None): Stop after this many slices. `None` continues until no rows match.
+        pause (float): Seconds to sleep between slices
+
+    Returns:
+        (tuple[int, bool]): The number of rows changed, and `True` if no rows were left to change
+
+    """
+    assert isinstance(slice_size, int) and slice_size > 0, ValueError(
+        f"slice_size must be a positive int. Got: ({slice_size})"
+    )
+
+    count: int = 0
+    slices: int = 0
+
+    while max_slices is None or slices < max_slices:
+        if slices and pause:
+            time.sleep(pause)
+
+        with shard._transact(retry) as (sql, cleanup):
+            rows: list[tuple] = sql(select, (*args, slice_size)).fetchall()
+            if not rows:
+                return count, True
+
+            apply(sql, rows, cleanup)
+
+        count += len(rows)
+        slices += 1
+
+        if cursor_index is not None:
+            args[cursor_index] = rows[-1][0]
+
+        if len(rows) < slice_size:
+            return count, True
+
+    return count, False
+
+
+def evict_tags(
+    cache: t.Union[Cache, FanoutCache] = None,
+    tags: t.Iterable[t.Union[str, int, float, bytes]] = None,
+    retry: bool = False,
+) -> int:
+    """Delete every key tagged with any of `tags`.
+
+    Description:
+        Calls diskcache's `evict()` for each tag, which deletes 100 keys per transaction & finds them with
+            the cache's tag index (see `manage_cache_tag_index()`). Without the index, each slice scans the
+            whole cache.
+
+    Params:
+        cache (diskcache.Cache|diskcache.FanoutCache): A `diskcache.Cache` instance to work on
+        tags (Iterable): The tags to evict
+        retry (bool): If `True`, retry a slice's transaction if the database times out
+
+    Returns:
+        (int): The number of keys deleted
+
+    """
+    assert tags is not None, ValueError("Missing tags to evict")
+    validate_cache(cache)
+
+    _tags: list = list(tags)
+    for tag in _tags:
+        validate_tag(tag, none_ok=False)
+
+    evicted: int = 0
+
+    try:
+        for tag in _tags:
+            evicted += cache.evict(tag, retry=retry)
+
+        if evicted:
+            bump_cache_version(cache)
+
+    except Exception as exc:
+        msg = Exception(
+            f"Unhandled exception evicting tags {_tags} from cache at {cache.directory}/. Details: {exc}"
+        )
+        log.error(msg)
+        ## Earlier slices were applied
+        bump_cache_version(cache)
+
+        raise exc
+
+    return evicted
+
+
+def expire_older_than(
+    cache: t.Union[Cache, FanoutCache] = None,
+    seconds: t.Union[int, float] = None,
+    retry: bool = False,
+    slice_size: int = DEFAULT_SLICE_SIZE,
+) -> int:
+    """Delete every key stored (or last overwritten) more than `seconds` ago, `slice_size` keys per transaction.
+
+    Description:
+        Uses the `store_time` index diskcache creates for its default `least-recently-stored` eviction policy.
+
+    Params:
+        cache (diskcache.Cache|diskcache.FanoutCache): A `diskcache.Cache` instance to work on
+        seconds (int|float): Age (in seconds) of the oldest key to keep
+        retry (bool): If `True`, retry a slice's transaction if the database times out
+        slice_size (int): Number of keys deleted per transaction
+
+    Returns:
+        (int): The number of keys deleted
+
+    """
+    assert seconds is not None and seconds >= 0, ValueError(
+        f"seconds must be a non-negative number. Got: ({seconds})"
+    )
+    validate_cache(cache)
+
+    cutoff: float = time.time() - seconds
+    expired: int = 0
+
+    try:
+        for shard in _shards(cache):
+            expired += _sliced(
+                shard,
+                "SELECT rowid, filename FROM Cache WHERE store_time < ? LIMIT ?",
+                [cutoff],
+                retry=retry,
+                slice_size=slice_size,
+            )[0]
+
+        if expired:
+            bump_cache_version(cache)
+
+    except Exception as exc:
+        msg = Exception(
+            f"Unhandled exception expiring keys older than {seconds}s from cache at {cache.directory}/. Details: {exc}"
+        )
+        log.error(msg)
+        ## Earlier slices were applied
+        bump_cache_version(cache)
+
+        raise exc
+
+    return expired
+
+
+def touch_tag(
+    cache: t.Union[Cache, FanoutCache] = None,
+    tag: t.Union[str, int, float, bytes] = None,
+    expire: t.Union[int, float] | None = None,
+    retry: bool = False,
+    slice_size: int = DEFAULT_SLICE_SIZE,
+) -> int:
+    """Set the expiration of every key tagged with `tag`, `slice_size` keys per transaction.
+
+    Params:
+        cache (diskcache.Cache|diskcache.FanoutCache): A `diskcache.Cache` instance to work on
+        tag (str): The tag of the keys to update
+        expire (int|float|None): Seconds from now until the keys expire. `None` removes their expiration.
+        retry (bool): If `True`, retry a slice's transaction if the database times out
+        slice_size (int): Number of keys updated per transaction
+
+    Returns:
+        (int): The number of keys updated
+
+    """
+    validate_cache(cache)
+    validate_tag(tag, none_ok=False)
+    validate_expire(expire, none_ok=True)
+
+    expire_time: float | None = time.time() + expire if expire is not None else None
+
+    def _touch(sql: t.Callable, rows: list[tuple], cleanup: t.Callable) -> None:
+        sql(
+            f"UPDATE Cache SET expire_time = ? WHERE rowid IN ({','.join(str(row[0]) for row in rows)})",
+            (expire_time,),
+        )
+
+    touched: int = 0
+
+    try:
+        for shard in _shards(cache):
+            touched += _sliced(
+                shard,
+                "SELECT rowid FROM Cache WHERE tag = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                [tag, 0],
+                apply=_touch,
+                cursor_index=1,
+                retry=retry,
+                slice_size=slice_size,
+            )[0]
+
+        if touched:
+            bump_cache_version(cache)
+
+    except Exception as exc:
+        msg = Exception(
+            f"Unhandled exception setting expiration of keys tagged [{tag}] in cache at {cache.directory}/. Details: {exc}"
+        )
+        log.error(msg)
+        ## Earlier slices were applied
+        bump_cache_version(cache)
+
+        raise exc
+
+    return touched
+
+
 def get_cache_size(cache: Cache = None) -> dict[str, int]:
     """Get the total size of a `diskcache.Cache` instance.
 
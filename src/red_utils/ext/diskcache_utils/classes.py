@@ -12,6 +12,7 @@ from red_utils.core.constants import CACHE_DIR
 from red_utils.core.dataclass_utils.mixins import DictMixin
 
 from .__methods import (
+    bump_cache_version,
     check_cache,
     check_cache_key_exists,
     clear_cache,
@@ -167,8 +168,9 @@ class CacheInstanceBase(DictMixin):
         try:
             with self.cache as ref:
                 ref.clear()
+            bump_cache_version(self.cache)
 
-                return True
+            return True
 
         except Exception as exc:
             msg = Exception(
@@ -243,6 +245,7 @@ class CacheInstance(CacheInstanceBase):
                 ref.set(
                     key=key, value=val, expire=expire, read=read, tag=tag, retry=retry
                 )
+            bump_cache_version(self.cache)
 
         except Exception as exc:
             msg = Exception(
@@ -318,6 +321,7 @@ class CacheInstance(CacheInstanceBase):
         try:
             with self.cache as ref:
                 ref.touch(key, expire=expire)
+            bump_cache_version(self.cache)
 
         except Exception as exc:
             msg = Exception(
@@ -344,8 +348,9 @@ class CacheInstance(CacheInstanceBase):
         try:
             with self.cache as ref:
                 _delete = ref.pop(key=key, tag=tag)
+            bump_cache_version(self.cache)
 
-                return _delete
+            return _delete
 
         except Exception as exc:
             msg = Exception(
@@ -49,3 +49,29 @@ class TimeoutConf(DictMixin):
 
 # DEFAULT_CACHE_TIMEOUT: TimeoutConf = TimeoutConf()
 # default_timeout_dict: dict[str, Union[str, int]] = TimeoutConf().as_dict()
+
+## Number of items written/read/deleted per transaction by the *_many() batch operations
+DEFAULT_BATCH_SIZE: int = 1000
+## Number of rows removed/updated per transaction by tag-group operations & the cache sweeper. Kept small, so
+#  each transaction holds the database's write lock briefly
+DEFAULT_SLICE_SIZE: int = 100
+
+
+class _Missing:
+    """Sentinel type for a key that was not found in the cache."""
+
+    def __repr__(self) -> str:
+        return "MISSING"
+
+    def __bool__(self) -> bool:
+        return False
+
+
+## Marks a cache miss in the dict returned by get_many(), to tell it apart from a cached `None`
+MISSING: _Missing = _Missing()
+
+## SQLite table (outside the `Cache` table, so clear/cull/expire never delete it) of the version counter a
+#  DiskCacheController's in-memory (L1) tier uses to detect writes by other processes
+VERSION_TABLE: str = "RedUtilsVersion"
+## Row of the version counter in VERSION_TABLE
+L1_VERSION_KEY: str = "l1_version"
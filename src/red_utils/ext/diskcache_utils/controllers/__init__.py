@@ -1,3 +1,7 @@
 from __future__ import annotations
 
+from ._async_controller import DEFAULT_ASYNC_WORKERS, AsyncDiskCacheController
 from ._controller import DiskCacheController, FanoutDiskCacheController
+from ._lru import LRUCache, TierStats
+from ._stats import CacheInstrumentation, CacheStatsSnapshot, LatencyHistogram
+from ._sweeper import CacheSweeper, SweepResult
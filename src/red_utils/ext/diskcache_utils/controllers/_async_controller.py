@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.diskcache_utils.controllers")
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractAsyncContextManager
+import functools
+import typing as t
+
+from red_utils.ext.diskcache_utils import validators
+from red_utils.ext.diskcache_utils.constants import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_SLICE_SIZE,
+    MISSING,
+)
+
+from ._controller import DiskCacheController
+from ._stats import CacheStatsSnapshot
+
+## Default number of threads running cache operations for an AsyncDiskCacheController
+DEFAULT_ASYNC_WORKERS: int = 4
+
+
+class AsyncDiskCacheController(AbstractAsyncContextManager):
+    """Async context manager running a `DiskCacheController`'s operations on a dedicated thread pool.
+
+    Description:
+        Every SQLite read & write blocks the calling thread. Calling a `DiskCacheController` from a coroutine
+            stalls the event loop for the duration of each operation. This controller runs them on its own
+            `ThreadPoolExecutor` of `max_workers` threads instead, so up to `max_workers` operations overlap
+            (SQLite allows concurrent readers) while the loop keeps serving other tasks. Further operations
+            queue until a thread is free.
+
+        A dedicated pool keeps cache operations from competing with other `asyncio.to_thread()` work for the
+            loop's default executor.
+
+        When the wrapped controller has an L1 tier, `get()` serves in-memory hits directly on the event loop,
+            skipping the round trip to a thread.
+
+        Method names, arguments & return values match `DiskCacheController`, including the batch
+            `set_many()`/`get_many()`/`delete_many()` methods, which each run on a single thread.
+
+    Params:
+        controller (DiskCacheController|None): The (not yet entered) controller to wrap, i.e. a
+            `FanoutDiskCacheController`. When omitted, a `DiskCacheController` is created from `controller_kwargs`.
+        max_workers (int): [Default: 4] Number of threads running cache operations.
+        controller_kwargs (Any): Options for the `DiskCacheController` created when `controller` is omitted, i.e.
+            `cache_directory` & `l1_maxsize`.
+
+    Usage:
+    ``` py linenums="1"
+    async with AsyncDiskCacheController(cache_directory=".cache", l1_maxsize=1024) as cache:
+        await cache.set("key", "value")
+        values = await asyncio.gather(*(cache.get(key) for key in keys))
+    ```
+    """
+
+    def __init__(
+        self,
+        controller: DiskCacheController | None = None,
+        max_workers: int = DEFAULT_ASYNC_WORKERS,
+        **controller_kwargs,
+    ):
+        assert controller is None or not controller_kwargs, ValueError(
+            f"Pass a controller or controller options, not both. Got options: {list(controller_kwargs)}"
+        )
+        assert isinstance(max_workers, int) and max_workers > 0, ValueError(
+            f"max_workers must be a positive int. Got: ({max_workers})"
+        )
+
+        self.controller: DiskCacheController = controller or DiskCacheController(
+            **controller_kwargs
+        )
+        self.max_workers: int = max_workers
+
+        self._executor: ThreadPoolExecutor | None = None
+
+    async def __aenter__(self) -> t.Self:
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="diskcache"
+        )
+
+        try:
+            await self._run(self.controller.__enter__)
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception opening cache at {self.controller.cache_directory}. Details: {exc}"
+            )
+            log.error(msg)
+
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+            raise exc
+
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type:
+            log.error(f"({exc_type}): {exc_value}")
+
+        if self._executor is None:
+            return
+
+        ## Let queued operations finish, then close the cache. Each worker's SQLite connection is closed
+        #  when its thread exits.
+        executor: ThreadPoolExecutor = self._executor
+        self._executor = None
+
+        await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(executor.shutdown, wait=True)
+        )
+
+        if self.controller.sweeper is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.controller.sweeper.stop
+            )
+            self.controller.sweeper = None
+
+        if self.controller.cache:
+            self.controller.cache.close()
+
+    async def _run(self, fn: t.Callable, *args, **kwargs) -> t.Any:
+        """Run `fn` on the controller's thread pool & await its result."""
+        assert self._executor is not None, ValueError(
+            "AsyncDiskCacheController is not open. Use it in an 'async with' statement."
+        )
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def get(
+        self, key: t.Union[str, int, tuple, frozenset] = None, tags: list[str] = None
+    ) -> t.Any:
+        """Get a key's value. See `DiskCacheController.get()`."""
+        validators.validate_key(key)
+
+        _val = self.controller._l1_peek(key)
+        if _val is not MISSING:
+            return _val
+
+        return await self._run(self.controller.get, key=key, tags=tags)
+
+    async def set(
+        self,
+        key: t.Union[str, int, tuple, frozenset] = None,
+        val: t.Union[str, bytes, float, int, list, dict] = None,
+        expire: int = None,
+        read: bool = False,
+        tag: t.Union[str, int, float, bytes] = None,
+        retry: bool = False,
+    ) -> bool:
+        """Set a key value pair. See `DiskCacheController.set()`."""
+        return await self._run(
+            self.controller.set,
+            key=key,
+            val=val,
+            expire=expire,
+            read=read,
+            tag=tag,
+            retry=retry,
+        )
+
+    async def delete(
+        self, key: t.Union[str, int, tuple, frozenset] = None, tag: str = None
+    ) -> t.Any:
+        """Delete a cached value. See `DiskCacheController.delete()`."""
+        return await self._run(self.controller.delete, key=key, tag=tag)
+
+    async def check_key_exists(
+        self, key: t.Union[str, int, tuple, frozenset] = None
+    ) -> bool:
+        """Check if a key exists. See `DiskCacheController.check_key_exists()`."""
+        return await self._run(self.controller.check_key_exists, key=key)
+
+    async def set_expire(
+        self, key: t.Union[str, int, tuple, frozenset] = None, expire: int = None
+    ) -> None:
+        """Set a key's expiration. See `DiskCacheController.set_expire()`."""
+        return await self._run(self.controller.set_expire, key=key, expire=expire)
+
+    async def set_many(
+        self,
+        items: t.Union[dict[t.Any, t.Any], t.Iterable[tuple[t.Any, t.Any]]] = None,
+        expire: int = None,
+        tag: t.Union[str, int, float, bytes] = None,
+        retry: bool = False,
+        chunk_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Set many key value pairs. See `DiskCacheController.set_many()`."""
+        return await self._run(
+            self.controller.set_many,
+            items=items,
+            expire=expire,
+            tag=tag,
+            retry=retry,
+            chunk_size=chunk_size,
+        )
+
+    async def get_many(
+        self,
+        keys: t.Iterable[t.Union[str, int, tuple, frozenset]] = None,
+        default: t.Any = MISSING,
+        retry: bool = False,
+        chunk_size: int = DEFAULT_BATCH_SIZE,
+    ) -> dict[t.Any, t.Any]:
+        """Get many keys. See `DiskCacheController.get_many()`."""
+        return await self._run(
+            self.controller.get_many,
+            keys=keys,
+            default=default,
+            retry=retry,
+            chunk_size=chunk_size,
+        )
+
+    async def delete_many(
+        self,
+        keys: t.Iterable[t.Union[str, int, tuple, frozenset]] = None,
+        tag: str = None,
+        retry: bool = False,
+        chunk_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Delete many keys. See `DiskCacheController.delete_many()`."""
+        return await self._run(
+            self.controller.delete_many,
+            keys=keys,
+            tag=tag,
+            retry=retry,
+            chunk_size=chunk_size,
+        )
+
+    async def evict_tags(
+        self,
+        tags: t.Iterable[t.Union[str, int, float, bytes]] = None,
+        retry: bool = False,
+    ) -> int:
+        """Delete every key tagged with any of `tags`. See `DiskCacheController.evict_tags()`."""
+        return await self._run(self.controller.evict_tags, tags=tags, retry=retry)
+
+    async def expire_older_than(
+        self,
+        seconds: t.Union[int, float] = None,
+        retry: bool = False,
+        slice_size: int = DEFAULT_SLICE_SIZE,
+    ) -> int:
+        """Delete every key stored more than `seconds` ago. See `DiskCacheController.expire_older_than()`."""
+        return await self._run(
+            self.controller.expire_older_than,
+            seconds=seconds,
+            retry=retry,
+            slice_size=slice_size,
+        )
+
+    async def touch_tag(
+        self,
+        tag: t.Union[str, int, float, bytes] = None,
+        expire: t.Union[int, float] | None = None,
+        retry: bool = False,
+        slice_size: int = DEFAULT_SLICE_SIZE,
+    ) -> int:
+        """Set the expiration of every key tagged with `tag`. See `DiskCacheController.touch_tag()`."""
+        return await self._run(
+            self.controller.touch_tag,
+            tag=tag,
+            expire=expire,
+            retry=retry,
+            slice_size=slice_size,
+        )
+
+    async def clear(self) -> bool:
+        """Clear the entire cache. See `DiskCacheController.clear()`."""
+        return await self._run(self.controller.clear)
+
+    async def cull(self, retry: bool = False) -> bool:
+        """Cull items from the cache. See `DiskCacheController.cull()`."""
+        return await self._run(self.controller.cull, retry=retry)
+
+    async def get_cache_size(self) -> int:
+        """Get the cache's size in bytes. See `DiskCacheController.get_cache_size()`."""
+        return await self._run(self.controller.get_cache_size)
+
+    async def stats_snapshot(self, check: bool = False) -> CacheStatsSnapshot:
+        """Return a copy of the controller's statistics. See `DiskCacheController.stats_snapshot()`."""
+        return await self._run(self.controller.stats_snapshot, check=check)
+
+    def tier_stats(self) -> dict[str, dict[str, t.Union[int, float]]]:
+        """Return hit/miss counts of the cache's tiers. Reads in-memory counters only, so it is not async."""
+        return self.controller.tier_stats()
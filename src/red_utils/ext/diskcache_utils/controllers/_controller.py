@@ -3,25 +3,127 @@ from __future__ import annotations
 import json
 import logging
 from pathlib import Path
+import time
 import typing as t
 import warnings
 
 log = logging.getLogger("red_utils.ext.diskcache_utils.controllers")
 
 from contextlib import AbstractContextManager
+import functools
 
 from red_utils.ext.diskcache_utils import validators
+from red_utils.ext.diskcache_utils.__methods import (
+    bump_cache_version,
+    delete_many,
+    evict_tags,
+    expire_older_than,
+    get_cache_version,
+    get_many,
+    set_many,
+    touch_tag,
+)
+from red_utils.ext.diskcache_utils.constants import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_SLICE_SIZE,
+    MISSING,
+)
+
+from ._lru import LRUCache, TierStats
+from ._stats import CacheInstrumentation, CacheStatsSnapshot
+from ._sweeper import CacheSweeper
 
 import diskcache
 
+_HIT_COUNTS: dict[str, int] = {"hits": 1}
+_MISS_COUNTS: dict[str, int] = {"misses": 1}
+_ERROR_COUNTS: dict[str, int] = {"errors": 1}
+## Counter increments for the result of each instrumented operation
+_OP_COUNTS: dict[str, t.Callable[[t.Any], dict[str, int]]] = {
+    "get": lambda result: _HIT_COUNTS if result is not None else _MISS_COUNTS,
+    "get_many": lambda result: {
+        "hits": sum(val is not MISSING for val in result.values()),
+        "misses": sum(val is MISSING for val in result.values()),
+    },
+    "set": lambda result: {"sets": int(bool(result))},
+    "set_many": lambda result: {"sets": result},
+    "delete": lambda result: {"deletes": int(result is not None)},
+    "delete_many": lambda result: {"deletes": result},
+}
+
+
+def _instrumented(op: str) -> t.Callable:
+    """Record a controller method's latency & result counts, when the controller is instrumented."""
+    counts: t.Callable[[t.Any], dict[str, int]] = _OP_COUNTS[op]
+
+    def decorator(method: t.Callable) -> t.Callable:
+        @functools.wraps(method)
+        def wrapper(self: DiskCacheController, *args, **kwargs):
+            if self.instrumentation is None:
+                return method(self, *args, **kwargs)
+
+            start: float = time.perf_counter()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception:
+                self.instrumentation.record(
+                    op, time.perf_counter() - start, _ERROR_COUNTS
+                )
+
+                raise
+
+            self.instrumentation.record(op, time.perf_counter() - start, counts(result))
+
+            return result
+
+        return wrapper
+
+    return decorator
+
 
 class DiskCacheController(AbstractContextManager):
+    """Context manager for a `diskcache.Cache`.
+
+    Description:
+        When `l1_maxsize` is set, an in-process LRU tier is kept in front of the cache. Reads of hot keys are
+            served from memory without touching SQLite or unpickling. Writes go to the cache first, then
+            update the in-memory tier (write-through).
+
+        Every write through a controller (or a `diskcache_utils` function) increments a version counter
+            stored in the cache's database, outside the keys `clear()`, `cull()` & expiring keys delete. Each
+            controller checks the counter at most every `l1_sync_interval` seconds, and clears its L1 tier when
+            another process (or controller) has written since. A value changed elsewhere can be served stale for
+            up to `l1_sync_interval` seconds. Writes made with `diskcache` methods directly (i.e. on
+            `controller.cache`) don't increment the counter; call `bump_cache_version()` after them.
+
+    Params:
+        cache_directory (str|Path): Directory the cache is created in.
+        cache_timeout (int): [Default: 60] SQLite timeout (in seconds).
+        cache_disk (diskcache.Disk): The `Disk` class used to serialize keys & values.
+        index (bool): If `True`, create a tag index.
+        l1_maxsize (int|None): Maximum number of entries in the in-memory tier. `None` disables it.
+        l1_ttl (int|float|None): Seconds an entry is kept in the in-memory tier.
+        l1_sync_interval (int|float): [Default: 1.0] Seconds between checks for writes by other processes.
+        instrument (bool): [Default: False] Count hits, misses, sets, deletes & evictions, and record the latency
+            of `get`/`set`/`delete` (& their `_many` variants). Adds a few microseconds per operation. See `stats_snapshot()`.
+        diskcache_stats (bool): [Default: False] Enable diskcache's own persistent hit/miss counters, shared by every
+            process using the cache. Each `get()` then also writes to the database, so this is much slower.
+        sweep_interval (int|float|None): Run a `CacheSweeper` while the controller is open, removing expired keys
+            & culling the cache in small slices every `sweep_interval` seconds. `None` disables it.
+    """
+
     def __init__(
         self,
         cache_directory: t.Union[str, Path] | None = None,
         cache_timeout: int = 60,
         cache_disk: t.Type[diskcache.Disk] = diskcache.Disk,
         index: bool = True,
+        l1_maxsize: int | None = None,
+        l1_ttl: t.Union[int, float] | None = None,
+        l1_sync_interval: t.Union[int, float] = 1.0,
+        instrument: bool = False,
+        diskcache_stats: bool = False,
+        sweep_interval: t.Union[int, float] | None = None,
     ):
         self.cache_directory = Path(f"{cache_directory}")
         self.cache_timeout = cache_timeout
@@ -30,13 +132,31 @@ class DiskCacheController(AbstractContextManager):
 
         self.cache = None
 
+        self.l1: LRUCache | None = (
+            LRUCache(maxsize=l1_maxsize, ttl=l1_ttl) if l1_maxsize else None
+        )
+        self.l1_sync_interval: t.Union[int, float] = l1_sync_interval
+        self.disk_stats: TierStats = TierStats()
+        self.instrumentation: CacheInstrumentation | None = (
+            CacheInstrumentation() if instrument else None
+        )
+        self.diskcache_stats: bool = diskcache_stats
+        self.sweep_interval: t.Union[int, float] | None = sweep_interval
+        self.sweeper: CacheSweeper | None = None
+
+        self._l1_version: int = 0
+        self._l1_next_sync: float = 0.0
+
+    def _new_cache(self) -> diskcache.Cache:
+        return diskcache.Cache(
+            directory=self.cache_directory,
+            timeout=self.cache_timeout,
+            disk=self.cache_disk,
+        )
+
     def __enter__(self) -> t.Self:
         try:
-            _cache: diskcache.Cache = diskcache.Cache(
-                directory=self.cache_directory,
-                timeout=self.cache_timeout,
-                disk=self.cache_disk,
-            )
+            _cache: diskcache.Cache = self._new_cache()
         except Exception as exc:
             msg = Exception(
                 f"Unhandled exception getting DiskCache Cache. Details: {exc}"
@@ -59,9 +179,23 @@ class DiskCacheController(AbstractContextManager):
 
                 raise exc
 
+        if self.l1 is not None:
+            self._l1_sync(force=True)
+
+        ## Always set, so stats left enabled by a previous controller are turned off
+        self.cache.stats(enable=self.diskcache_stats)
+
+        if self.sweep_interval is not None:
+            self.sweeper = CacheSweeper(cache=self.cache, interval=self.sweep_interval)
+            self.sweeper.start()
+
         return self
 
     def __exit__(self, exc_type, exc_val, traceback):
+        if self.sweeper is not None:
+            self.sweeper.stop()
+            self.sweeper = None
+
         if self.cache:
             self.cache.close()
 
@@ -71,6 +205,83 @@ class DiskCacheController(AbstractContextManager):
         if traceback:
             raise traceback
 
+    def _l1_sync(self, force: bool = False) -> None:
+        """Clear the L1 tier if the cache's version counter changed since the last sync."""
+        now: float = time.monotonic()
+        if not force and now < self._l1_next_sync:
+            return
+
+        self._l1_next_sync = now + self.l1_sync_interval
+        version: int = get_cache_version(self.cache)
+
+        if version != self._l1_version:
+            log.debug(
+                f"Cache at {self.cache.directory} changed (version {self._l1_version} -> {version}), clearing L1 tier"
+            )
+            self.l1.clear()
+            self._l1_version = version
+
+    def _l1_bump(self) -> None:
+        """Increment the cache's version counter after a write, so other controllers clear their L1 tier."""
+        self._l1_written(bump_cache_version(self.cache))
+
+    def _l1_written(self, version: int | None = None) -> None:
+        """Record the version counter after a write by this controller, which incremented it once.
+
+        Params:
+            version (int|None): The new version. Read from the cache when `None`, after a `diskcache_utils`
+                function incremented it.
+        """
+        if self.l1 is None:
+            return
+
+        if version is None:
+            version = get_cache_version(self.cache)
+
+        if version != self._l1_version + 1:
+            ## Another process wrote since the last sync
+            self.l1.clear()
+
+        self._l1_version = version
+
+    def _l1_peek(self, key: t.Any) -> t.Any:
+        """Return `key`'s value from the L1 tier without touching the cache, or `MISSING`.
+
+        Description:
+            Never blocks on SQLite: returns `MISSING` when the L1 tier is disabled, or when a version check
+                is due. Misses are not counted, the caller is expected to fall back to `get()`.
+        """
+        if self.l1 is None or time.monotonic() >= self._l1_next_sync:
+            return MISSING
+
+        start: float = time.perf_counter()
+
+        _val = self.l1.get(key, record=False)
+        if _val is not MISSING:
+            self.l1.stats.hits += 1
+
+            if self.instrumentation is not None:
+                self.instrumentation.record(
+                    "get", time.perf_counter() - start, _HIT_COUNTS
+                )
+
+        return _val
+
+    def tier_stats(self) -> dict[str, dict[str, t.Union[int, float]]]:
+        """Return hit/miss counts & hit rates of the in-memory (`l1`) & `disk` tiers.
+
+        Returns:
+            (dict): `{"l1": {...}, "disk": {...}}`. `"l1"` is omitted when the in-memory tier is disabled.
+
+        """
+        _stats: dict[str, dict[str, t.Union[int, float]]] = {
+            "disk": self.disk_stats.as_dict()
+        }
+        if self.l1 is not None:
+            _stats = {"l1": {**self.l1.stats.as_dict(), "size": len(self.l1)}, **_stats}
+
+        return _stats
+
     def manage_cache_tag_index(self, operation: str = "create") -> None:
         """Create or delete a cache index.
 
@@ -126,7 +337,11 @@ class DiskCacheController(AbstractContextManager):
             with self.cache as ref:
                 ref.clear()
 
-                return True
+            if self.l1 is not None:
+                self.l1.clear()
+            self._l1_bump()
+
+            return True
 
         except Exception as exc:
             msg = Exception(
@@ -157,6 +372,7 @@ class DiskCacheController(AbstractContextManager):
         else:
             return False
 
+    @_instrumented("set")
     def set(
         self,
         key: t.Union[str, int, tuple, frozenset] = None,
@@ -165,7 +381,7 @@ class DiskCacheController(AbstractContextManager):
         read: bool = False,
         tag: t.Union[str, int, float, bytes] = None,
         retry: bool = False,
-    ) -> None:
+    ) -> bool:
         """Set a key value pair in the cache.
 
         Params:
@@ -175,6 +391,11 @@ class DiskCacheController(AbstractContextManager):
             read (bool): If `True`, read value as a file-like object
             tag (str): Applies a tag to the cached value
             retry (bool): If `True`, retry setting cache key if first attempt fails
+
+        Returns:
+            (bool): `True` if the value was set. A `FanoutDiskCacheController` returns `False` when the
+                write times out & `retry=False`.
+
         """
         validators.validate_key(key)
         validators.validate_val(val)
@@ -186,7 +407,7 @@ class DiskCacheController(AbstractContextManager):
 
         try:
             with self.cache as ref:
-                ref.set(
+                _set: bool = ref.set(
                     key=key, value=val, expire=expire, read=read, tag=tag, retry=retry
                 )
 
@@ -198,6 +419,19 @@ class DiskCacheController(AbstractContextManager):
 
             raise exc
 
+        if _set:
+            self._l1_bump()
+
+        if self.l1 is not None and _set:
+            if read:
+                ## The value was a file-like object, which has been consumed
+                self.l1.pop(key)
+            else:
+                self.l1.set(key, val, expire=expire)
+
+        return _set
+
+    @_instrumented("get")
     def get(
         self, key: t.Union[str, int, tuple, frozenset] = None, tags: list[str] = None
     ):
@@ -215,23 +449,47 @@ class DiskCacheController(AbstractContextManager):
         validators.validate_cache(self.cache)
         validators.validate_tags(tags)
 
+        if self.l1 is not None:
+            self._l1_sync()
+
+            _val = self.l1.get(key)
+            if _val is not MISSING:
+                return _val
+
         try:
-            if self.check_key_exists(key=key):
-                try:
-                    with self.cache as ref:
-                        _val = ref.get(key=key)
+            try:
+                ## A single lookup, instead of checking the key exists then reading it
+                _val, _expire_time = self.cache.get(
+                    key=key, default=MISSING, expire_time=True
+                )
+
+            except Exception as exc:
+                msg = Exception(
+                    f"Unhandled exception retrieving value of key [{key}]. Details: {exc}"
+                )
+                log.error(msg)
 
-                        return _val
+                raise exc
 
-                except Exception as exc:
-                    msg = Exception(
-                        f"Unhandled exception retrieving value of key [{key}]. Details: {exc}"
+            if _val is not MISSING:
+                self.disk_stats.hits += 1
+
+                if self.l1 is not None:
+                    self.l1.set(
+                        key,
+                        _val,
+                        expire=(
+                            _expire_time - time.time()
+                            if _expire_time is not None
+                            else None
+                        ),
                     )
-                    log.error(msg)
 
-                    raise exc
+                return _val
 
             else:
+                self.disk_stats.misses += 1
+
                 # return {
                 #     "error": "Key not found in cache",
                 #     "details": {"key": key, "cache_dir": self.cache.directory},
@@ -279,6 +537,11 @@ class DiskCacheController(AbstractContextManager):
 
             raise exc
 
+        self._l1_bump()
+        if self.l1 is not None:
+            self.l1.pop(key)
+
+    @_instrumented("delete")
     def delete(
         self, key: t.Union[str, int, tuple, frozenset] = None, tag: str = None
     ) -> tuple:
@@ -297,7 +560,11 @@ class DiskCacheController(AbstractContextManager):
             with self.cache as ref:
                 _delete = ref.pop(key=key, tag=tag)
 
-                return _delete
+            self._l1_bump()
+            if self.l1 is not None:
+                self.l1.pop(key)
+
+            return _delete
 
         except Exception as exc:
             msg = Exception(
@@ -307,6 +574,216 @@ class DiskCacheController(AbstractContextManager):
 
             raise exc
 
+    @_instrumented("set_many")
+    def set_many(
+        self,
+        items: t.Union[dict[t.Any, t.Any], t.Iterable[tuple[t.Any, t.Any]]] = None,
+        expire: int = None,
+        tag: t.Union[str, int, float, bytes] = None,
+        retry: bool = False,
+        chunk_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Set many key value pairs in the cache, `chunk_size` pairs per transaction.
+
+        Params:
+            items (dict|Iterable[tuple]): A dict of key/value pairs, or an iterable of `(key, value)` tuples
+            expire (int): Time (in seconds) before each value expires
+            tag (str): Applies a tag to each cached value
+            retry (bool): If `True`, retry a chunk's transaction if the database times out
+            chunk_size (int): Number of key/value pairs written per transaction
+
+        Returns:
+            (int): The number of key/value pairs written
+
+        """
+        if self.l1 is not None:
+            ## Keep the keys, to drop them from the L1 tier after the write
+            items = list(items.items() if isinstance(items, dict) else items)
+
+        written: int = set_many(
+            cache=self.cache,
+            items=items,
+            expire=expire,
+            tag=tag,
+            retry=retry,
+            chunk_size=chunk_size,
+        )
+
+        if self.l1 is not None:
+            self._l1_written()
+            ## Bulk writes invalidate, instead of pushing hot keys out of the L1 tier
+            for key, _ in items:
+                self.l1.pop(key)
+
+        return written
+
+    @_instrumented("get_many")
+    def get_many(
+        self,
+        keys: t.Iterable[t.Union[str, int, tuple, frozenset]] = None,
+        default: t.Any = MISSING,
+        retry: bool = False,
+        chunk_size: int = DEFAULT_BATCH_SIZE,
+    ) -> dict[t.Any, t.Any]:
+        """Get many keys from the cache, reading `chunk_size` keys per transaction.
+
+        Params:
+            keys (Iterable): The keys to retrieve from the cache
+            default (Any): The value returned for keys not in the cache. Defaults to the `MISSING` sentinel.
+            retry (bool): If `True`, retry a chunk's transaction if the database times out
+            chunk_size (int): Number of keys read per transaction
+
+        Returns:
+            (dict): A dict of each key & its cached value, or `default` if the key was not found
+
+        """
+        if self.l1 is None:
+            return get_many(
+                cache=self.cache,
+                keys=keys,
+                default=default,
+                retry=retry,
+                chunk_size=chunk_size,
+            )
+
+        self._l1_sync()
+
+        _vals: dict[t.Any, t.Any] = {key: self.l1.get(key) for key in keys}
+        _misses: list[t.Any] = [key for key, val in _vals.items() if val is MISSING]
+
+        if _misses:
+            _vals.update(
+                get_many(
+                    cache=self.cache,
+                    keys=_misses,
+                    default=default,
+                    retry=retry,
+                    chunk_size=chunk_size,
+                )
+            )
+
+        return _vals
+
+    @_instrumented("delete_many")
+    def delete_many(
+        self,
+        keys: t.Iterable[t.Union[str, int, tuple, frozenset]] = None,
+        tag: str = None,
+        retry: bool = False,
+        chunk_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Delete many keys from the cache, `chunk_size` keys per transaction.
+
+        If a tag is provided, only keys that also have that tag will be deleted.
+
+        Params:
+            keys (Iterable): The keys to delete
+            tag (str): Tag to filter by
+            retry (bool): If `True`, retry a chunk's transaction if the database times out
+            chunk_size (int): Number of keys deleted per transaction
+
+        Returns:
+            (int): The number of keys deleted
+
+        """
+        if self.l1 is not None:
+            keys = list(keys)
+
+        deleted: int = delete_many(
+            cache=self.cache, keys=keys, tag=tag, retry=retry, chunk_size=chunk_size
+        )
+
+        if self.l1 is not None:
+            self._l1_written()
+            for key in keys:
+                self.l1.pop(key)
+
+        return deleted
+
+    def _l1_invalidate_all(self) -> None:
+        """Clear the L1 tier after a bulk change to keys it can't identify, i.e. a tag group."""
+        if self.l1 is not None:
+            self.l1.clear()
+            self._l1_version = get_cache_version(self.cache)
+
+    def evict_tags(
+        self,
+        tags: t.Iterable[t.Union[str, int, float, bytes]] = None,
+        retry: bool = False,
+    ) -> int:
+        """Delete every key tagged with any of `tags`, with diskcache's `evict()`.
+
+        Params:
+            tags (Iterable): The tags to evict
+            retry (bool): If `True`, retry a slice's transaction if the database times out
+
+        Returns:
+            (int): The number of keys deleted
+
+        """
+        evicted: int = evict_tags(cache=self.cache, tags=tags, retry=retry)
+
+        self._l1_invalidate_all()
+        if self.instrumentation is not None:
+            self.instrumentation.count(deletes=evicted)
+
+        return evicted
+
+    def expire_older_than(
+        self,
+        seconds: t.Union[int, float] = None,
+        retry: bool = False,
+        slice_size: int = DEFAULT_SLICE_SIZE,
+    ) -> int:
+        """Delete every key stored more than `seconds` ago, `slice_size` keys per transaction.
+
+        Params:
+            seconds (int|float): Age (in seconds) of the oldest key to keep
+            retry (bool): If `True`, retry a slice's transaction if the database times out
+            slice_size (int): Number of keys deleted per transaction
+
+        Returns:
+            (int): The number of keys deleted
+
+        """
+        expired: int = expire_older_than(
+            cache=self.cache, seconds=seconds, retry=retry, slice_size=slice_size
+        )
+
+        self._l1_invalidate_all()
+        if self.instrumentation is not None:
+            self.instrumentation.count(evictions=expired)
+
+        return expired
+
+    def touch_tag(
+        self,
+        tag: t.Union[str, int, float, bytes] = None,
+        expire: t.Union[int, float] | None = None,
+        retry: bool = False,
+        slice_size: int = DEFAULT_SLICE_SIZE,
+    ) -> int:
+        """Set the expiration of every key tagged with `tag`, `slice_size` keys per transaction.
+
+        Params:
+            tag (str): The tag of the keys to update
+            expire (int|float|None): Seconds from now until the keys expire. `None` removes their expiration.
+            retry (bool): If `True`, retry a slice's transaction if the database times out
+            slice_size (int): Number of keys updated per transaction
+
+        Returns:
+            (int): The number of keys updated
+
+        """
+        touched: int = touch_tag(
+            cache=self.cache, tag=tag, expire=expire, retry=retry, slice_size=slice_size
+        )
+
+        ## L1 entries keep the expiration they were cached with
+        self._l1_invalidate_all()
+
+        return touched
+
     def cull(self, retry: bool = False) -> bool:
         """Cull items from cache to free space.
 
@@ -318,7 +795,10 @@ class DiskCacheController(AbstractContextManager):
 
         """
         try:
-            self.cache.cull(retry=retry)
+            culled: int = self.cache.cull(retry=retry)
+
+            if self.instrumentation is not None:
+                self.instrumentation.count(evictions=culled)
 
             return True
         except Exception as exc:
@@ -349,6 +829,45 @@ class DiskCacheController(AbstractContextManager):
 
             raise exc
 
+    def stats_snapshot(self, check: bool = False) -> CacheStatsSnapshot:
+        """Return a copy of the controller's statistics.
+
+        Params:
+            check (bool): [Default: False] Also run an integrity check (`healthcheck()`) & include its warnings.
+                The check reads the whole database, so avoid it on hot paths.
+
+        Returns:
+            (CacheStatsSnapshot): The controller's counters & latencies (when `instrument=True`), tier hit rates,
+                diskcache's own hit/miss counters & the cache's size.
+
+        """
+        validators.validate_cache(cache=self.cache)
+
+        ## Read diskcache's counters without changing whether it collects them
+        hits, misses = self.cache.stats(enable=bool(self.cache.statistics))
+
+        _snapshot: CacheStatsSnapshot = CacheStatsSnapshot(
+            tiers=self.tier_stats(),
+            diskcache={"hits": hits, "misses": misses},
+            size=self.get_cache_size(),
+        )
+
+        if self.instrumentation is not None:
+            with self.instrumentation._lock:
+                _snapshot.counters = dict(self.instrumentation.counters)
+                _snapshot.latency = {
+                    op: histogram.as_dict()
+                    for op, histogram in self.instrumentation.latency.items()
+                }
+            _snapshot.hit_rate = self.instrumentation.hit_rate
+
+        if check:
+            _snapshot.warnings = [
+                str(warning.message) for warning in self.healthcheck()
+            ]
+
+        return _snapshot
+
     def healthcheck(self) -> list[warnings.WarningMessage]:
         """Run checks on Cache instance.
 
@@ -372,12 +891,80 @@ class DiskCacheController(AbstractContextManager):
             raise exc
 
 
-class FanoutDiskCacheController(AbstractContextManager):
-    def __init__(self):
-        pass
-
-    def __enter__(self):
-        raise NotImplementedError("Fanout DiskCache controller not fully implemented")
+class FanoutDiskCacheController(DiskCacheController):
+    """A `DiskCacheController` backed by a sharded `diskcache.FanoutCache`.
+
+    Description:
+        Every `diskcache.Cache` is a single SQLite database, so concurrent writers (threads or processes)
+            take turns holding its write lock. A `FanoutCache` spreads keys across `shards` databases by
+            hashing each key, so writers only contend when their keys land on the same shard.
+
+        Has the same API as `DiskCacheController`. Batch operations (`set_many()` etc) open one transaction
+            per shard, instead of locking every shard at once.
+
+    Params:
+        cache_directory (str|Path): Directory the shards are created in, as `<cache_directory>/000`, `001`, etc.
+        cache_timeout (float): [Default: 0.010] SQLite timeout (in seconds) of each shard. Writes that time out
+            on a busy shard fail fast; `set()` returns `False` unless called with `retry=True`.
+        cache_disk (diskcache.Disk): The `Disk` class used to serialize keys & values.
+        index (bool): If `True`, create a tag index on every shard.
+        shards (int): [Default: 8] Number of shards. Should be at least the number of concurrent writers.
+            Changing the number of shards of an existing cache makes its existing keys unreachable.
+        size_limit (int|None): Total size limit (in bytes) of the cache, split evenly between shards.
+            Defaults to diskcache's 1GB.
+        l1_maxsize, l1_ttl, l1_sync_interval, instrument, diskcache_stats, sweep_interval: See `DiskCacheController`.
+
+    Usage:
+    ``` py linenums="1"
+    with FanoutDiskCacheController(cache_directory=".cache/fanout", shards=16) as ctl:
+        ctl.set_many({f"user:{i}": i for i in range(100_000)})
+    ```
+    """
 
-    def __exit__(self, exc_type, exc_val, traceback):
-        pass
+    def __init__(
+        self,
+        cache_directory: t.Union[str, Path] | None = None,
+        cache_timeout: t.Union[int, float] = 0.010,
+        cache_disk: t.Type[diskcache.Disk] = diskcache.Disk,
+        index: bool = True,
+        shards: int = 8,
+        size_limit: int | None = None,
+        l1_maxsize: int | None = None,
+        l1_ttl: t.Union[int, float] | None = None,
+        l1_sync_interval: t.Union[int, float] = 1.0,
+        instrument: bool = False,
+        diskcache_stats: bool = False,
+        sweep_interval: t.Union[int, float] | None = None,
+    ):
+        super().__init__(
+            cache_directory=cache_directory,
+            cache_timeout=cache_timeout,
+            cache_disk=cache_disk,
+            index=index,
+            l1_maxsize=l1_maxsize,
+            l1_ttl=l1_ttl,
+            l1_sync_interval=l1_sync_interval,
+            instrument=instrument,
+            diskcache_stats=diskcache_stats,
+            sweep_interval=sweep_interval,
+        )
+
+        assert isinstance(shards, int) and shards > 0, ValueError(
+            f"shards must be a positive int. Got: ({shards})"
+        )
+
+        self.shards = shards
+        self.size_limit = size_limit
+
+    def _new_cache(self) -> diskcache.FanoutCache:
+        _settings: dict[str, t.Any] = {}
+        if self.size_limit is not None:
+            _settings["size_limit"] = self.size_limit
+
+        return diskcache.FanoutCache(
+            directory=self.cache_directory,
+            shards=self.shards,
+            timeout=self.cache_timeout,
+            disk=self.cache_disk,
+            **_settings,
+        )
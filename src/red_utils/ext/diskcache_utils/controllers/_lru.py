@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.diskcache_utils.controllers")
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import threading
+import time
+import typing as t
+
+from red_utils.core.dataclass_utils.mixins import DictMixin
+from red_utils.ext.diskcache_utils.constants import MISSING
+
+
+@dataclass
+class TierStats(DictMixin):
+    """Hit/miss counters for one tier of a cache.
+
+    Params:
+        hits (int): Lookups that found a value
+        misses (int): Lookups that did not find a value
+        evictions (int): Entries dropped to make room, or because they expired
+    """
+
+    hits: int = field(default=0)
+    misses: int = field(default=0)
+    evictions: int = field(default=0)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups that were hits, or `0.0` before the first lookup."""
+        lookups: int = self.hits + self.misses
+
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict[str, t.Union[int, float]]:
+        return {**super().as_dict(), "hit_rate": self.hit_rate}
+
+
+class LRUCache:
+    """A thread-safe, in-memory LRU cache, bounded by entry count & entry age.
+
+    Description:
+        Used as the in-process (L1) tier of a `DiskCacheController`. Values are stored & returned by
+            reference, so mutating a returned value mutates the cached value.
+
+    Params:
+        maxsize (int): [Default: 1024] Maximum number of entries. The least recently used entry is
+            evicted when a new entry would exceed it.
+        ttl (int|float|None): Seconds an entry is kept. `None` keeps entries until they are evicted.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: t.Union[int, float] | None = None):
+        assert isinstance(maxsize, int) and maxsize > 0, ValueError(
+            f"maxsize must be a positive int. Got: ({maxsize})"
+        )
+        assert ttl is None or ttl > 0, ValueError(
+            f"ttl must be a positive number or None. Got: ({ttl})"
+        )
+
+        self.maxsize: int = maxsize
+        self.ttl: t.Union[int, float] | None = ttl
+        self.stats: TierStats = TierStats()
+
+        ## key: (value, monotonic expiry time or None)
+        self._entries: OrderedDict[t.Any, tuple[t.Any, float | None]] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: t.Any) -> bool:
+        return self.get(key, record=False) is not MISSING
+
+    def get(self, key: t.Any, default: t.Any = MISSING, record: bool = True) -> t.Any:
+        """Return the value of `key`, or `default` if it is missing or expired.
+
+        Params:
+            key (Any): The key to look up
+            default (Any): Returned on a miss. Defaults to the `MISSING` sentinel.
+            record (bool): [Default: True] Count the lookup in `stats`
+        """
+        with self._lock:
+            entry: tuple[t.Any, float | None] | None = self._entries.get(key)
+
+            if (
+                entry is not None
+                and entry[1] is not None
+                and entry[1] <= time.monotonic()
+            ):
+                del self._entries[key]
+                self.stats.evictions += 1
+                entry = None
+
+            if entry is None:
+                if record:
+                    self.stats.misses += 1
+
+                return default
+
+            self._entries.move_to_end(key)
+            if record:
+                self.stats.hits += 1
+
+            return entry[0]
+
+    def set(
+        self, key: t.Any, value: t.Any, expire: t.Union[int, float] | None = None
+    ) -> None:
+        """Store `value` under `key`, evicting the least recently used entry if the cache is full.
+
+        Params:
+            key (Any): The key to store the value under
+            value (Any): The value to store
+            expire (int|float|None): Seconds until this entry expires. The shorter of `expire` & `ttl` is used.
+        """
+        lifetimes: list[t.Union[int, float]] = [
+            lifetime for lifetime in (expire, self.ttl) if lifetime is not None
+        ]
+        expires_at: float | None = (
+            time.monotonic() + min(lifetimes) if lifetimes else None
+        )
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def pop(self, key: t.Any) -> None:
+        """Remove `key`, if it is cached."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry. Stats are kept."""
+        with self._lock:
+            self._entries.clear()
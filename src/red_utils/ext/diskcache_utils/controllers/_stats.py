@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.diskcache_utils.controllers")
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import threading
+import typing as t
+
+from red_utils.core.dataclass_utils.mixins import DictMixin
+
+## Upper bounds (in microseconds) of the latency histogram buckets, a 1-2-5 series from 1us to 10s
+LATENCY_BUCKETS_US: tuple[float, ...] = tuple(
+    base * 10**exp for exp in range(0, 7) for base in (1, 2, 5)
+) + (10_000_000,)
+## Counters kept by CacheInstrumentation
+INSTRUMENTATION_COUNTERS: list[str] = [
+    "hits",
+    "misses",
+    "sets",
+    "deletes",
+    "evictions",
+    "errors",
+]
+
+
+class LatencyHistogram:
+    """A fixed-bucket latency histogram.
+
+    Description:
+        Recording a latency is a binary search over ~20 bucket bounds & a few integer increments, cheap
+            enough to leave on in production. Percentiles are estimated as the upper bound of the bucket
+            the percentile falls in, so they are accurate to within one bucket (i.e. a p99 of `500us` means
+            99% of operations took `200-500us` or less).
+
+    Params:
+        bounds (tuple[float]): Ascending upper bounds (in microseconds) of each bucket. Latencies above the
+            last bound are counted in an overflow bucket.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "total", "max", "_bounds_s")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS_US):
+        self.bounds: tuple[float, ...] = bounds
+        self.counts: list[int] = [0] * (len(bounds) + 1)
+        self.count: int = 0
+        ## Totals are kept in seconds, so record() does not convert every latency
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+        self._bounds_s: tuple[float, ...] = tuple(bound / 1_000_000 for bound in bounds)
+
+    @property
+    def total_us(self) -> float:
+        return self.total * 1_000_000
+
+    @property
+    def max_us(self) -> float:
+        return self.max * 1_000_000
+
+    def record(self, seconds: float) -> None:
+        """Record one operation that took `seconds`."""
+        self.counts[bisect_left(self._bounds_s, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Return the estimated `q`th percentile (0-100) latency, in microseconds."""
+        assert 0 <= q <= 100, ValueError(f"q must be between 0 and 100. Got: ({q})")
+
+        if not self.count:
+            return 0.0
+
+        rank: float = self.count * q / 100
+        seen: int = 0
+
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+
+            if seen >= rank and bucket_count:
+                ## The overflow bucket has no upper bound, use the slowest operation seen
+                return (
+                    min(self.bounds[i], self.max_us)
+                    if i < len(self.bounds)
+                    else self.max_us
+                )
+
+        return self.max_us
+
+    def as_dict(self) -> dict[str, t.Union[int, float]]:
+        return {
+            "count": self.count,
+            "mean_us": self.total_us / self.count if self.count else 0.0,
+            "p50_us": self.percentile(50),
+            "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99),
+            "max_us": self.max_us,
+        }
+
+
+class CacheInstrumentation:
+    """Thread-safe operation counters & per-operation latency histograms for a cache controller.
+
+    Usage:
+    ``` py linenums="1"
+    with DiskCacheController(cache_directory=".cache", instrument=True) as ctl:
+        ctl.get("key")
+        print(ctl.stats_snapshot().counters)
+    ```
+    """
+
+    def __init__(self):
+        self.counters: dict[str, int] = dict.fromkeys(INSTRUMENTATION_COUNTERS, 0)
+        self.latency: dict[str, LatencyHistogram] = {}
+
+        self._lock: threading.Lock = threading.Lock()
+
+    def record(
+        self, op: str, seconds: float, counts: dict[str, int] | None = None
+    ) -> None:
+        """Record an operation's latency, and increment any of the `INSTRUMENTATION_COUNTERS`.
+
+        Params:
+            op (str): Name of the operation, i.e. `"get"`
+            seconds (float): How long the operation took
+            counts (dict[str, int]|None): Amounts to add to counters, i.e. `{"hits": 1}`
+        """
+        with self._lock:
+            histogram: LatencyHistogram | None = self.latency.get(op)
+            if histogram is None:
+                histogram = self.latency[op] = LatencyHistogram()
+
+            histogram.record(seconds)
+
+            if counts:
+                for counter, amount in counts.items():
+                    self.counters[counter] += amount
+
+    def count(self, **counts: int) -> None:
+        """Increment any of the `INSTRUMENTATION_COUNTERS`, without recording a latency."""
+        with self._lock:
+            for counter, amount in counts.items():
+                self.counters[counter] += amount
+
+    @property
+    def hit_rate(self) -> float:
+        lookups: int = self.counters["hits"] + self.counters["misses"]
+
+        return self.counters["hits"] / lookups if lookups else 0.0
+
+    def reset(self) -> None:
+        """Set all counters to 0 & drop all recorded latencies."""
+        with self._lock:
+            self.counters = dict.fromkeys(INSTRUMENTATION_COUNTERS, 0)
+            self.latency = {}
+
+
+@dataclass
+class CacheStatsSnapshot(DictMixin):
+    """A point-in-time copy of a cache controller's statistics.
+
+    Params:
+        counters (dict[str, int]): Operation counters, see `INSTRUMENTATION_COUNTERS`. Empty when the controller is
+            not instrumented.
+        hit_rate (float): Fraction of looked up keys that were found.
+        latency (dict[str, dict]): Per-operation latency summary (count, mean, p50/p90/p99 & max, in microseconds).
+        tiers (dict[str, dict]): Hits & misses of the in-memory (`l1`) and `disk` tiers.
+        diskcache (dict[str, int]): diskcache's own persistent `hits` & `misses`, counted across every process
+            using the cache when diskcache statistics are enabled.
+        size (int): Size of the cache on disk, in bytes.
+        warnings (list[str]|None): Warnings from a cache integrity check, when one was requested.
+    """
+
+    counters: dict[str, int] = field(default_factory=dict)
+    hit_rate: float = field(default=0.0)
+    latency: dict[str, dict[str, t.Union[int, float]]] = field(default_factory=dict)
+    tiers: dict[str, dict[str, t.Union[int, float]]] = field(default_factory=dict)
+    diskcache: dict[str, int] = field(default_factory=dict)
+    size: int = field(default=0)
+    warnings: list[str] | None = field(default=None)
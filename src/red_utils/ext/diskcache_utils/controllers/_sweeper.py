@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.diskcache_utils.controllers")
+
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field
+import threading
+import time
+import typing as t
+
+from red_utils.core.dataclass_utils.mixins import DictMixin
+from red_utils.ext.diskcache_utils import validators
+from red_utils.ext.diskcache_utils.__methods import _shards, _sliced
+from red_utils.ext.diskcache_utils.constants import DEFAULT_SLICE_SIZE
+
+import diskcache
+from diskcache.core import EVICTION_POLICY
+
+
+@dataclass
+class SweepResult(DictMixin):
+    """The outcome of one `CacheSweeper.sweep()`.
+
+    Params:
+        expired (int): Expired keys removed
+        culled (int): Keys evicted to bring the cache under its size limit
+        done (bool): `False` when the sweep stopped at its slice budget with work left over
+        duration (float): Seconds the sweep took, including pauses between slices
+    """
+
+    expired: int = field(default=0)
+    culled: int = field(default=0)
+    done: bool = field(default=True)
+    duration: float = field(default=0.0)
+
+
+class CacheSweeper(AbstractContextManager):
+    """Background thread removing expired keys & culling a cache, in small slices.
+
+    Description:
+        diskcache only removes expired keys when a write culls the cache, and `cull()`/`expire()` run until
+            there is nothing left to remove. On a large cache that is a long run of write transactions on the
+            request path. A sweeper moves that work to a background thread, & bounds it: each sweep removes
+            at most `max_slices` slices of `slice_size` keys per shard, sleeping `pause` seconds between slices
+            so other writers get the lock. A sweep that hits its budget is followed by another after `pause`,
+            instead of waiting `interval` seconds.
+
+        Culling follows the cache's eviction policy, and only runs while the cache is over its size limit.
+
+    Params:
+        cache (diskcache.Cache|diskcache.FanoutCache): The cache to sweep
+        interval (int|float): [Default: 60] Seconds between sweeps
+        slice_size (int): [Default: 100] Keys removed per transaction
+        max_slices (int): [Default: 10] Slices per shard per sweep, for each of expiring & culling
+        pause (float): [Default: 0.01] Seconds between slices
+        cull (bool): [Default: True] Also evict keys while the cache is over its size limit
+        retry (bool): [Default: False] Retry a slice if the database times out. Otherwise the sweep stops &
+            the next one picks up where it left off.
+
+    Usage:
+    ``` py linenums="1"
+    with diskcache.Cache(".cache") as cache, CacheSweeper(cache, interval=30):
+        ...
+    ```
+    """
+
+    def __init__(
+        self,
+        cache: diskcache.Cache | diskcache.FanoutCache = None,
+        interval: t.Union[int, float] = 60,
+        slice_size: int = DEFAULT_SLICE_SIZE,
+        max_slices: int = 10,
+        pause: float = 0.01,
+        cull: bool = True,
+        retry: bool = False,
+    ):
+        validators.validate_cache(cache=cache, none_ok=False)
+        assert interval > 0, ValueError(
+            f"interval must be a positive number. Got: ({interval})"
+        )
+        assert isinstance(max_slices, int) and max_slices > 0, ValueError(
+            f"max_slices must be a positive int. Got: ({max_slices})"
+        )
+
+        self.cache: diskcache.Cache | diskcache.FanoutCache = cache
+        self.interval: t.Union[int, float] = interval
+        self.slice_size: int = slice_size
+        self.max_slices: int = max_slices
+        self.pause: float = pause
+        self.cull: bool = cull
+        self.retry: bool = retry
+
+        self.last_result: SweepResult | None = None
+        self.totals: SweepResult = SweepResult()
+
+        self._stop: threading.Event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> t.Self:
+        self.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _cull_shard(self, shard: diskcache.Cache) -> tuple[int, bool]:
+        """Evict keys from one shard, by its eviction policy, while it is over its size limit."""
+        policy: str | None = EVICTION_POLICY[shard.eviction_policy]["cull"]
+        if policy is None:
+            return 0, True
+
+        select: str = policy.format(fields="rowid, filename", now=time.time())
+        culled: int = 0
+
+        for i in range(self.max_slices):
+            if shard.volume() <= shard.size_limit:
+                return culled, True
+
+            if i and self.pause:
+                time.sleep(self.pause)
+
+            culled += _sliced(
+                shard,
+                select,
+                [],
+                retry=self.retry,
+                slice_size=self.slice_size,
+                max_slices=1,
+            )[0]
+
+        return culled, shard.volume() <= shard.size_limit
+
+    def sweep(self) -> SweepResult:
+        """Run one bounded sweep of every shard.
+
+        Returns:
+            (SweepResult): What the sweep removed, and whether work was left over.
+
+        """
+        start: float = time.perf_counter()
+        result: SweepResult = SweepResult()
+
+        for shard in _shards(self.cache):
+            expired, done = _sliced(
+                shard,
+                "SELECT rowid, filename FROM Cache WHERE 0 < expire_time AND expire_time < ? LIMIT ?",
+                [time.time()],
+                retry=self.retry,
+                slice_size=self.slice_size,
+                max_slices=self.max_slices,
+                pause=self.pause,
+            )
+            result.expired += expired
+            result.done = result.done and done
+
+            if self.cull:
+                culled, done = self._cull_shard(shard)
+                result.culled += culled
+                result.done = result.done and done
+
+        result.duration = time.perf_counter() - start
+
+        self.last_result = result
+        self.totals.expired += result.expired
+        self.totals.culled += result.culled
+        self.totals.duration += result.duration
+
+        return result
+
+    def _run(self) -> None:
+        delay: float = 0.0
+
+        while not self._stop.wait(delay):
+            try:
+                result: SweepResult = self.sweep()
+            except diskcache.Timeout:
+                log.warning(
+                    f"Database timeout sweeping cache at {self.cache.directory}/, retrying next sweep"
+                )
+                delay = self.interval
+
+                continue
+            except Exception as exc:
+                msg = Exception(
+                    f"Unhandled exception sweeping cache at {self.cache.directory}/. Details: {exc}"
+                )
+                log.error(msg)
+                delay = self.interval
+
+                continue
+
+            if result.expired or result.culled:
+                log.debug(
+                    f"Swept cache at {self.cache.directory}/: {result.expired} expired, {result.culled} culled in {result.duration:.3f}s"
+                )
+
+            delay = self.interval if result.done else self.pause
+
+    def start(self) -> None:
+        """Start sweeping on a daemon thread. The first sweep runs immediately."""
+        if self.running:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="diskcache-sweeper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop sweeping, waiting up to `timeout` seconds for a running sweep to finish."""
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,308 @@
+"""Decorators for caching function results in a `diskcache.Cache`."""
+
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.diskcache_utils.decorators")
+
+import asyncio
+import functools
+import inspect
+import math
+import random
+import time
+import typing as t
+
+from .__methods import bump_cache_version, convert_to_seconds
+from .classes import CacheInstance
+from .constants import MISSING, TimeoutConf
+from .controllers import DiskCacheController
+from .validators import validate_cache, validate_tag
+
+from diskcache import Cache, FanoutCache
+
+## Prefix of the cache keys used to lock a key while its value is recomputed
+_LOCK_KEY_PREFIX: str = "red_utils.diskcache_utils.cached.lock"
+VALID_STAMPEDE_STRATEGIES: list[str | None] = ["lock", "early", None]
+
+CacheSource = t.Union[Cache, FanoutCache, DiskCacheController, CacheInstance]
+
+
+def _resolve_cache(cache: CacheSource) -> Cache | FanoutCache:
+    """Return the `diskcache` cache of a controller/`CacheInstance`, which may be opened after decorating."""
+    _cache = (
+        cache.cache
+        if isinstance(cache, (DiskCacheController, CacheInstance))
+        else cache
+    )
+    assert _cache is not None, ValueError(
+        f"{type(cache).__name__} has no open cache. Enter the controller before calling a @cached function."
+    )
+
+    return validate_cache(cache=_cache, none_ok=False)
+
+
+def _expire_seconds(
+    expire: t.Union[int, float, TimeoutConf, dict, None],
+) -> float | None:
+    """Convert a `TimeoutConf` (or its dict), or a number of seconds, to seconds."""
+    if expire is None or isinstance(expire, (int, float)):
+        return expire
+
+    _conf: dict = expire.as_dict() if isinstance(expire, TimeoutConf) else expire
+
+    return convert_to_seconds(amount=_conf["amount"], unit=_conf["unit"])
+
+
+def _should_recompute_early(
+    expire_time: float | None, compute_time: float, beta: float
+) -> bool:
+    """Probabilistic early expiration (XFetch).
+
+    Description:
+        Each reader recomputes a value before it expires with a probability that rises as expiry nears &
+            with how long the value takes to compute, so (usually) one reader refreshes a hot key while the
+            rest keep reading the cached value, instead of every reader recomputing at once when it expires.
+    """
+    if expire_time is None:
+        return False
+
+    return time.time() - compute_time * beta * math.log(random.random()) >= expire_time
+
+
+def cached(
+    cache: CacheSource = None,
+    expire: t.Union[int, float, TimeoutConf, dict, None] = None,
+    tag: str | None = None,
+    key_prefix: str | None = None,
+    key: t.Callable[..., t.Any] | None = None,
+    ignore: t.Iterable[str] = (),
+    stampede: str | None = "lock",
+    beta: float = 1.0,
+    lock_expire: t.Union[int, float] = 60,
+    lock_timeout: t.Union[int, float] | None = None,
+    poll_interval: float = 0.01,
+) -> t.Callable[[t.Callable], t.Callable]:
+    """Cache a sync or async function's results in a `diskcache.Cache`, keyed by its arguments.
+
+    Description:
+        Arguments are bound to the function's signature before building a key, so `f(1)` and `f(x=1)` share a
+            cached value. `None` results are cached too.
+
+        `stampede` controls what happens when many callers (threads, coroutines or processes) miss the same key:
+
+        - `"lock"`: The first caller takes a lock stored in the cache & computes the value. Other callers wait
+            for it, polling every `poll_interval` seconds, then read the cached value. The lock expires after
+            `lock_expire` seconds, in case its holder dies. A caller that waits longer than `lock_timeout`
+            computes the value itself.
+        - `"early"`: Callers recompute a value shortly before it expires, with a probability that grows as
+            the expiry nears (tuned by `beta`). Only useful with `expire`.
+        - `None`: Every caller that misses computes the value.
+
+        The decorated function gets a `cache_key(*args, **kwargs)` method returning the key for a call, and an
+            `invalidate(*args, **kwargs)` method deleting a call's cached value.
+
+    Params:
+        cache (diskcache.Cache|diskcache.FanoutCache|DiskCacheController|CacheInstance): The cache to store results in.
+            A controller's cache is looked up on each call, so the controller can be entered after decorating.
+        expire (int|float|TimeoutConf|dict|None): Time before a result expires, as seconds or a `TimeoutConf`
+            (converted with `convert_to_seconds()`). `None` never expires.
+        tag (str|None): Tag applied to each cached result, i.e. to evict them all with `cache.evict(tag)`.
+        key_prefix (str|None): First part of every key. Defaults to the function's module & qualified name.
+        key (Callable|None): Build the key from the call's arguments instead, i.e. `lambda user, **_: user.id`.
+        ignore (Iterable[str]): Names of arguments left out of the key, i.e. a client or session object.
+        stampede (str|None): [Default: lock] Stampede protection strategy. One of `"lock"`, `"early"` or `None`.
+        beta (float): [Default: 1.0] With `stampede="early"`, values above 1 recompute earlier.
+        lock_expire (int|float): [Default: 60] Seconds before a recompute lock expires.
+        lock_timeout (int|float|None): Seconds to wait for another caller's recompute. Defaults to `lock_expire`.
+        poll_interval (float): [Default: 0.01] Seconds between checks while waiting for another caller's recompute.
+
+    Usage:
+    ``` py linenums="1"
+    cache = diskcache.Cache(".cache/reports")
+
+    @cached(cache, expire=TimeoutConf(unit="hours", amount=1), tag="reports", ignore=["session"])
+    def build_report(session, report_id: int) -> dict:
+        ...
+
+    @cached(cache, expire=300, stampede="early")
+    async def fetch_rates(currency: str) -> dict:
+        ...
+    ```
+    """
+    assert cache is not None, ValueError("Missing a cache to store results in")
+    assert stampede in VALID_STAMPEDE_STRATEGIES, ValueError(
+        f"Invalid stampede strategy: '{stampede}'. Must be one of {VALID_STAMPEDE_STRATEGIES}"
+    )
+    validate_tag(tag=tag, none_ok=True)
+
+    _expire: float | None = _expire_seconds(expire)
+    _lock_timeout: float = lock_timeout if lock_timeout is not None else lock_expire
+    _ignore: frozenset[str] = frozenset(ignore)
+
+    def decorator(fn: t.Callable) -> t.Callable:
+        signature: inspect.Signature = inspect.signature(fn)
+        prefix: str = key_prefix or f"{fn.__module__}.{fn.__qualname__}"
+
+        def cache_key(*args, **kwargs) -> tuple:
+            """Return the cache key for calling the function with `args` & `kwargs`."""
+            if key is not None:
+                return (prefix, key(*args, **kwargs))
+
+            bound: inspect.BoundArguments = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            return (prefix,) + tuple(
+                (name, val)
+                for name, val in bound.arguments.items()
+                if name not in _ignore
+            )
+
+        def invalidate(*args, **kwargs) -> bool:
+            """Delete the cached result of calling the function with `args` & `kwargs`."""
+            _cache: Cache | FanoutCache = _resolve_cache(cache)
+            deleted: bool = _cache.delete(cache_key(*args, **kwargs), retry=True)
+            bump_cache_version(_cache)
+
+            return deleted
+
+        def _lookup(_cache: Cache | FanoutCache, _key: tuple) -> t.Any:
+            """Return the cached value, or `MISSING` on a miss (or an early recompute)."""
+            entry, expire_time = _cache.get(
+                _key, default=MISSING, expire_time=True, retry=True
+            )
+            if entry is MISSING:
+                return MISSING
+
+            value, compute_time = entry
+            if stampede == "early" and _should_recompute_early(
+                expire_time, compute_time, beta
+            ):
+                log.debug(f"Recomputing {prefix} before it expires")
+
+                return MISSING
+
+            return value
+
+        def _store(
+            _cache: Cache | FanoutCache, _key: tuple, value: t.Any, started: float
+        ) -> None:
+            _cache.set(
+                _key,
+                (value, time.perf_counter() - started),
+                expire=_expire,
+                tag=tag,
+                retry=True,
+            )
+            bump_cache_version(_cache)
+
+        def _lock_key(_key: tuple) -> tuple:
+            return (_LOCK_KEY_PREFIX,) + _key
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                _cache: Cache | FanoutCache = _resolve_cache(cache)
+                _key: tuple = cache_key(*args, **kwargs)
+
+                value: t.Any = _lookup(_cache, _key)
+                if value is not MISSING:
+                    return value
+
+                locked: bool = False
+
+                if stampede == "lock":
+                    waited: float = 0.0
+
+                    while not (
+                        locked := _cache.add(
+                            _lock_key(_key), None, expire=lock_expire, retry=True
+                        )
+                    ):
+                        if waited >= _lock_timeout:
+                            log.warning(
+                                f"Timed out after {waited:.2f}s waiting for another caller to compute {prefix}"
+                            )
+                            break
+
+                        await asyncio.sleep(poll_interval)
+                        waited += poll_interval
+
+                        value = _lookup(_cache, _key)
+                        if value is not MISSING:
+                            return value
+
+                try:
+                    ## Another caller may have stored the value before this one took the lock
+                    value = _lookup(_cache, _key) if locked else MISSING
+
+                    if value is MISSING:
+                        started: float = time.perf_counter()
+                        value = await fn(*args, **kwargs)
+                        _store(_cache, _key, value, started)
+                finally:
+                    if locked:
+                        _cache.delete(_lock_key(_key), retry=True)
+
+                return value
+
+            wrapper = async_wrapper
+
+        else:
+
+            @functools.wraps(fn)
+            def sync_wrapper(*args, **kwargs):
+                _cache: Cache | FanoutCache = _resolve_cache(cache)
+                _key: tuple = cache_key(*args, **kwargs)
+
+                value: t.Any = _lookup(_cache, _key)
+                if value is not MISSING:
+                    return value
+
+                locked: bool = False
+
+                if stampede == "lock":
+                    waited: float = 0.0
+
+                    while not (
+                        locked := _cache.add(
+                            _lock_key(_key), None, expire=lock_expire, retry=True
+                        )
+                    ):
+                        if waited >= _lock_timeout:
+                            log.warning(
+                                f"Timed out after {waited:.2f}s waiting for another caller to compute {prefix}"
+                            )
+                            break
+
+                        time.sleep(poll_interval)
+                        waited += poll_interval
+
+                        value = _lookup(_cache, _key)
+                        if value is not MISSING:
+                            return value
+
+                try:
+                    ## Another caller may have stored the value before this one took the lock
+                    value = _lookup(_cache, _key) if locked else MISSING
+
+                    if value is MISSING:
+                        started: float = time.perf_counter()
+                        value = fn(*args, **kwargs)
+                        _store(_cache, _key, value, started)
+                finally:
+                    if locked:
+                        _cache.delete(_lock_key(_key), retry=True)
+
+                return value
+
+            wrapper = sync_wrapper
+
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
+
+        return wrapper
+
+    return decorator
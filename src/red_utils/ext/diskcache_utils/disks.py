@@ -0,0 +1,183 @@
+"""`diskcache.Disk` subclasses that serialize values with `msgpack` instead of `pickle`.
+
+Pass one as a cache's `disk`, i.e. `DiskCacheController(cache_directory=..., cache_disk=ZlibMsgpackDisk)`.
+"""
+
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.diskcache_utils.disks")
+
+import io
+import lzma
+import os.path as op
+import pickle
+import sqlite3
+import typing as t
+import zlib
+
+from red_utils.ext.msgpack_utils import ext_default, msgpack_unpackb
+
+import diskcache
+from diskcache.core import MODE_PICKLE, UNKNOWN
+import msgpack
+
+## First byte of a value stored by a MsgpackDisk, marking how the rest is encoded
+_HEADER_MSGPACK: bytes = b"\x00"
+_HEADER_ZLIB: bytes = b"\x01"
+_HEADER_LZMA: bytes = b"\x02"
+## First byte of a pickle (protocol 2+), from a cache written by diskcache's default Disk
+_PICKLE_PROTO: int = 0x80
+
+VALID_COMPRESSION: list[str | None] = ["zlib", "lzma", None]
+## Packed values smaller than this (in bytes) are not compressed
+DEFAULT_COMPRESS_THRESHOLD: int = 1024
+
+
+class MsgpackDisk(diskcache.Disk):
+    """A `diskcache.Disk` that serializes values with `msgpack`, optionally compressing large values.
+
+    Description:
+        `str`, `bytes`, `int` & `float` values are stored natively by SQLite, exactly like the default `Disk`.
+            Other values (`list`, `dict`, `bool`, `None`, etc) are packed with `msgpack`, which is usually
+            smaller than `pickle` for JSON-like data. Packed values of at least `compress_threshold` bytes are
+            compressed when `compression` is set, if that makes them smaller. See `benchmarks/diskcache_disks.py`.
+
+        `datetime`, `UUID`, `Path` & registered `DictMixin` values are packed as msgpack ExtTypes (see `msgpack_utils.ext_types`).
+            Values msgpack can't serialize exactly fall back to `pickle`: other class instances, tuples
+            (msgpack would return them as lists, and a tuple dict key as an unhashable list), and subclasses
+            of built-in types. Caches written with the default (pickle) `Disk` can still be read. Keys are stored
+            the same way as the default `Disk`.
+
+        Options can be passed as cache settings prefixed with `disk_`, i.e.
+            `diskcache.Cache(directory, disk=MsgpackDisk, disk_compression="zlib", disk_compress_level=6)`.
+
+    Params:
+        directory (str): The cache's directory. Passed by `diskcache`.
+        compression (str|None): Compression for large values. One of `"zlib"`, `"lzma"` or `None`.
+        compress_threshold (int): [Default: 1024] Minimum size (in bytes) of a packed value to compress.
+        compress_level (int|None): zlib level (1-9) or lzma preset (0-9). Defaults to zlib's 6 & lzma's 6.
+    """
+
+    default_compression: str | None = None
+
+    def __init__(
+        self,
+        directory: str,
+        compression: str | None = None,
+        compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+        compress_level: int | None = None,
+        **kwargs,
+    ):
+        compression = compression or self.default_compression
+        assert compression in VALID_COMPRESSION, ValueError(
+            f"Invalid compression: '{compression}'. Must be one of {VALID_COMPRESSION}"
+        )
+
+        self.compression: str | None = compression
+        self.compress_threshold: int = compress_threshold
+        self.compress_level: int | None = compress_level
+
+        super().__init__(directory, **kwargs)
+
+    def _compress(self, packed: bytes) -> bytes:
+        if self.compression is None or len(packed) < self.compress_threshold:
+            return _HEADER_MSGPACK + packed
+
+        if self.compression == "zlib":
+            compressed: bytes = _HEADER_ZLIB + zlib.compress(
+                packed, self.compress_level if self.compress_level is not None else 6
+            )
+        else:
+            compressed: bytes = _HEADER_LZMA + lzma.compress(
+                packed, preset=self.compress_level
+            )
+
+        ## Incompressible data is stored as-is
+        return (
+            compressed
+            if len(compressed) < len(packed) + 1
+            else _HEADER_MSGPACK + packed
+        )
+
+    def encode(self, value: t.Any) -> bytes:
+        """Pack (& compress) a value into the bytes stored in the cache.
+
+        Raises:
+            TypeError: When msgpack can't serialize the value exactly, i.e. it contains a tuple
+
+        """
+        ## strict_types sends tuples & subclasses of built-in types to ext_default, which refuses them,
+        #  instead of packing them as (unhashable when used as dict keys) lists & base types
+        return self._compress(
+            msgpack.packb(
+                value, default=ext_default, use_bin_type=True, strict_types=True
+            )
+        )
+
+    def decode(self, data: bytes) -> t.Any:
+        """Unpack bytes produced by `encode()` (or a pickle, from a default `Disk`)."""
+        header: int = data[0]
+
+        if header == _PICKLE_PROTO:
+            return pickle.loads(data)
+
+        payload: memoryview = memoryview(data)[1:]
+        if header == _HEADER_ZLIB[0]:
+            payload = zlib.decompress(payload)
+        elif header == _HEADER_LZMA[0]:
+            payload = lzma.decompress(payload)
+        elif header != _HEADER_MSGPACK[0]:
+            raise ValueError(f"Unknown MsgpackDisk header byte: {header}")
+
+        return msgpack_unpackb(payload)
+
+    def store(
+        self, value: t.Any, read: bool, key: t.Any = UNKNOWN
+    ) -> tuple[int, int, str | None, t.Any]:
+        type_value: type = type(value)
+
+        if read or type_value in (str, bytes, int, float):
+            ## Stored natively by SQLite (or as a file), no serialization needed
+            return super().store(value, read, key=key)
+
+        try:
+            data: bytes = self.encode(value)
+        except (TypeError, ValueError, OverflowError) as exc:
+            log.debug(
+                f"Could not msgpack value of type {type_value.__name__}, falling back to pickle. Details: {exc}"
+            )
+
+            return super().store(value, read, key=key)
+
+        ## Reuse the pickle mode, so fetch() knows to decode the value
+        if len(data) < self.min_file_size:
+            return 0, MODE_PICKLE, None, sqlite3.Binary(data)
+
+        filename, full_path = self.filename(key, value)
+        self._write(full_path, io.BytesIO(data), "xb")
+
+        return len(data), MODE_PICKLE, filename, None
+
+    def fetch(self, mode: int, filename: str | None, value: t.Any, read: bool) -> t.Any:
+        if mode != MODE_PICKLE:
+            return super().fetch(mode, filename, value, read)
+
+        if value is None:
+            with open(op.join(self._directory, filename), "rb") as reader:
+                return self.decode(reader.read())
+
+        return self.decode(bytes(value))
+
+
+class ZlibMsgpackDisk(MsgpackDisk):
+    """A `MsgpackDisk` that zlib-compresses packed values of at least `compress_threshold` bytes."""
+
+    default_compression: str | None = "zlib"
+
+
+class LzmaMsgpackDisk(MsgpackDisk):
+    """A `MsgpackDisk` that lzma-compresses packed values. Smaller than zlib, but much slower to write."""
+
+    default_compression: str | None = "lzma"
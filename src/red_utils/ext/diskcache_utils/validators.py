@@ -6,7 +6,7 @@ from typing import Optional, Type, Union
 from .constants import valid_key_types, valid_tag_types, valid_val_types
 
 import diskcache
-from diskcache import Cache
+from diskcache import Cache, FanoutCache
 
 
 def validate_key(key: valid_key_types = None, none_ok: bool = False) -> Union[str, int]:
@@ -239,17 +239,19 @@ def validate_retry(retry: bool = None, none_ok: bool = True) -> bool:
             )
 
 
-def validate_cache(cache: Cache = None, none_ok: bool = True) -> diskcache.core.Cache:
+def validate_cache(
+    cache: Cache | FanoutCache = None, none_ok: bool = True
+) -> diskcache.core.Cache | diskcache.FanoutCache:
     """Validate a DiskCache cache object.
 
     Checks for existence and correct type.
 
     Params:
-        cache (diskcache.Cache): A `diskcache.Cache` instance to validate
+        cache (diskcache.Cache|diskcache.FanoutCache): A `diskcache.Cache` or `diskcache.FanoutCache` instance to validate
         none_ok (bool): Allow null values
 
     Returns:
-        (diskcache.Cache): The original `Cache` instance after validation passes
+        (diskcache.Cache|diskcache.FanoutCache): The original `Cache` instance after validation passes
 
     """
     ## Check existence
@@ -259,8 +261,8 @@ def validate_cache(cache: Cache = None, none_ok: bool = True) -> diskcache.core.
 
     else:
         ## Only validate an existing cache
-        assert isinstance(cache, Cache), TypeError(
-            f"Cache must be of type diskcache.Cache, not {type(cache)}"
+        assert isinstance(cache, (Cache, FanoutCache)), TypeError(
+            f"Cache must be of type diskcache.Cache or diskcache.FanoutCache, not {type(cache)}"
         )
 
     return cache
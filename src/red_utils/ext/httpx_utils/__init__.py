@@ -1,17 +1,36 @@
 from __future__ import annotations
 
+from importlib.util import find_spec
 import sys
 
 sys.path.append(".")
 
-from . import controllers, decoders, encoders, transports, validators
+from . import (
+    controllers,
+    decoders,
+    downloads,
+    encoders,
+    pagination,
+    transports,
+    validators,
+)
 from .cache_storages import (
     get_hishel_file_storage,
     get_hishel_inmemory_storage,
     get_hishel_sqlite_storage,
 )
 from .constants import default_headers
-from .controllers import HishelCacheClientController, HTTPXController
+from .controllers import (
+    AsyncHTTPXController,
+    AsyncSingleFlight,
+    ClientRegistry,
+    HishelCacheClientController,
+    HTTPXController,
+    SingleFlight,
+    default_client_registry,
+)
+from .downloads import download
+from .encoders import json_dumps, json_loads
 from .operations import (
     build_request,
     get_req_client,
@@ -19,10 +38,31 @@ from .operations import (
     merge_headers,
     update_headers,
 )
-from .transports import get_cache_transport
+from .pagination import (
+    CursorPagination,
+    LinkHeaderPagination,
+    OffsetPagination,
+    PageNumberPagination,
+    PaginationStrategy,
+    apaginate,
+    paginate,
+)
+from .transports import (
+    AsyncRateLimitTransport,
+    AsyncRetryTransport,
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimiter,
+    RateLimitTransport,
+    RetryTransport,
+    get_cache_transport,
+)
 from .validators import (
     valid_methods,
     validate_client,
     validate_headers,
     validate_method,
 )
+
+if find_spec("diskcache") and find_spec("msgpack"):
+    from .cache_storages import AsyncDiskCacheStorage, DiskCacheStorage
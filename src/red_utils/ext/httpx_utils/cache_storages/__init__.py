@@ -1,7 +1,17 @@
 from __future__ import annotations
 
+from importlib.util import find_spec
+
 from ._storages import (
     get_hishel_file_storage,
     get_hishel_inmemory_storage,
     get_hishel_sqlite_storage,
 )
+
+if find_spec("diskcache") and find_spec("msgpack"):
+    from ._diskcache_storage import (
+        AsyncDiskCacheStorage,
+        DiskCacheStorage,
+        MsgpackSerializer,
+        get_diskcache_storage,
+    )
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.httpx_utils.cache_storages")
+
+from datetime import datetime, timezone
+from pathlib import Path
+import time
+import typing as t
+
+from red_utils.ext.msgpack_utils import msgpack_packb, msgpack_unpackb
+
+import diskcache
+from hishel import AsyncBaseStorage, BaseSerializer, BaseStorage
+from httpcore import URL, Request, Response
+import httpx
+
+## Extensions hishel keeps when it serializes a request/response
+_RESPONSE_EXTENSIONS: tuple[str, ...] = ("http_version", "reason_phrase")
+_REQUEST_EXTENSIONS: tuple[str, ...] = ("timeout", "sni_hostname")
+## Bump when the layout of a packed cache entry changes. Entries with another version are treated as a miss.
+_MSGPACK_FORMAT_VERSION: int = 1
+
+
+class Metadata(t.TypedDict):
+    """The metadata hishel stores with each cached response."""
+
+    number_of_uses: int
+    created_at: datetime
+    cache_key: str
+
+
+StoredResponse = tuple[Response, Request, Metadata]
+
+
+def _normalized_url(url: URL) -> str:
+    return str(httpx.URL(bytes(url).decode("ascii")))
+
+
+class MsgpackSerializer(BaseSerializer):
+    """Serialize cached hishel responses to compact msgpack blobs.
+
+    Description:
+        Bodies & headers are stored as raw bytes, avoiding the base64 & text encoding the
+            default `hishel.JSONSerializer` does on every cache read & write.
+    """
+
+    def dumps(self, response: Response, request: Request, metadata: Metadata) -> bytes:
+        return msgpack_packb(
+            [
+                _MSGPACK_FORMAT_VERSION,
+                response.status,
+                response.headers,
+                response.content,
+                {
+                    k: v
+                    for k, v in response.extensions.items()
+                    if k in _RESPONSE_EXTENSIONS
+                },
+                request.method,
+                _normalized_url(request.url),
+                request.headers,
+                {
+                    k: v
+                    for k, v in request.extensions.items()
+                    if k in _REQUEST_EXTENSIONS
+                },
+                metadata["cache_key"],
+                metadata["number_of_uses"],
+                metadata["created_at"].timestamp(),
+            ]
+        )
+
+    def loads(self, data: bytes) -> StoredResponse:
+        (
+            version,
+            status,
+            headers,
+            content,
+            res_extensions,
+            method,
+            url,
+            req_headers,
+            req_extensions,
+            cache_key,
+            number_of_uses,
+            created_at,
+        ) = msgpack_unpackb(data)
+
+        if version != _MSGPACK_FORMAT_VERSION:
+            raise ValueError(f"Unsupported cache entry format version: {version}")
+
+        response: Response = Response(
+            status=status,
+            headers=[tuple(header) for header in headers],
+            content=content,
+            extensions=res_extensions,
+        )
+        request: Request = Request(
+            method=method,
+            url=url,
+            headers=[tuple(header) for header in req_headers],
+            extensions=req_extensions,
+        )
+        metadata: Metadata = Metadata(
+            cache_key=cache_key,
+            number_of_uses=number_of_uses,
+            created_at=datetime.fromtimestamp(created_at, tz=timezone.utc),
+        )
+
+        return response, request, metadata
+
+    @property
+    def is_binary(self) -> bool:
+        return True
+
+
+class _DiskCacheStorageBase:
+    """Shared `diskcache` logic for the sync & async storages."""
+
+    def __init__(
+        self,
+        cache: diskcache.Cache | diskcache.FanoutCache | None = None,
+        directory: t.Union[str, Path] = ".cache/hishel",
+        shards: int | None = None,
+        size_limit: int = 2**30,
+        eviction_policy: str = "least-recently-stored",
+        ttl: t.Union[int, float] | None = None,
+        tag: str | None = "hishel",
+        serializer: BaseSerializer | None = None,
+    ):
+        self._serializer: BaseSerializer = serializer or MsgpackSerializer()
+        self._ttl: t.Union[int, float] | None = ttl
+        self.tag: str | None = tag
+
+        ## Only close caches this storage opened
+        self._owns_cache: bool = cache is None
+
+        if cache is not None:
+            assert isinstance(
+                cache, (diskcache.Cache, diskcache.FanoutCache)
+            ), TypeError(
+                f"cache must be a diskcache.Cache or diskcache.FanoutCache. Got type: ({type(cache)})"
+            )
+            self.cache: diskcache.Cache | diskcache.FanoutCache = cache
+
+            return
+
+        settings: dict[str, t.Any] = {
+            "size_limit": size_limit,
+            "eviction_policy": eviction_policy,
+        }
+
+        try:
+            if shards:
+                self.cache = diskcache.FanoutCache(
+                    directory=str(directory), shards=shards, **settings
+                )
+            else:
+                self.cache = diskcache.Cache(directory=str(directory), **settings)
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception opening diskcache at '{directory}'. Details: {exc}"
+            )
+            log.error(msg)
+
+            raise exc
+
+    def _store(
+        self,
+        key: str,
+        response: Response,
+        request: Request,
+        metadata: Metadata | None = None,
+    ) -> None:
+        metadata = metadata or Metadata(
+            cache_key=key,
+            created_at=datetime.now(timezone.utc),
+            number_of_uses=0,
+        )
+
+        self.cache.set(
+            key,
+            self._serializer.dumps(
+                response=response, request=request, metadata=metadata
+            ),
+            expire=self._ttl,
+            tag=self.tag,
+        )
+
+    def _update_metadata(
+        self, key: str, response: Response, request: Request, metadata: Metadata
+    ) -> None:
+        value, expire_time = self.cache.get(key, expire_time=True)
+        if value is None:
+            return self._store(key, response, request, metadata)
+
+        stored_response, stored_request, _ = self._serializer.loads(value)
+        stored_response.read()
+        ## Keep the entry's original expiration
+        expire: float | None = (
+            max(expire_time - time.time(), 0) if expire_time is not None else None
+        )
+
+        self.cache.set(
+            key,
+            self._serializer.dumps(
+                response=stored_response, request=stored_request, metadata=metadata
+            ),
+            expire=expire,
+            tag=self.tag,
+        )
+
+    def _retrieve(self, key: str) -> StoredResponse | None:
+        value: bytes | None = self.cache.get(key)
+        if value is None:
+            return None
+
+        try:
+            return self._serializer.loads(value)
+        except Exception as exc:
+            log.warning(f"Discarding unreadable cache entry '{key}'. Details: {exc}")
+            self.cache.delete(key)
+
+            return None
+
+    def _close(self) -> None:
+        if self._owns_cache:
+            self.cache.close()
+
+
+class DiskCacheStorage(_DiskCacheStorageBase, BaseStorage):
+    """A `hishel` storage backed by a `diskcache.Cache` or `diskcache.FanoutCache`.
+
+    Description:
+        Responses are stored as msgpack blobs (see `MsgpackSerializer`). `diskcache` is process &
+            thread-safe, expires entries after `ttl` seconds and culls entries once the cache
+            grows past `size_limit` bytes, using `eviction_policy`. Pass `shards` to use a
+            `FanoutCache`, which spreads writes across shards to reduce lock contention.
+
+        Can be passed as `get_cache_transport(storage=...)` or `HishelCacheClientController(storage=...)`
+            in place of a `hishel.FileStorage`.
+
+    Params:
+        cache (diskcache.Cache|diskcache.FanoutCache|None): An existing cache to store responses in. If not provided,
+            one is created from `directory`, `shards`, `size_limit` & `eviction_policy`.
+        directory (str|Path): [Default: .cache/hishel] Directory for a new cache.
+        shards (int|None): Number of shards for a new `FanoutCache`. When `None`, a `diskcache.Cache` is created.
+        size_limit (int): [Default: 1GB] Size (in bytes) a new cache is culled to.
+        eviction_policy (str): [Default: least-recently-stored] The `diskcache` eviction policy for a new cache.
+        ttl (int|float|None): Seconds a response is kept for. `None` keeps responses until they are culled.
+        tag (str|None): [Default: hishel] Tag for stored responses, i.e. to `cache.evict("hishel")` in a shared cache.
+        serializer (hishel.BaseSerializer|None): Defaults to `MsgpackSerializer`. Must be a binary serializer.
+
+    Usage:
+    ``` py linenums="1"
+    storage = DiskCacheStorage(directory=".cache/http", shards=8, ttl=900)
+
+    transport = get_cache_transport(storage=storage)
+    ```
+    """
+
+    def store(
+        self,
+        key: str,
+        response: Response,
+        request: Request,
+        metadata: Metadata | None = None,
+    ) -> None:
+        self._store(key, response, request, metadata)
+
+    def update_metadata(
+        self, key: str, response: Response, request: Request, metadata: Metadata
+    ) -> None:
+        self._update_metadata(key, response, request, metadata)
+
+    def retrieve(self, key: str) -> StoredResponse | None:
+        return self._retrieve(key)
+
+    def close(self) -> None:
+        self._close()
+
+
+class AsyncDiskCacheStorage(_DiskCacheStorageBase, AsyncBaseStorage):
+    """Async version of `DiskCacheStorage`, for `hishel.AsyncCacheTransport` & `hishel.AsyncCacheClient`.
+
+    Description:
+        `diskcache` reads & writes are local and short, so they run directly on the event loop.
+
+    Params:
+        See `DiskCacheStorage`.
+    """
+
+    async def store(
+        self,
+        key: str,
+        response: Response,
+        request: Request,
+        metadata: Metadata | None = None,
+    ) -> None:
+        self._store(key, response, request, metadata)
+
+    async def update_metadata(
+        self, key: str, response: Response, request: Request, metadata: Metadata
+    ) -> None:
+        self._update_metadata(key, response, request, metadata)
+
+    async def retrieve(self, key: str) -> StoredResponse | None:
+        return self._retrieve(key)
+
+    async def aclose(self) -> None:
+        self._close()
+
+
+def get_diskcache_storage(
+    directory: t.Union[str, Path] = ".cache/hishel",
+    shards: int | None = None,
+    size_limit: int = 2**30,
+    ttl: t.Union[int, float] | None = None,
+) -> DiskCacheStorage:
+    try:
+        _storage: DiskCacheStorage = DiskCacheStorage(
+            directory=directory, shards=shards, size_limit=size_limit, ttl=ttl
+        )
+
+        return _storage
+    except Exception as exc:
+        msg = Exception(
+            f"Unhandled exception initializing DiskCacheStorage object. Details: {exc}"
+        )
+        log.error(msg)
+
+        raise exc
@@ -1,3 +1,19 @@
 from __future__ import annotations
 
 default_headers: dict[str, str] = {"Content-Type": "application/json"}
+
+## Maximum number of bytes passed to chardet when a response's encoding must be detected
+DEFAULT_DETECT_SAMPLE_SIZE: int = 64 * 1024
+
+## Number of bytes read from a streamed response at a time by the stream decoders
+DEFAULT_STREAM_CHUNK_SIZE: int = 64 * 1024
+## Largest single record (in characters) the stream decoders will buffer
+DEFAULT_STREAM_MAX_BUFFER_SIZE: int = 16 * 1024 * 1024
+
+## Number of bytes read from a response & written to disk at a time by download()
+DEFAULT_DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024
+## Size of each range request when download() splits a file into parallel requests
+DEFAULT_DOWNLOAD_PART_SIZE: int = 16 * 1024 * 1024
+
+## Request extension that opts a request out of singleflight coalescing, i.e. `extensions={"singleflight": False}`
+SINGLEFLIGHT_EXTENSION: str = "singleflight"
@@ -1,3 +1,13 @@
 from __future__ import annotations
 
+from ._async_controllers import AsyncHTTPXController
+from ._client_registry import ClientRegistry, default_client_registry
 from ._controllers import HishelCacheClientController, HTTPXController
+from ._singleflight import (
+    SINGLEFLIGHT_METHODS,
+    AsyncSingleFlight,
+    AsyncSingleFlightTransport,
+    SingleFlight,
+    SingleFlightTransport,
+    singleflight_key,
+)
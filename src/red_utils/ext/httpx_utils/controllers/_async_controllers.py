@@ -0,0 +1,558 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.httpx_utils.controllers")
+
+import asyncio
+from contextlib import AbstractAsyncContextManager
+import typing as t
+
+from ..decoders import autodetect_charset
+from ..pagination import PaginationStrategy, apaginate
+from ..transports import AsyncRateLimitTransport, AsyncRetryTransport, RateLimiter
+
+from ._limits import build_limits, validate_http_versions
+from ._singleflight import AsyncSingleFlight, AsyncSingleFlightTransport
+
+import hishel
+import httpx
+
+## Sentinel a gather worker puts on the results queue when it runs out of requests
+_WORKER_DONE: object = object()
+
+
+class AsyncHTTPXController(AbstractAsyncContextManager):
+    """Handler for an async HTTPX client.
+
+    Description:
+        Async counterpart to `HTTPXController`. Accepts the same constructor options, and adds
+        `gather_requests()`/`iter_requests()` for sending many requests concurrently with a
+        bounded number of requests in flight.
+
+    Params:
+        url (str|None): Scope the httpx client to a URL.
+        base_url (str|None): A base URL will be prefixed to each request.
+        proxy (str|None): <Not yet documented>
+        proxies (str|None): <Not yet documented>
+        mounts (dict[str, httpx.AsyncHTTPTransport]|None): A dict of `httpx.AsyncHTTPTransport` objects.
+        cookies (dict[str, Any]): <Not yet documented>
+        auth (httpx.Auth | None): <Not yet documented>
+        headers (dict[str, str]|None): Optional request headers to apply to all requests handled by controller instance.
+        params (dict[str, Any]|None): Optional request params to apply to all requests handled by controller instance.
+        follow_redirects (bool): [Default: False] Follow HTTP 302 redirects.
+        max_redirects (int|None): [Default: 20] Maximum number of HTTP 302 redirects to follow.
+        retries (int|None): Number of times to retry on request failure. When set, the client's transport is wrapped
+            in an `AsyncRetryTransport` (idempotent methods only, with exponential backoff).
+        timeout (int|float|None): Timeout (in seconds) until client gives up on request.
+        limits (httpx.Limits | None): Connection pool limits for the `httpx.AsyncClient`. Defaults to httpx's default limits.
+        max_connections (int|None): Override `limits.max_connections`, the maximum number of open connections.
+        max_keepalive_connections (int|None): Override `limits.max_keepalive_connections`, the maximum idle connections kept open.
+        keepalive_expiry (int|float|None): Override `limits.keepalive_expiry`, seconds an idle connection is kept open.
+        http1 (bool): [Default: True] Enable HTTP/1.1. Set to `False` (with `http2=True`) to use HTTP/2 "prior knowledge"
+            for `http://` URLs.
+        http2 (bool): [Default: False] Enable HTTP/2. Concurrent requests from `gather_requests()` are multiplexed over
+            a few connections instead of needing one connection each. Requires the `h2` package (`pip install httpx[http2]`).
+        transport (httpx.AsyncHTTPTransport|hishel.AsyncCacheTransport|None): A transport to pass to class's `httpx.AsyncClient` object.
+        default_encoding (str): [Default: utf-8] Set default encoding for all requests.
+        rate_limiter (RateLimiter|None): A (possibly shared) client-side rate limiter. Requests wait for a token
+            before being sent.
+        singleflight (AsyncSingleFlight|None): A (possibly shared) `AsyncSingleFlight`. Concurrent identical GET/HEAD requests are
+            collapsed into one upstream request, and the response is fanned out to every caller.
+        max_concurrency (int): [Default: 10] Maximum number of requests `gather_requests()` will have in flight at once.
+        max_per_host (int|None): [Default: None] Maximum number of in-flight requests to a single host. `None` means
+            only `max_concurrency` applies.
+
+    Usage:
+    ``` py linenums="1"
+    async with AsyncHTTPXController(max_concurrency=20, max_per_host=5) as ctl:
+        reqs = [ctl.new_request(url=url) for url in urls]
+        responses = await ctl.gather_requests(reqs)
+    ```
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        base_url: str | None = None,
+        proxy: str | None = None,
+        proxies: dict[str, str] | None = None,
+        mounts: dict[str, httpx.AsyncHTTPTransport] | None = {},
+        cookies: dict[str, t.Any] | None = {},
+        auth: httpx.Auth | None = None,
+        headers: dict[str, str] | None = {},
+        params: dict[str, t.Any] | None = {},
+        follow_redirects: bool = False,
+        max_redirects: int | None = 20,
+        retries: int | None = None,
+        timeout: t.Union[int, float] | None = 60,
+        limits: httpx.Limits | None = None,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry: t.Union[int, float] | None = None,
+        http1: bool = True,
+        http2: bool = False,
+        transport: (
+            t.Union[httpx.AsyncHTTPTransport, hishel.AsyncCacheTransport] | None
+        ) = None,
+        default_encoding: str = autodetect_charset,
+        rate_limiter: RateLimiter | None = None,
+        singleflight: AsyncSingleFlight | None = None,
+        max_concurrency: int = 10,
+        max_per_host: int | None = None,
+    ) -> None:
+        assert isinstance(max_concurrency, int) and max_concurrency > 0, ValueError(
+            f"max_concurrency must be a positive int. Got: ({max_concurrency})"
+        )
+        if max_per_host is not None:
+            assert isinstance(max_per_host, int) and max_per_host > 0, ValueError(
+                f"max_per_host must be a positive int or None. Got: ({max_per_host})"
+            )
+        validate_http_versions(http1=http1, http2=http2)
+
+        self.url: httpx.URL | None = httpx.URL(url) if url else None
+        self.base_url: httpx.URL | None = httpx.URL(base_url) if base_url else None
+        self.proxy: str | None = proxy
+        self.proxies: dict[str, str] | None = proxies
+        self.mounts: dict[str, httpx.AsyncHTTPTransport] | None = mounts
+        self.auth: httpx.Auth | None = auth
+        self.headers: dict[str, str] | None = headers
+        self.cookies: dict[str, t.Any] | None = cookies
+        self.params: dict[str, str] | None = params
+        self.follow_redirects: bool = follow_redirects
+        self.max_redirects: int | None = max_redirects
+        self.retries: int | None = retries
+        self.timeout: t.Union[int, float] | None = timeout
+        self.limits: httpx.Limits = build_limits(
+            limits=limits,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http1: bool = http1
+        self.http2: bool = http2
+        self.transport: (
+            t.Union[httpx.AsyncHTTPTransport, hishel.AsyncCacheTransport] | None
+        ) = transport
+        self.default_encoding: str = default_encoding
+        self.rate_limiter: RateLimiter | None = rate_limiter
+        self.singleflight: AsyncSingleFlight | None = singleflight
+        self.max_concurrency: int = max_concurrency
+        self.max_per_host: int | None = max_per_host
+
+        ## Placeholder for initialized httpx.AsyncClient
+        self.client: httpx.AsyncClient | None = None
+
+    def _get_transport(self):
+        """Return the transport for the client.
+
+        Description:
+            Wraps `self.transport` in an `AsyncRateLimitTransport` if `self.rate_limiter` is set, then in
+                an `AsyncRetryTransport` if `self.retries` is set, so every retry is rate limited.
+                Finally wraps it in an `AsyncSingleFlightTransport` if `self.singleflight` is set.
+        """
+        _transport = self.transport
+
+        if not _transport and (
+            self.rate_limiter or self.retries or self.singleflight is not None
+        ):
+            ## Wrapping transports need a base transport with the controller's pool settings
+            _transport = httpx.AsyncHTTPTransport(
+                proxy=self.proxy, limits=self.limits, http1=self.http1, http2=self.http2
+            )
+
+        if self.rate_limiter:
+            _transport = AsyncRateLimitTransport(
+                transport=_transport, limiter=self.rate_limiter
+            )
+
+        if self.retries and not isinstance(_transport, AsyncRetryTransport):
+            _transport = AsyncRetryTransport(
+                transport=_transport, max_retries=self.retries
+            )
+
+        if self.singleflight is not None:
+            _transport = AsyncSingleFlightTransport(
+                transport=_transport, group=self.singleflight
+            )
+
+        return _transport
+
+    async def __aenter__(self) -> t.Self:
+        """Execute when handler is called in an `async with` statement.
+
+        Description:
+            Creates an `httpx.AsyncClient` object, using class parameters as options.
+        """
+        _transport: httpx.AsyncBaseTransport | None = self._get_transport()
+        ## Proxy is configured on the base transport when one was built
+        _proxy: str | None = (
+            None if _transport is not None and not self.transport else self.proxy
+        )
+
+        try:
+            _client: httpx.AsyncClient = httpx.AsyncClient(
+                auth=self.auth,
+                params=self.params,
+                headers=self.headers,
+                cookies=self.cookies,
+                proxy=_proxy,
+                proxies=self.proxies,
+                mounts=self.mounts,
+                timeout=self.timeout,
+                follow_redirects=self.follow_redirects,
+                max_redirects=self.max_redirects,
+                limits=self.limits,
+                http1=self.http1,
+                http2=self.http2,
+                transport=_transport,
+                default_encoding=self.default_encoding,
+            )
+
+            ## If base_url is None, an exception occurs. Set self.base_url
+            #  only if base_url is not None.
+            if self.base_url:
+                _client.base_url = self.base_url
+
+            self.client = _client
+
+            return self
+
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception initializing httpx AsyncClient. Details: {exc}"
+            )
+            log.error(msg)
+
+            raise exc
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Execute when `async with` statement ends.
+
+        Description:
+            Show any exceptions/tracebacks. Close `self.client` on exit.
+
+        """
+        if exc_type:
+            log.error(f"({exc_type}): {exc_value}")
+
+        if traceback:
+            log.error(f"TRACE: {traceback}")
+
+        ## Close httpx client
+        if self.client:
+            await self.client.aclose()
+
+    def new_request(
+        self,
+        method: str = "GET",
+        url: str | httpx.URL = None,
+        files: list | None = None,
+        _json: t.Any | None = None,
+        params: dict | None = None,
+        headers: dict | None = {},
+        cookies: dict | None = None,
+        timeout: int | float | None = None,
+    ) -> httpx.Request:
+        """Assemble a new httpx.Request object from parts.
+
+        Params:
+            method (str): [Default: "GET"] HTTP method for request.
+            url (str|httpx.URL): URL to send request.
+            files (list|None): List of files to send with request. Only works with certain HTTP methods,
+                list `POST`.
+            _json (t.Any | None): JSON to append to request.
+            params (dict | None): Params to append to request.
+            headers (dict|None): Request headers.
+            cookies (dict): <Not yet documented>
+            timeout (int|float): Timeout (in seconds) before cancelling request.
+
+        Returns:
+            (httpx.Request): An initialized `httpx.Request` object.
+
+        """
+        assert method, ValueError("Missing a request method")
+        assert isinstance(method, str), TypeError(
+            f"method should be a string. Got type: ({type(method)})"
+        )
+
+        ## Ensure method is uppercase, i.e. 'get' -> 'GET'
+        method: str = method.upper()
+
+        assert url, ValueError("Missing a URL")
+        assert isinstance(url, str) or isinstance(url, httpx.URL), TypeError(
+            f"URL must be a string or httpx.URL. Got type: ({type(url)})"
+        )
+        if isinstance(url, str):
+            ## Convert URL from string into httpx.URL object
+            url: httpx.URL = httpx.URL(url=url)
+
+        if timeout:
+            assert (
+                isinstance(timeout, int) or isinstance(timeout, float)
+            ) and timeout > 0, TypeError(
+                f"timeout must be a non-zero positive int or float. Got type: ({type(timeout)})"
+            )
+
+        ## Build httpx.Request object
+        try:
+            _req: httpx.Request = self.client.build_request(
+                method=method,
+                url=url,
+                files=files,
+                json=_json,
+                params=params,
+                headers=headers,
+                cookies=cookies,
+                timeout=timeout,
+            )
+
+            return _req
+
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception creating httpx.Request object. Details: {exc}"
+            )
+            log.error(msg)
+
+            raise exc
+
+    async def send_request(
+        self,
+        request: httpx.Request = None,
+        stream: bool = False,
+        auth: httpx.Auth = None,
+        debug_response: bool = False,
+    ) -> httpx.Response:
+        """Send httpx.Request using self.client (and optional cache transport).
+
+        Params:
+            request (httpx.Request): An initialized `httpx.Request` object.
+            stream (bool): When `True`, response bytes will be streamed. This can be useful for large file downloads.
+            auth (httpx.Auth): <Not yet documented>
+
+        Returns:
+            (httpx.Response): An `httpx.Response` from the request.
+
+        """
+        assert request, ValueError("Missing an httpx.Request object")
+        assert isinstance(request, httpx.Request), TypeError(
+            f"Expected request to be an httpx.Request object. Got type: ({type(request)})"
+        )
+
+        try:
+            res: httpx.Response = await self.client.send(
+                request=request,
+                stream=stream,
+                auth=auth,
+                follow_redirects=self.follow_redirects,
+            )
+
+            if debug_response:
+                log.debug(
+                    f"URL: {request.url}, Response: [{res.status_code}: {res.reason_phrase}]"
+                )
+
+            return res
+
+        except httpx.ConnectError as conn_err:
+            ## Error connecting to remote
+            msg = Exception(
+                f"ConnectError while requesting URL {request.url}. Details: {conn_err}"
+            )
+            log.error(msg)
+
+            return
+        except Exception as exc:
+            msg = Exception(f"Unhandled exception sending request. Details: {exc}")
+            log.error(msg)
+
+            raise exc
+
+    async def iter_requests(
+        self,
+        requests: t.Iterable[httpx.Request] = None,
+        max_concurrency: int | None = None,
+        max_per_host: int | None = None,
+        return_exceptions: bool = False,
+    ) -> t.AsyncIterator[tuple[int, t.Union[httpx.Response, Exception]]]:
+        """Send requests concurrently, yielding each response as soon as it completes.
+
+        Description:
+            A fixed pool of `max_concurrency` workers pulls requests from `requests`, so the iterable
+                is consumed lazily and only `max_concurrency` requests are ever in flight. When
+                `max_per_host` is set, a worker waits for a free slot on the request's host before sending.
+
+        Params:
+            requests (Iterable[httpx.Request]): The requests to send. Can be a lazy generator.
+            max_concurrency (int|None): Override the controller's `max_concurrency` for this call.
+            max_per_host (int|None): Override the controller's `max_per_host` for this call.
+            return_exceptions (bool): When `True`, a failed request yields its exception instead of raising it.
+
+        Returns:
+            (AsyncIterator[tuple[int, httpx.Response|Exception]]): `(index, response)` tuples in completion order,
+                where `index` is the request's position in `requests`.
+
+        """
+        assert requests is not None, ValueError(
+            "Missing iterable of httpx.Request objects"
+        )
+        assert self.client, ValueError(
+            "Controller client is not initialized. Use AsyncHTTPXController in an 'async with' block."
+        )
+
+        max_concurrency: int = max_concurrency or self.max_concurrency
+        max_per_host: int | None = max_per_host or self.max_per_host
+
+        ## Workers share one iterator, so the input is never fully materialized
+        req_iter: t.Iterator[tuple[int, httpx.Request]] = enumerate(requests)
+        results: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency)
+        host_slots: dict[str, asyncio.Semaphore] = {}
+
+        async def _send(request: httpx.Request) -> httpx.Response:
+            assert isinstance(request, httpx.Request), TypeError(
+                f"Expected request to be an httpx.Request object. Got type: ({type(request)})"
+            )
+
+            if not max_per_host:
+                return await self.client.send(
+                    request=request, follow_redirects=self.follow_redirects
+                )
+
+            host: str = request.url.host
+            if host not in host_slots:
+                host_slots[host] = asyncio.Semaphore(max_per_host)
+
+            async with host_slots[host]:
+                return await self.client.send(
+                    request=request, follow_redirects=self.follow_redirects
+                )
+
+        async def _worker() -> None:
+            try:
+                for idx, request in req_iter:
+                    try:
+                        res: t.Union[httpx.Response, Exception] = await _send(request)
+                    except Exception as exc:
+                        log.error(
+                            f"Unhandled exception sending request #{idx}. Details: {exc}"
+                        )
+                        res = exc
+
+                    await results.put((idx, res))
+
+            except Exception as exc:
+                ## The requests iterable itself raised, there is no index to report
+                await results.put((None, exc))
+
+            await results.put(_WORKER_DONE)
+
+        workers: list[asyncio.Task] = [
+            asyncio.create_task(_worker()) for _ in range(max_concurrency)
+        ]
+        workers_done: int = 0
+
+        try:
+            while workers_done < max_concurrency:
+                item = await results.get()
+
+                if item is _WORKER_DONE:
+                    workers_done += 1
+                    continue
+
+                idx, res = item
+
+                if isinstance(res, Exception) and (
+                    idx is None or not return_exceptions
+                ):
+                    raise res
+
+                yield idx, res
+
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def gather_requests(
+        self,
+        requests: t.Iterable[httpx.Request] = None,
+        max_concurrency: int | None = None,
+        max_per_host: int | None = None,
+        ordered: bool = True,
+        return_exceptions: bool = False,
+    ) -> list[t.Union[httpx.Response, Exception]]:
+        """Send requests concurrently and collect the responses.
+
+        Params:
+            requests (Iterable[httpx.Request]): The requests to send.
+            max_concurrency (int|None): Override the controller's `max_concurrency` for this call.
+            max_per_host (int|None): Override the controller's `max_per_host` for this call.
+            ordered (bool): [Default: True] When `True`, responses are returned in the same order as `requests`.
+                When `False`, responses are returned in the order they completed.
+            return_exceptions (bool): When `True`, a failed request's exception is placed in the results instead of raised.
+
+        Returns:
+            (list[httpx.Response|Exception]): The responses (or exceptions) for each request.
+
+        """
+        completed: list[tuple[int, t.Union[httpx.Response, Exception]]] = [
+            item
+            async for item in self.iter_requests(
+                requests=requests,
+                max_concurrency=max_concurrency,
+                max_per_host=max_per_host,
+                return_exceptions=return_exceptions,
+            )
+        ]
+
+        if ordered:
+            completed.sort(key=lambda item: item[0])
+
+        return [res for _, res in completed]
+
+    def paginate(
+        self,
+        request: httpx.Request = None,
+        strategy: PaginationStrategy = None,
+        prefetch: int = 2,
+        max_pages: int | None = None,
+        raise_for_status: bool = True,
+    ) -> t.AsyncIterator[t.Any]:
+        """Yield the records from every page of a paginated API, prefetching pages in tasks.
+
+        Usage:
+        ``` py linenums="1"
+        async with AsyncHTTPXController() as ctl:
+            req = ctl.new_request(url="https://api.example.com/items")
+
+            async for item in ctl.paginate(request=req, strategy=LinkHeaderPagination()):
+                ...
+        ```
+
+        Params:
+            request (httpx.Request): The request for the first page, i.e. from `new_request()`.
+            strategy (PaginationStrategy): i.e. `OffsetPagination`, `PageNumberPagination`, `CursorPagination`
+                or `LinkHeaderPagination`.
+            prefetch (int): [Default: 2] Number of pages to request ahead of the caller.
+            max_pages (int|None): Stop after this many pages.
+            raise_for_status (bool): [Default: True] Raise `httpx.HTTPStatusError` on an error response.
+
+        Returns:
+            (AsyncIterator[Any]): Each record, across all pages. See `red_utils.ext.httpx_utils.pagination.apaginate()`.
+
+        """
+        assert self.client, ValueError(
+            "Controller client is not initialized. Use AsyncHTTPXController in an 'async with' block."
+        )
+
+        return apaginate(
+            client=self.client,
+            request=request,
+            strategy=strategy,
+            prefetch=prefetch,
+            max_pages=max_pages,
+            raise_for_status=raise_for_status,
+            follow_redirects=self.follow_redirects,
+        )
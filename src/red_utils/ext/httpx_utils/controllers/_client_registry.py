@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.httpx_utils.controllers")
+
+import atexit
+from dataclasses import dataclass, field
+import threading
+import time
+import typing as t
+
+import httpx
+
+
+@dataclass
+class _PooledTransport:
+    transport: httpx.BaseTransport
+    borrowed: int = field(default=0)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class _BorrowedTransport(httpx.BaseTransport):
+    """Hand a pooled transport to a client without letting the client close it.
+
+    Description:
+        `httpx.Client.close()` closes its transport. Closing a borrowed transport instead
+            returns it to the `ClientRegistry`, keeping its keep-alive connections open.
+    """
+
+    def __init__(self, registry: ClientRegistry, key: t.Hashable):
+        self._registry: ClientRegistry = registry
+        self._key: t.Hashable = key
+        self._transport: httpx.BaseTransport = registry._entries[key].transport
+        self._released: bool = False
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._transport.handle_request(request)
+
+    def close(self) -> None:
+        if not self._released:
+            self._released = True
+            self._registry.release(self._key)
+
+
+class ClientRegistry:
+    """A registry of long-lived, pooled HTTP transports shared between controller instances.
+
+    Description:
+        An `httpx.Client`'s connection pool lives in its transport. Controllers created with a
+            `client_registry` borrow a pooled transport keyed by their connection settings instead
+            of building (and tearing down) a new one in every `with` block, so keep-alive
+            connections & TLS sessions survive across context manager blocks. Per-controller
+            options like headers, auth & timeouts stay on the controller's own lightweight client.
+
+        Transports that have not been borrowed for `idle_timeout` seconds are closed the next time
+            the registry is used, or when `evict_idle()` is called. Call `shutdown()` to close all of them.
+
+    Params:
+        idle_timeout (int|float): [Default: 300] Seconds an unused transport is kept open.
+
+    Usage:
+    ``` py linenums="1"
+    registry = ClientRegistry(idle_timeout=60)
+
+    for url in urls:
+        with HTTPXController(client_registry=registry) as ctl:
+            ## Reuses the connection opened by the previous iteration
+            ctl.send_request(ctl.new_request(url=url))
+
+    registry.shutdown()
+    ```
+    """
+
+    def __init__(self, idle_timeout: t.Union[int, float] = 300):
+        self.idle_timeout: t.Union[int, float] = idle_timeout
+
+        self._entries: dict[t.Hashable, _PooledTransport] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self) -> t.Self:
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.shutdown()
+
+    def borrow(
+        self,
+        key: t.Hashable = None,
+        factory: t.Callable[[], httpx.BaseTransport] = None,
+    ) -> httpx.BaseTransport:
+        """Borrow the pooled transport for `key`, creating it with `factory()` if it does not exist.
+
+        Params:
+            key (Hashable): The connection settings the transport was built from.
+            factory (Callable[[], httpx.BaseTransport]): Builds a new transport for `key`.
+
+        Returns:
+            (httpx.BaseTransport): A transport that returns itself to the registry when closed.
+
+        """
+        self.evict_idle()
+
+        with self._lock:
+            entry: _PooledTransport | None = self._entries.get(key)
+
+            if entry is None:
+                log.debug(f"Creating pooled transport for key: {key}")
+                entry = _PooledTransport(transport=factory())
+                self._entries[key] = entry
+
+            entry.borrowed += 1
+            entry.last_used = time.monotonic()
+
+            return _BorrowedTransport(registry=self, key=key)
+
+    def release(self, key: t.Hashable = None) -> None:
+        """Return a borrowed transport to the registry."""
+        with self._lock:
+            entry: _PooledTransport | None = self._entries.get(key)
+
+            if entry:
+                entry.borrowed = max(0, entry.borrowed - 1)
+                entry.last_used = time.monotonic()
+
+    def evict_idle(self) -> int:
+        """Close pooled transports that have not been borrowed for `idle_timeout` seconds.
+
+        Returns:
+            (int): The number of transports closed.
+
+        """
+        now: float = time.monotonic()
+
+        with self._lock:
+            idle_keys: list[t.Hashable] = [
+                key
+                for key, entry in self._entries.items()
+                if entry.borrowed == 0 and now - entry.last_used >= self.idle_timeout
+            ]
+            idle: list[_PooledTransport] = [self._entries.pop(key) for key in idle_keys]
+
+        for entry in idle:
+            self._close_entry(entry)
+
+        return len(idle)
+
+    def shutdown(self) -> None:
+        """Close every pooled transport, including ones that are still borrowed."""
+        with self._lock:
+            entries: list[_PooledTransport] = list(self._entries.values())
+            self._entries.clear()
+
+        for entry in entries:
+            self._close_entry(entry)
+
+    @staticmethod
+    def _close_entry(entry: _PooledTransport) -> None:
+        try:
+            entry.transport.close()
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception closing pooled transport. Details: {exc}"
+            )
+            log.error(msg)
+
+
+## A process-wide registry for controllers that do not need their own
+default_client_registry: ClientRegistry = ClientRegistry()
+atexit.register(default_client_registry.shutdown)
@@ -6,12 +6,18 @@ log = logging.getLogger("red_utils.ext.httpx_utils.controllers")
 
 
 from contextlib import AbstractContextManager, contextmanager
-import json
 from pathlib import Path
 import typing as t
 
-## For auto detecting response character set
-import chardet
+from ..constants import DEFAULT_DOWNLOAD_CHUNK_SIZE, DEFAULT_DOWNLOAD_PART_SIZE
+from ..decoders import autodetect_charset, decode_res_content
+from ..downloads import download
+from ..pagination import PaginationStrategy, paginate
+from ..transports import RateLimiter, RateLimitTransport, RetryTransport
+from ._client_registry import ClientRegistry
+from ._limits import build_limits, validate_http_versions
+from ._singleflight import SingleFlight, SingleFlightTransport
+
 import hishel
 import httpx
 
@@ -26,28 +32,6 @@ HISHEL_STORAGE_UNION = t.Union[
 hishel_storage_type = t.Annotated[HISHEL_STORAGE_UNION, "A Hishel cache storage"]
 
 
-def autodetect_charset(content: bytes = None):
-    """Attempt to automatically detect encoding from input bytestring."""
-    try:
-        ## Detect encoding from bytes
-        _encoding: str | None = chardet.detect(byte_str=content).get("encoding")
-
-        if not _encoding:
-            ## Default to utf-8
-            _encoding = "utf-8"
-
-        return _encoding
-
-    except Exception as exc:
-        msg = Exception(
-            f"Unhandled exception auto-detecting character set for input bytestring. Details: {exc}"
-        )
-        log.error(msg)
-        log.warning("Defaulting to utf-8")
-
-        return "utf-8"
-
-
 class HTTPXController(AbstractContextManager):
     """Handler for HTTPX client.
 
@@ -64,11 +48,26 @@ class HTTPXController(AbstractContextManager):
         params (dict[str, Any]|None): Optional request params to apply to all requests handled by controller instance.
         follow_redirects (bool): [Default: False] Follow HTTP 302 redirects.
         max_redirects (int|None): [Default: 20] Maximum number of HTTP 302 redirects to follow.
-        retries (int|None): Number of times to retry on request failure.
+        retries (int|None): Number of times to retry on request failure. When set, the client's transport is wrapped
+            in a `RetryTransport` (idempotent methods only, with exponential backoff).
         timeout (int|float|None): Timeout (in seconds) until client gives up on request.
-        limits (httpx.Limits | None): <Not yet documented>
+        limits (httpx.Limits | None): Connection pool limits. Defaults to httpx's default limits.
+        max_connections (int|None): Override `limits.max_connections`, the maximum number of open connections.
+        max_keepalive_connections (int|None): Override `limits.max_keepalive_connections`, the maximum idle connections kept open.
+        keepalive_expiry (int|float|None): Override `limits.keepalive_expiry`, seconds an idle connection is kept open.
+        http1 (bool): [Default: True] Enable HTTP/1.1. Set to `False` (with `http2=True`) to use HTTP/2 "prior knowledge"
+            for `http://` URLs.
+        http2 (bool): [Default: False] Enable HTTP/2, negotiated with the server. Many concurrent requests to a host are
+            multiplexed over a few connections. Requires the `h2` package (`pip install httpx[http2]`).
         transport (httpx.HTTPTransport|hishel.CacheTransport|None): A transport to pass to class's `httpx.Client` object.
+            When set, the transport's own pool limits & HTTP versions are used.
         default_encoding (str): [Default: utf-8] Set default encoding for all requests.
+        rate_limiter (RateLimiter|None): A (possibly shared) client-side rate limiter. Requests wait for a token
+            before being sent.
+        singleflight (SingleFlight|None): A (possibly shared) `SingleFlight`. Concurrent identical GET/HEAD requests are
+            collapsed into one upstream request, and the response is fanned out to every caller.
+        client_registry (ClientRegistry|None): Opt in to borrowing a long-lived, pooled transport from a registry
+            (i.e. `default_client_registry`), so keep-alive connections are reused across `with` blocks.
 
     """
 
@@ -88,9 +87,19 @@ class HTTPXController(AbstractContextManager):
         retries: int | None = None,
         timeout: t.Union[int, float] | None = 60,
         limits: httpx.Limits | None = None,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry: t.Union[int, float] | None = None,
+        http1: bool = True,
+        http2: bool = False,
         transport: t.Union[httpx.HTTPTransport, hishel.CacheTransport] | None = None,
         default_encoding: str = autodetect_charset,
+        rate_limiter: RateLimiter | None = None,
+        singleflight: SingleFlight | None = None,
+        client_registry: ClientRegistry | None = None,
     ) -> None:
+        validate_http_versions(http1=http1, http2=http2)
+
         self.url: httpx.URL | None = httpx.URL(url) if url else None
         self.base_url: httpx.URL | None = httpx.URL(base_url) if base_url else None
         self.proxy: str | None = proxy
@@ -104,35 +113,110 @@ class HTTPXController(AbstractContextManager):
         self.max_redirects: int | None = max_redirects
         self.retries: int | None = retries
         self.timeout: t.Union[int, float] | None = timeout
-        self.limits: httpx.Limits | None = limits
+        self.limits: httpx.Limits = build_limits(
+            limits=limits,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http1: bool = http1
+        self.http2: bool = http2
         self.transport: t.Union[httpx.HTTPTransport, hishel.CacheTransport] | None = (
             transport
         )
         self.default_encoding: str = default_encoding
+        self.rate_limiter: RateLimiter | None = rate_limiter
+        self.singleflight: SingleFlight | None = singleflight
+        self.client_registry: ClientRegistry | None = client_registry
 
         ## Placeholder for initialized httpx.Client
         self.client: httpx.Client | None = None
 
+    def _registry_key(self) -> tuple:
+        """Return the connection settings a pooled transport is shared on."""
+        _limits: tuple = (
+            self.limits.max_connections,
+            self.limits.max_keepalive_connections,
+            self.limits.keepalive_expiry,
+        )
+
+        return (self.proxy, _limits, self.http1, self.http2, self.transport)
+
+    def _new_base_transport(self) -> httpx.BaseTransport:
+        """Return `self.transport`, or a new `httpx.HTTPTransport` built from the controller's connection settings."""
+        if self.transport:
+            return self.transport
+
+        return httpx.HTTPTransport(
+            proxy=self.proxy, limits=self.limits, http1=self.http1, http2=self.http2
+        )
+
+    def _wraps_transport(self) -> bool:
+        return bool(self.rate_limiter or self.retries or self.singleflight is not None)
+
+    def _get_transport(self, base_transport: httpx.BaseTransport | None = None):
+        """Return the transport for the client.
+
+        Description:
+            Wraps `base_transport` (or `self.transport`) in a `RateLimitTransport` if `self.rate_limiter`
+                is set, then in a `RetryTransport` if `self.retries` is set, so every retry is rate limited.
+                Finally wraps it in a `SingleFlightTransport` if `self.singleflight` is set.
+        """
+        _transport = base_transport or self.transport
+
+        if self.rate_limiter:
+            _transport = RateLimitTransport(
+                transport=_transport, limiter=self.rate_limiter
+            )
+
+        if self.retries and not isinstance(_transport, RetryTransport):
+            _transport = RetryTransport(transport=_transport, max_retries=self.retries)
+
+        if self.singleflight is not None:
+            _transport = SingleFlightTransport(
+                transport=_transport, group=self.singleflight
+            )
+
+        return _transport
+
     def __enter__(self) -> t.Self:
         """Execute when handler is called in a `with` statement.
 
         Description:
             Creates an `httpx.Client` object, using class parameters as options.
         """
+        _proxy: str | None = self.proxy
+        _base_transport: httpx.BaseTransport | None = None
+
+        if self.client_registry is not None:
+            _base_transport = self.client_registry.borrow(
+                key=self._registry_key(), factory=self._new_base_transport
+            )
+        elif not self.transport and self._wraps_transport():
+            ## Wrapping transports need a base transport with the controller's pool settings
+            _base_transport = self._new_base_transport()
+
+        if _base_transport is not None and not self.transport:
+            ## Proxy is configured on the base transport
+            _proxy = None
+
         try:
             _client: httpx.Client = httpx.Client(
                 auth=self.auth,
                 params=self.params,
                 headers=self.headers,
                 cookies=self.cookies,
-                proxy=self.proxy,
+                proxy=_proxy,
                 proxies=self.proxies,
                 mounts=self.mounts,
                 timeout=self.timeout,
                 follow_redirects=self.follow_redirects,
                 max_redirects=self.max_redirects,
                 # base_url=self.base_url,
-                transport=self.transport,
+                limits=self.limits,
+                http1=self.http1,
+                http2=self.http2,
+                transport=self._get_transport(_base_transport),
                 default_encoding=self.default_encoding,
             )
 
@@ -298,7 +382,10 @@ class HTTPXController(AbstractContextManager):
             raise exc
 
     def decode_res_content(self, res: httpx.Response = None) -> dict:
-        """Use multiple methods to attempt to decode an `httpx.Response.content` bytestring.
+        """Decode an `httpx.Response.content` bytestring into a dict.
+
+        Description:
+            See `red_utils.ext.httpx_utils.decoders.decode_res_content()` for the encoding strategies used.
 
         Params:
             res (httpx.Response): An `httpx.Response` object, with `.content` to be decoded.
@@ -307,84 +394,102 @@ class HTTPXController(AbstractContextManager):
             (dict): A `dict` from the `httpx.Response`'s `.content` param.
 
         """
-        assert res, ValueError("Missing httpx Response object")
-        assert isinstance(res, httpx.Response), TypeError(
-            f"res must be of type httpx.Response. Got type: ({type(res)})"
-        )
-
-        _content: bytes = res.content
-        assert _content, ValueError("Response content is empty")
-        assert isinstance(_content, bytes), TypeError(
-            f"Expected response.content to be a bytestring. Got type: ({type(_content)})"
-        )
+        return decode_res_content(res=res)
 
-        ## Get content's encoding, or default to 'utf-8'
-        try:
-            decode_charset: str = autodetect_charset(content=_content)
-        except Exception as exc:
-            msg = Exception(
-                f"Unhandled exception detecting response content's encoding. Details: {exc}"
-            )
-            log.error(msg)
-            log.warning("Defaulting to 'utf-8'")
-
-            decode_charset: str = "utf-8"
+    def paginate(
+        self,
+        request: httpx.Request = None,
+        strategy: PaginationStrategy = None,
+        prefetch: int = 2,
+        max_pages: int | None = None,
+        raise_for_status: bool = True,
+    ) -> t.Iterator[t.Any]:
+        """Yield the records from every page of a paginated API, prefetching pages in the background.
+
+        Usage:
+        ``` py linenums="1"
+        with HTTPXController() as ctl:
+            req = ctl.new_request(url="https://api.example.com/items")
+
+            for item in ctl.paginate(request=req, strategy=OffsetPagination(page_size=500, records_path="data")):
+                ...
+        ```
 
-        ## Decode content
-        try:
-            _decode: str = res.content.decode(decode_charset)
+        Params:
+            request (httpx.Request): The request for the first page, i.e. from `new_request()`.
+            strategy (PaginationStrategy): i.e. `OffsetPagination`, `PageNumberPagination`, `CursorPagination`
+                or `LinkHeaderPagination`.
+            prefetch (int): [Default: 2] Number of pages to request ahead of the caller.
+            max_pages (int|None): Stop after this many pages.
+            raise_for_status (bool): [Default: True] Raise `httpx.HTTPStatusError` on an error response.
 
-        except Exception as exc:
-            ## Decoding failed, retry with different encodings
-            msg = Exception(
-                f"[Attempt 1/2] Unhandled exception decoding response content. Details: {exc}"
-            )
-            log.warning(msg)
+        Returns:
+            (Iterator[Any]): Each record, across all pages. See `red_utils.ext.httpx_utils.pagination.paginate()`.
 
-            if not res.encoding == "utf-8":
-                ## Try decoding again, using response's .encoding param
-                log.warning(
-                    f"Retrying response content decode with encoding '{res.encoding}'"
-                )
-                try:
-                    _decode = res.content.decode(res.encoding)
-                except Exception as exc:
-                    inner_msg = Exception(
-                        f"[Attempt 2/2] Unhandled exception decoding response content. Details: {exc}"
-                    )
-                    log.error(inner_msg)
+        """
+        assert self.client, ValueError(
+            "Controller client is not initialized. Use the controller in a 'with' block."
+        )
 
-                    raise inner_msg
+        return paginate(
+            client=self.client,
+            request=request,
+            strategy=strategy,
+            prefetch=prefetch,
+            max_pages=max_pages,
+            raise_for_status=raise_for_status,
+            follow_redirects=self.follow_redirects,
+        )
 
-            else:
-                ## Decoding with utf-8 failed, attempt with ISO-8859-1
-                #  https://en.wikipedia.org/wiki/ISO/IEC_8859-1
-                log.warning(
-                    "Detected UTF-8 encoding, but decoding as UTF-8 failed. Retrying with encoding ISO-8859-1."
-                )
-                try:
-                    _decode = res.content.decode("ISO-8859-1")
-                except Exception as exc:
-                    msg = Exception(
-                        f"Failure attempting to decode content as UTF-8 and ISO-8859-1. Details: {exc}"
-                    )
-                    log.error(msg)
+    def download(
+        self,
+        url: t.Union[str, httpx.URL] = None,
+        dest: t.Union[str, Path] = None,
+        checksum: str | None = None,
+        hash_algorithm: str = "sha256",
+        chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE,
+        part_size: int = DEFAULT_DOWNLOAD_PART_SIZE,
+        max_workers: int = 4,
+        resume: bool = True,
+        overwrite: bool = False,
+    ) -> Path:
+        """Stream a file to disk with the controller's client.
 
-                    raise exc
+        Description:
+            Partial downloads are resumed with a `Range` request, and large files are split into parallel
+                range requests when the server supports them. See `red_utils.ext.httpx_utils.downloads.download()`.
 
-        ## Load decoded content into dict
-        try:
-            _json: dict = json.loads(_decode)
+        Params:
+            url (str|httpx.URL): The file's URL.
+            dest (str|Path): File path (or directory) to save the download to.
+            checksum (str|None): The file's expected hex digest, verified with `red_utils.std.hash_utils`.
+            hash_algorithm (str): [Default: sha256] The `hashlib` algorithm `checksum` was computed with.
+            chunk_size (int): Number of bytes written to disk at a time.
+            part_size (int): Size of each range in a parallel download.
+            max_workers (int): [Default: 4] Maximum parallel range requests.
+            resume (bool): [Default: True] Resume an existing partial download.
+            overwrite (bool): [Default: False] Replace `dest` if it already exists.
 
-            return _json
+        Returns:
+            (Path): The path of the downloaded file.
 
-        except Exception as exc:
-            msg = Exception(
-                f"Unhandled exception loading decoded response content to dict. Details: {exc}"
-            )
-            log.error(msg)
+        """
+        assert self.client, ValueError(
+            "Controller client is not initialized. Use the controller in a 'with' block."
+        )
 
-            raise exc
+        return download(
+            client=self.client,
+            url=url,
+            dest=dest,
+            checksum=checksum,
+            hash_algorithm=hash_algorithm,
+            chunk_size=chunk_size,
+            part_size=part_size,
+            max_workers=max_workers,
+            resume=resume,
+            overwrite=overwrite,
+        )
 
 
 class HishelCacheClientController(AbstractContextManager):
@@ -399,6 +504,14 @@ class HishelCacheClientController(AbstractContextManager):
         force_cache (bool): ...
         storage (hishel.FileStorage | hishel.RedisStorage | hishel.SQLiteStorage | hishel.S3Storage | hishel.InMemoryStorage): ...
         follow_redirects (bool): ...
+        singleflight (SingleFlight|None): A (possibly shared) `SingleFlight`. Concurrent identical GET/HEAD cache misses
+            are collapsed into one request to the origin, preventing a cache stampede when an entry expires.
+        limits (httpx.Limits | None): Connection pool limits. Defaults to httpx's default limits.
+        max_connections (int|None): Override `limits.max_connections`.
+        max_keepalive_connections (int|None): Override `limits.max_keepalive_connections`.
+        keepalive_expiry (int|float|None): Override `limits.keepalive_expiry`.
+        http1 (bool): [Default: True] Enable HTTP/1.1.
+        http2 (bool): [Default: False] Enable HTTP/2. Requires the `h2` package (`pip install httpx[http2]`).
     """
 
     def __init__(
@@ -411,7 +524,16 @@ class HishelCacheClientController(AbstractContextManager):
         force_cache: bool = False,
         storage: hishel_storage_type = None,
         follow_redirects: bool = False,
+        singleflight: SingleFlight | None = None,
+        limits: httpx.Limits | None = None,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry: t.Union[int, float] | None = None,
+        http1: bool = True,
+        http2: bool = False,
     ):
+        validate_http_versions(http1=http1, http2=http2)
+
         self.cacheable_methods = cacheable_methods
         self.cacheable_status_codes = cacheable_status_codes
         self.allow_heuristics = allow_heuristics
@@ -420,6 +542,15 @@ class HishelCacheClientController(AbstractContextManager):
         self.force_cache = force_cache
         self.storage = storage
         self.follow_redirects = follow_redirects
+        self.singleflight = singleflight
+        self.limits: httpx.Limits = build_limits(
+            limits=limits,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http1: bool = http1
+        self.http2: bool = http2
 
         ## Placeholder for initialized hishel.Controller
         self.controller: hishel.Controller = None
@@ -446,8 +577,26 @@ class HishelCacheClientController(AbstractContextManager):
             raise exc
 
         try:
+            ## The cache wraps the client's transport, so coalescing happens on cache misses
+            _transport: dict[str, SingleFlightTransport] = (
+                {
+                    "transport": SingleFlightTransport(
+                        transport=httpx.HTTPTransport(
+                            limits=self.limits, http1=self.http1, http2=self.http2
+                        ),
+                        group=self.singleflight,
+                    )
+                }
+                if self.singleflight is not None
+                else {}
+            )
             _client: hishel.CacheClient = hishel.CacheClient(
-                controller=self.controller, storage=self.storage
+                controller=self.controller,
+                storage=self.storage,
+                limits=self.limits,
+                http1=self.http1,
+                http2=self.http2,
+                **_transport,
             )
             self.client = _client
         except Exception as exc:
@@ -595,7 +744,10 @@ class HishelCacheClientController(AbstractContextManager):
             raise exc
 
     def decode_res_content(self, res: httpx.Response = None) -> dict:
-        """Use multiple methods to attempt to decode an `httpx.Response.content` bytestring.
+        """Decode an `httpx.Response.content` bytestring into a dict.
+
+        Description:
+            See `red_utils.ext.httpx_utils.decoders.decode_res_content()` for the encoding strategies used.
 
         Params:
             res (httpx.Response): An `httpx.Response` object, with `.content` to be decoded.
@@ -604,81 +756,49 @@ class HishelCacheClientController(AbstractContextManager):
             (dict): A `dict` from the `httpx.Response`'s `.content` param.
 
         """
-        assert res, ValueError("Missing httpx Response object")
-        assert isinstance(res, httpx.Response), TypeError(
-            f"res must be of type httpx.Response. Got type: ({type(res)})"
-        )
-
-        _content: bytes = res.content
-        assert _content, ValueError("Response content is empty")
-        assert isinstance(_content, bytes), TypeError(
-            f"Expected response.content to be a bytestring. Got type: ({type(_content)})"
-        )
-
-        ## Get content's encoding, or default to 'utf-8'
-        try:
-            decode_charset: str = autodetect_charset(content=_content)
-        except Exception as exc:
-            msg = Exception(
-                f"Unhandled exception detecting response content's encoding. Details: {exc}"
-            )
-            log.error(msg)
-            log.warning("Defaulting to 'utf-8'")
-
-            decode_charset: str = "utf-8"
-
-        ## Decode content
-        try:
-            _decode: str = res.content.decode(decode_charset)
-
-        except Exception as exc:
-            ## Decoding failed, retry with different encodings
-            msg = Exception(
-                f"[Attempt 1/2] Unhandled exception decoding response content. Details: {exc}"
-            )
-            log.warning(msg)
-
-            if not res.encoding == "utf-8":
-                ## Try decoding again, using response's .encoding param
-                log.warning(
-                    f"Retrying response content decode with encoding '{res.encoding}'"
-                )
-                try:
-                    _decode = res.content.decode(res.encoding)
-                except Exception as exc:
-                    inner_msg = Exception(
-                        f"[Attempt 2/2] Unhandled exception decoding response content. Details: {exc}"
-                    )
-                    log.error(inner_msg)
-
-                    raise inner_msg
-
-            else:
-                ## Decoding with utf-8 failed, attempt with ISO-8859-1
-                #  https://en.wikipedia.org/wiki/ISO/IEC_8859-1
-                log.warning(
-                    "Detected UTF-8 encoding, but decoding as UTF-8 failed. Retrying with encoding ISO-8859-1."
-                )
-                try:
-                    _decode = res.content.decode("ISO-8859-1")
-                except Exception as exc:
-                    msg = Exception(
-                        f"Failure attempting to decode content as UTF-8 and ISO-8859-1. Details: {exc}"
-                    )
-                    log.error(msg)
+        return decode_res_content(res=res)
 
-                    raise exc
+    def paginate(
+        self,
+        request: httpx.Request = None,
+        strategy: PaginationStrategy = None,
+        prefetch: int = 2,
+        max_pages: int | None = None,
+        raise_for_status: bool = True,
+    ) -> t.Iterator[t.Any]:
+        """Yield the records from every page of a paginated API, prefetching pages in the background.
+
+        Usage:
+        ``` py linenums="1"
+        with HishelCacheClientController() as ctl:
+            req = ctl.new_request(url="https://api.example.com/items")
+
+            for item in ctl.paginate(request=req, strategy=OffsetPagination(page_size=500, records_path="data")):
+                ...
+        ```
 
-        ## Load decoded content into dict
-        try:
-            _json: dict = json.loads(_decode)
+        Params:
+            request (httpx.Request): The request for the first page, i.e. from `new_request()`.
+            strategy (PaginationStrategy): i.e. `OffsetPagination`, `PageNumberPagination`, `CursorPagination`
+                or `LinkHeaderPagination`.
+            prefetch (int): [Default: 2] Number of pages to request ahead of the caller.
+            max_pages (int|None): Stop after this many pages.
+            raise_for_status (bool): [Default: True] Raise `httpx.HTTPStatusError` on an error response.
 
-            return _json
+        Returns:
+            (Iterator[Any]): Each record, across all pages. See `red_utils.ext.httpx_utils.pagination.paginate()`.
 
-        except Exception as exc:
-            msg = Exception(
-                f"Unhandled exception loading decoded response content to dict. Details: {exc}"
-            )
-            log.error(msg)
+        """
+        assert self.client, ValueError(
+            "Controller client is not initialized. Use the controller in a 'with' block."
+        )
 
-            raise exc
+        return paginate(
+            client=self.client,
+            request=request,
+            strategy=strategy,
+            prefetch=prefetch,
+            max_pages=max_pages,
+            raise_for_status=raise_for_status,
+            follow_redirects=self.follow_redirects,
+        )
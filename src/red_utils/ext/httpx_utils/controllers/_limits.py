@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.httpx_utils.controllers")
+
+from importlib.util import find_spec
+import typing as t
+
+import httpx
+
+## httpx's default connection pool limits
+DEFAULT_LIMITS: httpx.Limits = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0
+)
+
+
+def build_limits(
+    limits: httpx.Limits | None = None,
+    max_connections: int | None = None,
+    max_keepalive_connections: int | None = None,
+    keepalive_expiry: t.Union[int, float] | None = None,
+) -> httpx.Limits:
+    """Return `limits` (or httpx's default limits) with any of the pool size/keepalive options overridden.
+
+    Params:
+        limits (httpx.Limits|None): Base limits. Defaults to `DEFAULT_LIMITS`.
+        max_connections (int|None): Maximum concurrent connections. With HTTP/2, each connection multiplexes
+            many requests, so a handful of connections can serve hundreds of concurrent requests.
+        max_keepalive_connections (int|None): Maximum idle connections kept open in the pool.
+        keepalive_expiry (int|float|None): Seconds an idle connection is kept open.
+
+    Returns:
+        (httpx.Limits): The merged limits. Options left as `None` keep the base limits' value.
+
+    """
+    base: httpx.Limits = limits or DEFAULT_LIMITS
+
+    return httpx.Limits(
+        max_connections=(
+            max_connections if max_connections is not None else base.max_connections
+        ),
+        max_keepalive_connections=(
+            max_keepalive_connections
+            if max_keepalive_connections is not None
+            else base.max_keepalive_connections
+        ),
+        keepalive_expiry=(
+            keepalive_expiry if keepalive_expiry is not None else base.keepalive_expiry
+        ),
+    )
+
+
+def validate_http_versions(http1: bool = True, http2: bool = False) -> None:
+    """Raise if the requested HTTP versions can't be used.
+
+    Description:
+        HTTP/2 needs the `h2` package (`pip install httpx[http2]`). When `http1=False`, requests to
+            `http://` URLs use HTTP/2 "prior knowledge" (h2c), and `https://` URLs must negotiate HTTP/2.
+    """
+    assert http1 or http2, ValueError("At least one of http1 or http2 must be enabled")
+
+    if http2 and not find_spec("h2"):
+        raise ImportError(
+            "HTTP/2 was requested, but the 'h2' package is not installed. Install it with: pip install httpx[http2]"
+        )
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.httpx_utils.controllers")
+
+import asyncio
+from dataclasses import dataclass, field
+import threading
+import typing as t
+
+from ..constants import SINGLEFLIGHT_EXTENSION
+
+import httpx
+
+## Methods eligible for coalescing. Only safe methods, where every caller expects the same response.
+SINGLEFLIGHT_METHODS: list[str] = ["GET", "HEAD"]
+## Response extensions copied to each coalesced response
+_SHARED_EXTENSIONS: list[str] = ["http_version", "reason_phrase"]
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: t.Any = field(default=None)
+    exc: BaseException | None = field(default=None)
+    waiters: int = field(default=0)
+
+
+@dataclass
+class _AsyncCall:
+    task: asyncio.Task | None = field(default=None)
+    waiters: int = field(default=0)
+
+
+@dataclass
+class _SharedResponse:
+    """A fully read upstream response that can be turned into any number of `httpx.Response`s."""
+
+    status_code: int
+    headers: list[tuple[bytes, bytes]]
+    content: bytes
+    extensions: dict[str, t.Any]
+
+    def to_response(self) -> httpx.Response:
+        ## Raw (still encoded) bytes, so the client decodes each copy normally
+        return httpx.Response(
+            status_code=self.status_code,
+            headers=self.headers,
+            stream=httpx.ByteStream(self.content),
+            extensions=dict(self.extensions),
+        )
+
+
+def singleflight_key(request: httpx.Request = None) -> tuple | None:
+    """Return the key identical requests are coalesced on, or `None` if the request can't be coalesced.
+
+    Description:
+        Only GET & HEAD requests are coalesced. Requests with a `Range` header (each caller wants its own
+            slice) and requests opted out with `extensions={"singleflight": False}` (i.e. large streamed
+            downloads, which should never be buffered) are sent as-is.
+    """
+    if request.method not in SINGLEFLIGHT_METHODS:
+        return None
+    if "Range" in request.headers:
+        return None
+    if request.extensions.get(SINGLEFLIGHT_EXTENSION) is False:
+        return None
+
+    return (request.method, str(request.url), tuple(sorted(request.headers.raw)))
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one call, for threaded code.
+
+    Description:
+        The first caller for a key runs the function. Callers that arrive with the same key while it is
+            running wait for it and receive the same result (or exception). Once the call finishes the key
+            is forgotten, so this never serves stale results. Share one instance between threads.
+
+        When `share` is passed, the result is only passed through it (i.e. to buffer a streamed response)
+            when another caller joined the call. A caller that ran alone gets `fn()`'s result untouched.
+    """
+
+    def __init__(self):
+        self._calls: dict[t.Hashable, _Call] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+        self.stats: dict[str, int] = {"calls": 0, "shared": 0}
+
+    def do(
+        self,
+        key: t.Hashable = None,
+        fn: t.Callable[[], t.Any] = None,
+        share: t.Callable[[t.Any], t.Any] | None = None,
+    ) -> tuple[t.Any, bool]:
+        """Run `fn()`, or wait for an in-flight call with the same `key`.
+
+        Params:
+            key (Hashable): Calls with equal keys are coalesced.
+            fn (Callable): The call to run.
+            share (Callable|None): Converts `fn()`'s result into one every joined caller can use.
+
+        Returns:
+            (tuple[Any, bool]): The result, and `True` if it was shared from another caller's call.
+
+        """
+        with self._lock:
+            call: _Call | None = self._calls.get(key)
+            leader: bool = call is None
+
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["calls"] += 1
+            else:
+                call.waiters += 1
+                self.stats["shared"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.exc:
+                raise call.exc
+
+            return call.result, True
+
+        try:
+            result: t.Any = fn()
+
+            ## Callers arriving from here on start their own call
+            with self._lock:
+                self._forget(key, call)
+                waiters: int = call.waiters
+
+            call.result = share(result) if share is not None and waiters else result
+        except BaseException as exc:
+            call.exc = exc
+            raise
+        finally:
+            with self._lock:
+                self._forget(key, call)
+            call.done.set()
+
+        return call.result, False
+
+    def _forget(self, key: t.Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Collapse concurrent calls with the same key into one call, for asyncio code.
+
+    Description:
+        Like `SingleFlight`, but for coroutines on a single event loop. The shared call runs in its own
+            task, so cancelling the caller that started it does not cancel it for everyone else.
+    """
+
+    def __init__(self):
+        self._calls: dict[t.Hashable, _AsyncCall] = {}
+
+        self.stats: dict[str, int] = {"calls": 0, "shared": 0}
+
+    async def do(
+        self,
+        key: t.Hashable = None,
+        fn: t.Callable[[], t.Awaitable[t.Any]] = None,
+        share: t.Callable[[t.Any], t.Awaitable[t.Any]] | None = None,
+    ) -> tuple[t.Any, bool]:
+        """Await `fn()`, or wait for an in-flight call with the same `key`. See `SingleFlight.do()`.
+
+        Returns:
+            (tuple[Any, bool]): The result, and `True` if it was shared from another caller's call.
+
+        """
+        call: _AsyncCall | None = self._calls.get(key)
+        shared: bool = call is not None
+
+        if shared:
+            call.waiters += 1
+            self.stats["shared"] += 1
+        else:
+            self.stats["calls"] += 1
+            call = _AsyncCall()
+            self._calls[key] = call
+            call.task = asyncio.ensure_future(self._run(key, call, fn, share))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        return await asyncio.shield(call.task), shared
+
+    async def _run(
+        self,
+        key: t.Hashable,
+        call: _AsyncCall,
+        fn: t.Callable[[], t.Awaitable[t.Any]],
+        share: t.Callable[[t.Any], t.Awaitable[t.Any]] | None,
+    ) -> t.Any:
+        result: t.Any = await fn()
+
+        ## Callers arriving from here on start their own call
+        self._forget(key, call)
+
+        return await share(result) if share is not None and call.waiters else result
+
+    def _forget(self, key: t.Hashable, call: _AsyncCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class SingleFlightTransport(httpx.BaseTransport):
+    """An `httpx` transport that coalesces concurrent identical GET/HEAD requests into one upstream call.
+
+    Description:
+        Identical requests that arrive while the first one waits for its response share that response. Only
+            then is the body read into memory once & fanned out to every waiting request. A request nobody
+            joined streams its response as usual. Put this below a `hishel.CacheTransport` to stop a cache
+            stampede: when a popular entry expires, only one request per key reaches the origin.
+
+        See `singleflight_key()` for the requests that are never coalesced.
+
+    Params:
+        transport (httpx.BaseTransport|None): The transport to send requests with. Defaults to `httpx.HTTPTransport`.
+        group (SingleFlight|None): A (possibly shared) `SingleFlight`. A new one is created if not provided.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport | None = None,
+        group: SingleFlight | None = None,
+    ) -> None:
+        self.transport: httpx.BaseTransport = transport or httpx.HTTPTransport()
+        self.group: SingleFlight = group or SingleFlight()
+
+    @staticmethod
+    def _share(response: httpx.Response) -> _SharedResponse:
+        """Read a response's body, so it can be copied to every coalesced request."""
+        try:
+            ## Read the raw stream directly, responses built from bytes (i.e. `httpx.MockTransport`) are already "read"
+            content: bytes = b"".join(response.stream)
+        finally:
+            response.close()
+
+        return _SharedResponse(
+            status_code=response.status_code,
+            headers=response.headers.raw,
+            content=content,
+            extensions={
+                k: v for k, v in response.extensions.items() if k in _SHARED_EXTENSIONS
+            },
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key: tuple | None = singleflight_key(request)
+        if key is None:
+            return self.transport.handle_request(request)
+
+        res, shared = self.group.do(
+            key, lambda: self.transport.handle_request(request), share=self._share
+        )
+        if shared:
+            log.debug(f"Coalesced request: {request.method} {request.url}")
+
+        ## Nobody joined the call, the response was not read
+        if isinstance(res, httpx.Response):
+            return res
+
+        return res.to_response()
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncSingleFlightTransport(httpx.AsyncBaseTransport):
+    """Async version of `SingleFlightTransport`, for `httpx.AsyncClient`s.
+
+    Params:
+        transport (httpx.AsyncBaseTransport|None): The transport to send requests with. Defaults to `httpx.AsyncHTTPTransport`.
+        group (AsyncSingleFlight|None): A (possibly shared) `AsyncSingleFlight`. A new one is created if not provided.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport | None = None,
+        group: AsyncSingleFlight | None = None,
+    ) -> None:
+        self.transport: httpx.AsyncBaseTransport = (
+            transport or httpx.AsyncHTTPTransport()
+        )
+        self.group: AsyncSingleFlight = group or AsyncSingleFlight()
+
+    @staticmethod
+    async def _share(response: httpx.Response) -> _SharedResponse:
+        """Read a response's body, so it can be copied to every coalesced request."""
+        try:
+            content: bytes = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+
+        return _SharedResponse(
+            status_code=response.status_code,
+            headers=response.headers.raw,
+            content=content,
+            extensions={
+                k: v for k, v in response.extensions.items() if k in _SHARED_EXTENSIONS
+            },
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key: tuple | None = singleflight_key(request)
+        if key is None:
+            return await self.transport.handle_async_request(request)
+
+        res, shared = await self.group.do(
+            key,
+            lambda: self.transport.handle_async_request(request),
+            share=self._share,
+        )
+        if shared:
+            log.debug(f"Coalesced request: {request.method} {request.url}")
+
+        ## Nobody joined the call, the response was not read
+        if isinstance(res, httpx.Response):
+            return res
+
+        return res.to_response()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
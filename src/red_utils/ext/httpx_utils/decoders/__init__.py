@@ -1,3 +1,17 @@
 from __future__ import annotations
 
-from .__response_decoders import autodetect_charset, decode_res_content
+from .__response_decoders import (
+    DECODE_STRATEGIES,
+    autodetect_charset,
+    declared_encoding,
+    decode_res_content,
+    detect_encoding,
+    get_decode_stats,
+    reset_decode_stats,
+)
+from .__stream_decoders import (
+    aiter_json_array,
+    aiter_ndjson,
+    iter_json_array,
+    iter_ndjson,
+)
@@ -1,38 +1,187 @@
 from __future__ import annotations
 
+import codecs
+from collections import Counter
 import json
 import logging
+import threading
+import typing as t
+
+from ..constants import DEFAULT_DETECT_SAMPLE_SIZE
 
 import chardet
 import httpx
 
 log = logging.getLogger("red_utils.ext.httpx_utils.decoders.response_decoders")
 
+## Byte order marks, longest first so UTF-32 is not mistaken for UTF-16
+BOMS: list[tuple[bytes, str]] = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
 
-def autodetect_charset(content: bytes = None):
-    """Attempt to automatically detect encoding from input bytestring."""
-    try:
-        ## Detect encoding from bytes
-        _encoding: str | None = chardet.detect(byte_str=content).get("encoding")
+## Names of the strategies the decoding pipeline can pick, in the order they are tried
+DECODE_STRATEGIES: list[str] = ["content-type", "bom", "utf-8", "detected", "fallback"]
+
+_decode_stats: Counter = Counter()
+_decode_stats_lock: threading.Lock = threading.Lock()
+
+
+def _record_strategy(strategy: str = None) -> None:
+    with _decode_stats_lock:
+        _decode_stats[strategy] += 1
+
+
+def get_decode_stats() -> dict[str, int]:
+    """Return the number of times each decoding strategy has been used in this process.
+
+    Returns:
+        (dict[str, int]): A dict mapping each strategy in `DECODE_STRATEGIES` to a count.
+
+    """
+    with _decode_stats_lock:
+        return {strategy: _decode_stats[strategy] for strategy in DECODE_STRATEGIES}
+
+
+def reset_decode_stats() -> None:
+    """Reset the decoding strategy counters returned by `get_decode_stats()`."""
+    with _decode_stats_lock:
+        _decode_stats.clear()
+
+
+def _is_utf8(encoding: str = None) -> bool:
+    return codecs.lookup(encoding).name in ("utf-8", "utf-8-sig")
+
+
+def declared_encoding(
+    content: bytes = None, content_type_charset: str | None = None
+) -> tuple[str | None, str | None]:
+    """Return the encoding a response declares, without inspecting the body.
+
+    Description:
+        Trusts the `Content-Type` header's charset first, then a byte order mark at
+            the start of `content`. Unknown charsets in the header are ignored.
+
+    Params:
+        content (bytes): The response body, only the first 4 bytes are read.
+        content_type_charset (str|None): The charset from the response's `Content-Type` header,
+            i.e. `httpx.Response.charset_encoding`.
 
-        if not _encoding:
-            ## Default to utf-8
-            _encoding = "utf-8"
+    Returns:
+        (tuple[str|None, str|None]): An `(encoding, strategy)` tuple, or `(None, None)` if nothing was declared.
+
+    """
+    if content_type_charset:
+        try:
+            return codecs.lookup(content_type_charset).name, "content-type"
+        except LookupError:
+            log.warning(
+                f"Ignoring unknown Content-Type charset '{content_type_charset}'"
+            )
+
+    if content:
+        for bom, encoding in BOMS:
+            if content.startswith(bom):
+                return encoding, "bom"
+
+    return None, None
+
+
+def autodetect_charset(
+    content: bytes = None, sample_size: int = DEFAULT_DETECT_SAMPLE_SIZE
+):
+    """Attempt to automatically detect encoding from input bytestring.
+
+    Description:
+        Checks for a byte order mark, then tries a strict UTF-8 decode, and only runs
+            `chardet` on the first `sample_size` bytes as a last resort. Can be passed as
+            an `httpx.Client`'s `default_encoding`.
 
-        return _encoding
+    Params:
+        content (bytes): The bytestring to detect an encoding for.
+        sample_size (int): Maximum number of bytes to pass to `chardet`.
+
+    Returns:
+        (str): The detected encoding, or `utf-8` if detection fails.
+
+    """
+    return detect_encoding(content=content, sample_size=sample_size)[0]
+
+
+def detect_encoding(
+    content: bytes = None,
+    content_type_charset: str | None = None,
+    sample_size: int = DEFAULT_DETECT_SAMPLE_SIZE,
+) -> tuple[str, str]:
+    """Pick an encoding for a bytestring, using the cheapest strategy that works.
+
+    Description:
+        Strategies are tried in the order of `DECODE_STRATEGIES`: the `Content-Type` charset,
+            a byte order mark, a strict UTF-8 decode, then `chardet` on a prefix sample
+            of `sample_size` bytes. The chosen strategy is recorded in `get_decode_stats()`.
+
+    Params:
+        content (bytes): The bytestring to detect an encoding for.
+        content_type_charset (str|None): The charset from the response's `Content-Type` header.
+        sample_size (int): Maximum number of bytes to pass to `chardet`.
+
+    Returns:
+        (tuple[str, str]): An `(encoding, strategy)` tuple.
+
+    """
+    encoding, strategy = declared_encoding(
+        content=content, content_type_charset=content_type_charset
+    )
+
+    if not encoding:
+        try:
+            content.decode("utf-8")
+            encoding, strategy = "utf-8", "utf-8"
+
+        except UnicodeDecodeError:
+            encoding, strategy = _detect_from_sample(
+                content=content, sample_size=sample_size
+            )
+
+    _record_strategy(strategy)
+
+    return encoding, strategy
+
+
+def _detect_from_sample(
+    content: bytes = None, sample_size: int = DEFAULT_DETECT_SAMPLE_SIZE
+) -> tuple[str, str]:
+    try:
+        ## Detect encoding from a bounded prefix of the bytes
+        _encoding: str | None = chardet.detect(content[:sample_size]).get("encoding")
 
     except Exception as exc:
         msg = Exception(
             f"Unhandled exception auto-detecting character set for input bytestring. Details: {exc}"
         )
         log.error(msg)
-        log.warning("Defaulting to utf-8")
 
-        return "utf-8"
+        _encoding = None
+
+    if not _encoding:
+        ## ISO-8859-1 maps every byte, so decoding with it cannot fail
+        log.warning("Could not detect encoding. Defaulting to ISO-8859-1")
+
+        return "ISO-8859-1", "fallback"
 
+    return _encoding, "detected"
 
-def decode_res_content(self, res: httpx.Response = None) -> dict:
-    """Use multiple methods to attempt to decode an `httpx.Response.content` bytestring.
+
+def decode_res_content(res: httpx.Response = None) -> dict:
+    """Decode an `httpx.Response`'s JSON content, using the cheapest encoding strategy that works.
+
+    Description:
+        When the response declares UTF-8 (or declares nothing), the body bytes are passed straight
+            to `json.loads()` with no separate decode step. Other encodings are decoded first, and
+            `chardet` only runs on a prefix sample when the body is not valid UTF-8.
 
     Params:
         res (httpx.Response): An `httpx.Response` object, with `.content` to be decoded.
@@ -52,59 +201,47 @@ def decode_res_content(self, res: httpx.Response = None) -> dict:
         f"Expected response.content to be a bytestring. Got type: ({type(_content)})"
     )
 
-    ## Get content's encoding, or default to 'utf-8'
-    try:
-        decode_charset: str = autodetect_charset(content=_content)
-    except Exception as exc:
-        msg = Exception(
-            f"Unhandled exception detecting response content's encoding. Details: {exc}"
-        )
-        log.error(msg)
-        log.trace(exc)
-        log.warning(f"Defaulting to 'utf-8'")
-
-        decode_charset: str = "utf-8"
+    encoding, strategy = declared_encoding(
+        content=_content, content_type_charset=res.charset_encoding
+    )
 
-    ## Decode content
-    try:
-        _decode: str = res.content.decode(decode_charset)
+    ## Fast path: parse JSON straight from the bytes
+    if encoding is None or _is_utf8(encoding):
+        try:
+            _json: dict = json.loads(_content)
+            _record_strategy(strategy or "utf-8")
 
-    except Exception as exc:
-        ## Decoding failed, retry with different encodings
-        msg = Exception(
-            f"[Attempt 1/2] Unhandled exception decoding response content. Details: {exc}"
-        )
-        log.warning(msg)
+            return _json
 
-        if not res.encoding == "utf-8":
-            ## Try decoding again, using response's .encoding param
+        except UnicodeDecodeError as exc:
             log.warning(
-                f"Retrying response content decode with encoding '{res.encoding}'"
+                f"Response content is not valid UTF-8, detecting encoding. Details: {exc}"
             )
-            try:
-                _decode = res.content.decode(res.encoding)
-            except Exception as exc:
-                inner_msg = Exception(
-                    f"[Attempt 2/2] Unhandled exception decoding response content. Details: {exc}"
-                )
-                log.error(inner_msg)
-
-                raise inner_msg
-
-        else:
-            ## Decoding with utf-8 failed, attempt with ISO-8859-1
-            #  https://en.wikipedia.org/wiki/ISO/IEC_8859-1
-            log.warning(
-                f"Detected UTF-8 encoding, but decoding as UTF-8 failed. Retrying with encoding ISO-8859-1."
+            encoding, strategy = _detect_from_sample(content=_content)
+            _record_strategy(strategy)
+
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception loading decoded response content to dict. Details: {exc}"
             )
-            try:
-                _decode = res.content.decode("ISO-8859-1")
-            except Exception as exc:
-                msg = Exception(
-                    f"Failure attempting to decode content as UTF-8 and ISO-8859-1. Details: {exc}"
-                )
+            log.error(msg)
+
+            raise exc
+
+    else:
+        _record_strategy(strategy)
 
-                raise msg
+    ## Decode content
+    try:
+        _decode: str = _content.decode(encoding)
+
+    except Exception as exc:
+        ## Decoding with the declared/detected encoding failed, attempt with ISO-8859-1
+        #  https://en.wikipedia.org/wiki/ISO/IEC_8859-1
+        log.warning(
+            f"Decoding response content as '{encoding}' failed, retrying with ISO-8859-1. Details: {exc}"
+        )
+        _decode = _content.decode("ISO-8859-1")
 
     ## Load decoded content into dict
     try:
@@ -116,5 +253,6 @@ def decode_res_content(self, res: httpx.Response = None) -> dict:
         msg = Exception(
             f"Unhandled exception loading decoded response content to dict. Details: {exc}"
         )
+        log.error(msg)
 
-        raise msg
+        raise exc
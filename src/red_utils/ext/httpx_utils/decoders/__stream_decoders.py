@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import codecs
+import json
+import logging
+import re
+import typing as t
+
+from ..constants import DEFAULT_STREAM_CHUNK_SIZE, DEFAULT_STREAM_MAX_BUFFER_SIZE
+
+import httpx
+
+log = logging.getLogger("red_utils.ext.httpx_utils.decoders.stream_decoders")
+
+_WHITESPACE: str = " \t\n\r"
+## Characters that change nesting depth or start a string, outside of a string
+_STRUCTURAL: re.Pattern = re.compile(r'["\[\]{}]')
+## Characters that end a string or escape the next character, inside of a string
+_STRING_SPECIAL: re.Pattern = re.compile(r'["\\]')
+## Characters that end a number, true, false or null
+_SCALAR_END: re.Pattern = re.compile(r"[,\]\s]")
+
+
+class _StreamParserBase(ABC):
+    """Incrementally decode text fed to the parser in chunks.
+
+    Description:
+        Parsers do no I/O. Sync & async iterators read a chunk, `feed()` it to a parser,
+            and yield the records it returns, so the response stream is only read as fast
+            as the caller consumes records.
+
+        Chunks of an incomplete record are kept in a list & only joined once the record is
+            complete, so a record spanning many chunks is copied once, not once per chunk.
+
+    Params:
+        max_buffer_size (int): Maximum number of characters to hold while waiting for a record to complete.
+    """
+
+    def __init__(self, max_buffer_size: int = DEFAULT_STREAM_MAX_BUFFER_SIZE):
+        assert isinstance(max_buffer_size, int) and max_buffer_size > 0, ValueError(
+            f"max_buffer_size must be a positive int. Got: ({max_buffer_size})"
+        )
+
+        self.max_buffer_size: int = max_buffer_size
+        self.buffer: str = ""
+        self.decoder: json.JSONDecoder = json.JSONDecoder()
+
+        ## Chunks of the current, incomplete record & their total length
+        self._parts: list[str] = []
+        self._parts_size: int = 0
+
+    def _hold(self, text: str) -> None:
+        """Keep `text` as part of the current, incomplete record."""
+        self._parts.append(text)
+        self._parts_size += len(text)
+        self._check_buffer()
+
+    def _release(self, text: str = "") -> str:
+        """Return the held chunks of the current record, followed by `text`."""
+        if self._parts:
+            text = "".join(self._parts) + text
+            self._parts = []
+            self._parts_size = 0
+
+        return text
+
+    def _check_buffer(self) -> None:
+        if len(self.buffer) + self._parts_size > self.max_buffer_size:
+            raise ValueError(
+                f"Incomplete record exceeds max_buffer_size ({self.max_buffer_size} characters)"
+            )
+
+    @abstractmethod
+    def feed(self, text: str = None) -> list[t.Any]:
+        """Parse the next chunk of text, returning the records it completed."""
+
+    @abstractmethod
+    def close(self) -> list[t.Any]:
+        """Parse the rest of the held text, once the stream has ended."""
+
+
+class _NDJSONParser(_StreamParserBase):
+    """Parse newline-delimited JSON, one record per line. Blank lines are skipped."""
+
+    def feed(self, text: str = None) -> list[t.Any]:
+        if "\n" not in text:
+            ## Still inside a line, don't re-split what has been held so far
+            self._hold(text)
+
+            return []
+
+        *lines, tail = self._release(text).split("\n")
+        self._hold(tail)
+
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def close(self) -> list[t.Any]:
+        line: str = self._release()
+
+        return [json.loads(line)] if line.strip() else []
+
+
+class _JSONArrayParser(_StreamParserBase):
+    """Parse the items of a top-level JSON array one at a time.
+
+    Description:
+        Arrays, objects & strings are scanned for their closing character as chunks arrive, tracking
+            nesting depth & whether the scan is inside a string. Each item is decoded once, when it is
+            complete, instead of re-decoding it from its start on every chunk.
+    """
+
+    def __init__(self, max_buffer_size: int = DEFAULT_STREAM_MAX_BUFFER_SIZE):
+        super().__init__(max_buffer_size=max_buffer_size)
+
+        ## One of: "start" (before '['), "item" (expecting an item or ']'),
+        #  "sep" (expecting ',' or ']'), "end" (after ']')
+        self.state: str = "start"
+
+        ## Scan state of an array/object/string item spanning chunks
+        self._scanning: bool = False
+        self._depth: int = 0
+        self._in_string: bool = False
+        self._escape: bool = False
+
+    def _scan(self, buf: str, pos: int) -> int | None:
+        """Continue scanning the current item from `buf[pos]`, returning the index after its end, or `None` if it is incomplete."""
+        while True:
+            if self._escape:
+                if pos >= len(buf):
+                    return None
+
+                ## Skip the escaped character
+                pos += 1
+                self._escape = False
+
+            if self._in_string:
+                match: re.Match | None = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    return None
+
+                pos = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                    continue
+
+                self._in_string = False
+                if self._depth == 0:
+                    ## A top-level string item
+                    return pos
+
+                continue
+
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                return None
+
+            pos = match.end()
+            char: str = match.group()
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return pos
+
+    def _parse(self, buf: str, final: bool = False) -> list[t.Any]:
+        records: list[t.Any] = []
+        pos: int = 0
+
+        while True:
+            if self._scanning:
+                start: int = pos
+                end: int | None = self._scan(buf, pos)
+
+                if end is None:
+                    if final:
+                        ## Raises the decoder's error for the truncated item
+                        self.decoder.decode(self._release(buf[start:]))
+
+                    self._hold(buf[start:])
+                    pos = len(buf)
+                    break
+
+                records.append(self.decoder.decode(self._release(buf[start:end])))
+                self._scanning = False
+                self.state = "sep"
+                pos = end
+
+                continue
+
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+
+            if pos >= len(buf):
+                break
+
+            char: str = buf[pos]
+
+            if self.state == "start":
+                if char != "[":
+                    raise ValueError(
+                        f"Expected a top-level JSON array, got '{char}' at position {pos}"
+                    )
+                self.state = "item"
+                pos += 1
+
+            elif self.state in ("item", "sep") and char == "]":
+                self.state = "end"
+                pos += 1
+
+            elif self.state == "sep":
+                if char != ",":
+                    raise ValueError(f"Expected ',' or ']', got '{char}'")
+                self.state = "item"
+                pos += 1
+
+            elif self.state == "item":
+                if char in '[{"':
+                    self._scanning = True
+                    continue
+
+                ## A number, true, false or null, which may continue in the next chunk
+                match: re.Match | None = _SCALAR_END.search(buf, pos)
+                if match is None and not final:
+                    break
+
+                end = match.start() if match is not None else len(buf)
+                records.append(self.decoder.decode(buf[pos:end]))
+                self.state = "sep"
+                pos = end
+
+            else:
+                raise ValueError(f"Unexpected data after end of JSON array: '{char}'")
+
+        self.buffer = buf[pos:]
+        self._check_buffer()
+
+        return records
+
+    def feed(self, text: str = None) -> list[t.Any]:
+        return self._parse(self.buffer + text)
+
+    def close(self) -> list[t.Any]:
+        records: list[t.Any] = self._parse(self.buffer, final=True)
+
+        if self.state != "end":
+            raise ValueError("Response ended before the JSON array was closed")
+
+        return records
+
+
+def _get_text_decoder(res: httpx.Response = None) -> codecs.IncrementalDecoder:
+    ## utf-8-sig decodes plain UTF-8, and also strips a leading BOM
+    encoding: str = res.charset_encoding or "utf-8-sig"
+
+    return codecs.getincrementaldecoder(encoding)(errors="strict")
+
+
+def _iter_stream(
+    res: httpx.Response = None,
+    parser: _StreamParserBase = None,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+) -> t.Iterator[t.Any]:
+    assert res, ValueError("Missing httpx Response object")
+    assert isinstance(res, httpx.Response), TypeError(
+        f"res must be of type httpx.Response. Got type: ({type(res)})"
+    )
+
+    text_decoder: codecs.IncrementalDecoder = _get_text_decoder(res=res)
+
+    for chunk in res.iter_bytes(chunk_size=chunk_size):
+        yield from parser.feed(text_decoder.decode(chunk))
+
+    yield from parser.feed(text_decoder.decode(b"", final=True))
+    yield from parser.close()
+
+
+async def _aiter_stream(
+    res: httpx.Response = None,
+    parser: _StreamParserBase = None,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+) -> t.AsyncIterator[t.Any]:
+    assert res, ValueError("Missing httpx Response object")
+    assert isinstance(res, httpx.Response), TypeError(
+        f"res must be of type httpx.Response. Got type: ({type(res)})"
+    )
+
+    text_decoder: codecs.IncrementalDecoder = _get_text_decoder(res=res)
+
+    async for chunk in res.aiter_bytes(chunk_size=chunk_size):
+        for record in parser.feed(text_decoder.decode(chunk)):
+            yield record
+
+    for record in parser.feed(text_decoder.decode(b"", final=True)):
+        yield record
+    for record in parser.close():
+        yield record
+
+
+def iter_ndjson(
+    res: httpx.Response = None,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    max_buffer_size: int = DEFAULT_STREAM_MAX_BUFFER_SIZE,
+) -> t.Iterator[t.Any]:
+    """Yield records from a newline-delimited JSON response as the body is streamed.
+
+    Description:
+        Use with a response from `send_request(stream=True)`. The body is read `chunk_size`
+            bytes at a time, and the next chunk is only read once the caller has consumed
+            the records from the previous one.
+
+    Usage:
+    ``` py linenums="1"
+    with HTTPXController() as ctl:
+        res = ctl.send_request(request=req, stream=True)
+        for record in iter_ndjson(res=res):
+            ...
+    ```
+
+    Params:
+        res (httpx.Response): A streamed `httpx.Response`.
+        chunk_size (int): Number of bytes to read from the response at a time.
+        max_buffer_size (int): Maximum length of a single line. A longer line raises a `ValueError`.
+
+    Returns:
+        (Iterator[Any]): The decoded record from each line of the response.
+
+    """
+    yield from _iter_stream(
+        res=res,
+        parser=_NDJSONParser(max_buffer_size=max_buffer_size),
+        chunk_size=chunk_size,
+    )
+
+
+def iter_json_array(
+    res: httpx.Response = None,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    max_buffer_size: int = DEFAULT_STREAM_MAX_BUFFER_SIZE,
+) -> t.Iterator[t.Any]:
+    """Yield the items of a top-level JSON array response as the body is streamed.
+
+    Description:
+        Use with a response from `send_request(stream=True)`. Only the current, incomplete
+            item is buffered, so memory use depends on the largest item, not the response size.
+
+    Params:
+        res (httpx.Response): A streamed `httpx.Response`.
+        chunk_size (int): Number of bytes to read from the response at a time.
+        max_buffer_size (int): Maximum size of a single array item. A larger item raises a `ValueError`.
+
+    Returns:
+        (Iterator[Any]): Each item of the response's JSON array.
+
+    """
+    yield from _iter_stream(
+        res=res,
+        parser=_JSONArrayParser(max_buffer_size=max_buffer_size),
+        chunk_size=chunk_size,
+    )
+
+
+async def aiter_ndjson(
+    res: httpx.Response = None,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    max_buffer_size: int = DEFAULT_STREAM_MAX_BUFFER_SIZE,
+) -> t.AsyncIterator[t.Any]:
+    """Async version of `iter_ndjson()`, for responses from `AsyncHTTPXController.send_request(stream=True)`."""
+    async for record in _aiter_stream(
+        res=res,
+        parser=_NDJSONParser(max_buffer_size=max_buffer_size),
+        chunk_size=chunk_size,
+    ):
+        yield record
+
+
+async def aiter_json_array(
+    res: httpx.Response = None,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    max_buffer_size: int = DEFAULT_STREAM_MAX_BUFFER_SIZE,
+) -> t.AsyncIterator[t.Any]:
+    """Async version of `iter_json_array()`, for responses from `AsyncHTTPXController.send_request(stream=True)`."""
+    async for record in _aiter_stream(
+        res=res,
+        parser=_JSONArrayParser(max_buffer_size=max_buffer_size),
+        chunk_size=chunk_size,
+    ):
+        yield record
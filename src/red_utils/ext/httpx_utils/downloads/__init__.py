@@ -0,0 +1,5 @@
+"""Stream files to disk, with resume, parallel range requests & checksum verification."""
+
+from __future__ import annotations
+
+from ._downloads import PARTIAL_SUFFIX, download
@@ -0,0 +1,455 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.httpx_utils.downloads")
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import json
+import os
+from pathlib import Path
+import threading
+import typing as t
+
+from red_utils.std.hash_utils import get_hash_from_file
+
+from ..constants import (
+    DEFAULT_DOWNLOAD_CHUNK_SIZE,
+    DEFAULT_DOWNLOAD_PART_SIZE,
+    SINGLEFLIGHT_EXTENSION,
+)
+
+import httpx
+
+## Downloads are written byte-for-byte, so ask the server not to compress the body
+_DOWNLOAD_HEADERS: dict[str, str] = {"Accept-Encoding": "identity"}
+## Never coalesce (& so buffer) download requests in a SingleFlightTransport
+_DOWNLOAD_EXTENSIONS: dict[str, bool] = {SINGLEFLIGHT_EXTENSION: False}
+## Suffix for a file that is still downloading
+PARTIAL_SUFFIX: str = ".part"
+## Suffix of the sidecar next to a `.part` file, recording how it is being written & the remote file's validator
+PARTIAL_META_SUFFIX: str = ".meta"
+
+
+@dataclass
+class _RemoteFile:
+    size: int | None
+    accepts_ranges: bool
+    validator: str | None
+
+
+def _get_validator(headers: httpx.Headers) -> str | None:
+    """Return a response's strong ETag, or its Last-Modified date. Weak ETags can't be used with `If-Range`."""
+    etag: str | None = headers.get("ETag")
+
+    return (etag if etag and not etag.startswith("W/") else None) or headers.get(
+        "Last-Modified"
+    )
+
+
+def _probe(
+    client: httpx.Client, url: httpx.URL, headers: dict[str, str]
+) -> _RemoteFile:
+    """Find a remote file's size, whether the server accepts `Range` requests, and its ETag/Last-Modified."""
+    try:
+        res: httpx.Response = client.head(url, headers=headers, follow_redirects=True)
+        res.raise_for_status()
+    except httpx.HTTPError as exc:
+        log.debug(
+            f"HEAD request to {url} failed, downloading without ranges. Details: {exc}"
+        )
+
+        return _RemoteFile(size=None, accepts_ranges=False, validator=None)
+
+    size: str | None = res.headers.get("Content-Length")
+
+    return _RemoteFile(
+        size=int(size) if size and size.isdigit() else None,
+        accepts_ranges=res.headers.get("Accept-Ranges", "").lower() == "bytes",
+        validator=_get_validator(res.headers),
+    )
+
+
+def _read_meta(meta_path: Path) -> dict[str, t.Any] | None:
+    try:
+        return json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path: Path, meta: dict[str, t.Any]) -> None:
+    """Replace the sidecar atomically, so an interruption never leaves a torn file."""
+    tmp_path: Path = meta_path.with_name(meta_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(meta))
+    os.replace(tmp_path, meta_path)
+
+
+def _discard_partial(part_path: Path, meta_path: Path) -> None:
+    part_path.unlink(missing_ok=True)
+    meta_path.unlink(missing_ok=True)
+
+
+def _load_partial(
+    part_path: Path, meta_path: Path, remote: _RemoteFile, resume: bool
+) -> dict[str, t.Any] | None:
+    """Return the sidecar of a `.part` file that can be resumed, discarding any partial download that can't.
+
+    Description:
+        A partial download is only resumed when its sidecar recorded the same validator & size the server
+            reports now. Without a validator, bytes already on disk can't be proven to belong to the current
+            version of the file.
+    """
+    if not (part_path.exists() or meta_path.exists()):
+        return None
+
+    meta: dict[str, t.Any] | None = (
+        _read_meta(meta_path) if resume and part_path.exists() else None
+    )
+
+    if (
+        meta is None
+        or not remote.validator
+        or meta.get("validator") != remote.validator
+        or meta.get("size") != remote.size
+    ):
+        if resume and part_path.exists():
+            log.info(
+                f"Partial file '{part_path}' can't be verified against the remote file, restarting"
+            )
+        _discard_partial(part_path, meta_path)
+
+        return None
+
+    return meta
+
+
+def _write_stream(res: httpx.Response, f: t.BinaryIO, chunk_size: int) -> int:
+    written: int = 0
+
+    for chunk in res.iter_bytes(chunk_size=chunk_size):
+        f.write(chunk)
+        written += len(chunk)
+
+    return written
+
+
+def _download_stream(
+    client: httpx.Client,
+    url: httpx.URL,
+    part_path: Path,
+    meta_path: Path,
+    remote: _RemoteFile,
+    headers: dict[str, str],
+    chunk_size: int,
+    meta: dict[str, t.Any] | None = None,
+) -> None:
+    """Download to `part_path` with a single request, appending to a verified partial file when the server allows it."""
+    offset: int = part_path.stat().st_size if meta is not None else 0
+    req_headers: dict[str, str] = dict(headers)
+
+    if offset and remote.size is not None and offset > remote.size:
+        log.warning(
+            f"Partial file '{part_path}' is larger than the remote file, restarting"
+        )
+        _discard_partial(part_path, meta_path)
+        offset = 0
+
+    if offset and offset == remote.size:
+        log.debug(f"Partial file '{part_path}' is already complete")
+
+        return
+
+    if offset and remote.accepts_ranges:
+        req_headers["Range"] = f"bytes={offset}-"
+        ## The validator the partial bytes were written under, so a changed file is sent in full
+        req_headers["If-Range"] = meta["validator"]
+    else:
+        offset = 0
+
+    with client.stream(
+        "GET",
+        url,
+        headers=req_headers,
+        follow_redirects=True,
+        extensions=_DOWNLOAD_EXTENSIONS,
+    ) as res:
+        res.raise_for_status()
+
+        if offset and res.status_code != 206:
+            ## Server ignored the range (or the file changed), start over
+            log.warning(f"Server did not resume {url} at byte {offset}, restarting")
+            offset = 0
+
+        if offset:
+            log.info(f"Resuming download of {url} at byte {offset}")
+        else:
+            validator: str | None = _get_validator(res.headers) or remote.validator
+            if validator:
+                _write_meta(
+                    meta_path,
+                    {"mode": "stream", "validator": validator, "size": remote.size},
+                )
+            else:
+                meta_path.unlink(missing_ok=True)
+
+        with open(part_path, "ab" if offset else "wb") as f:
+            _write_stream(res, f, chunk_size)
+
+
+def _download_range(
+    client: httpx.Client,
+    url: httpx.URL,
+    part_path: Path,
+    start: int,
+    end: int,
+    headers: dict[str, str],
+    chunk_size: int,
+) -> int:
+    """Download bytes `start`-`end` (inclusive) of `url` into the same offsets of `part_path`."""
+    req_headers: dict[str, str] = {**headers, "Range": f"bytes={start}-{end}"}
+
+    with client.stream(
+        "GET",
+        url,
+        headers=req_headers,
+        follow_redirects=True,
+        extensions=_DOWNLOAD_EXTENSIONS,
+    ) as res:
+        res.raise_for_status()
+
+        if res.status_code != 206:
+            raise httpx.HTTPError(
+                f"Expected a 206 Partial Content response for range {start}-{end} of {url}. Got: [{res.status_code}]"
+            )
+
+        with open(part_path, "r+b") as f:
+            f.seek(start)
+            written: int = _write_stream(res, f, chunk_size)
+
+    if written != end - start + 1:
+        raise httpx.HTTPError(
+            f"Range {start}-{end} of {url} returned {written} bytes. Expected {end - start + 1}"
+        )
+
+    return written
+
+
+def _download_parallel(
+    client: httpx.Client,
+    url: httpx.URL,
+    part_path: Path,
+    meta_path: Path,
+    remote: _RemoteFile,
+    headers: dict[str, str],
+    chunk_size: int,
+    part_size: int,
+    max_workers: int,
+    meta: dict[str, t.Any] | None = None,
+) -> None:
+    """Split a download into `part_size` ranges, fetched by `max_workers` threads into a preallocated file.
+
+    Description:
+        The preallocated `.part` file is the full size from the start, so its size says nothing about
+            progress. The start of each finished range is recorded in the sidecar instead, and resuming
+            (with a verified sidecar) only requests the missing ranges.
+    """
+    if meta is None or meta.get("mode") != "parallel":
+        meta = {
+            "mode": "parallel",
+            "validator": remote.validator,
+            "size": remote.size,
+            "part_size": part_size,
+            "done": [],
+        }
+
+        with open(part_path, "wb") as f:
+            f.truncate(remote.size)
+        _write_meta(meta_path, meta)
+
+    ## Ranges must line up with the ones already recorded as done
+    part_size = meta["part_size"]
+    done: set[int] = set(meta["done"])
+    ranges: list[tuple[int, int]] = [
+        (start, min(start + part_size, remote.size) - 1)
+        for start in range(0, remote.size, part_size)
+        if start not in done
+    ]
+    log.debug(
+        f"Downloading {url} in {len(ranges)} parts ({len(done)} already done) with {max_workers} workers"
+    )
+
+    range_headers: dict[str, str] = dict(headers)
+    if remote.validator:
+        ## A file that changed mid-download answers 200 instead of 206, failing the range
+        range_headers["If-Range"] = remote.validator
+
+    lock: threading.Lock = threading.Lock()
+
+    def _fetch(start: int, end: int) -> None:
+        _download_range(client, url, part_path, start, end, range_headers, chunk_size)
+
+        with lock:
+            meta["done"].append(start)
+            _write_meta(meta_path, meta)
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="red-utils-download"
+    ) as pool:
+        futures = [pool.submit(_fetch, start, end) for start, end in ranges]
+
+        for future in futures:
+            future.result()
+
+
+def download(
+    client: httpx.Client = None,
+    url: t.Union[str, httpx.URL] = None,
+    dest: t.Union[str, Path] = None,
+    checksum: str | None = None,
+    hash_algorithm: str = "sha256",
+    chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE,
+    part_size: int = DEFAULT_DOWNLOAD_PART_SIZE,
+    max_workers: int = 4,
+    resume: bool = True,
+    overwrite: bool = False,
+    headers: dict[str, str] | None = None,
+) -> Path:
+    """Stream a file to disk, resuming partial downloads & splitting large files into parallel range requests.
+
+    Description:
+        The body is written to `<dest>.part` `chunk_size` bytes at a time and never held in memory. The
+            `.part` file is renamed to `dest` once the download is complete (and its checksum matches).
+
+        When the server advertises `Accept-Ranges: bytes` and the file is larger than `part_size`, it is
+            downloaded in `part_size` ranges by up to `max_workers` threads. Otherwise it is downloaded with a
+            single request.
+
+        `<dest>.part.meta` records the file's ETag/Last-Modified when the download starts, and for parallel
+            downloads which ranges have finished. With `resume`, an interrupted download continues only when
+            the server still reports that validator (and size): a single-request download is resumed with a
+            `Range` request (sending the recorded validator as `If-Range`), a parallel download requests only its
+            missing ranges. A partial file without a recorded validator, or whose validator no longer matches,
+            is discarded & downloaded from scratch.
+
+    Usage:
+    ``` py linenums="1"
+    with HTTPXController() as ctl:
+        path = ctl.download(url="https://example.com/big.iso", dest="downloads/", checksum="9f86d08...")
+    ```
+
+    Params:
+        client (httpx.Client): The client to send requests with.
+        url (str|httpx.URL): The file's URL.
+        dest (str|Path): The path to save the file to. If `dest` is a directory, the file is saved there
+            with the last part of the URL's path as its name.
+        checksum (str|None): The expected hex digest of the file. A mismatch raises a `ValueError`.
+        hash_algorithm (str): [Default: sha256] The `hashlib` algorithm `checksum` was computed with.
+        chunk_size (int): Number of bytes to read from the response & write to disk at a time.
+        part_size (int): Size of each range in a parallel download. Files smaller than this are not split.
+        max_workers (int): [Default: 4] Maximum parallel range requests. `1` disables parallel downloads.
+        resume (bool): [Default: True] Resume a verified `.part` file instead of starting over.
+        overwrite (bool): [Default: False] Replace `dest` if it exists. When `False`, raises `FileExistsError`.
+        headers (dict[str, str]|None): Extra headers to send with each request.
+
+    Returns:
+        (Path): The path of the downloaded file.
+
+    """
+    assert client, ValueError("Missing an httpx.Client")
+    assert url, ValueError("Missing a URL")
+    assert dest, ValueError("Missing a download destination")
+    assert isinstance(chunk_size, int) and chunk_size > 0, ValueError(
+        f"chunk_size must be a positive int. Got: ({chunk_size})"
+    )
+    assert isinstance(part_size, int) and part_size > 0, ValueError(
+        f"part_size must be a positive int. Got: ({part_size})"
+    )
+    assert isinstance(max_workers, int) and max_workers > 0, ValueError(
+        f"max_workers must be a positive int. Got: ({max_workers})"
+    )
+
+    url: httpx.URL = httpx.URL(url)
+    dest: Path = Path(f"{dest}")
+
+    if dest.is_dir():
+        filename: str = url.path.rstrip("/").split("/")[-1]
+        assert filename, ValueError(
+            f"Could not determine a filename from URL '{url}'. Pass a file path as dest."
+        )
+        dest = dest / filename
+
+    if dest.exists() and not overwrite:
+        raise FileExistsError(f"Download destination '{dest}' already exists")
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part_path: Path = dest.with_name(dest.name + PARTIAL_SUFFIX)
+    meta_path: Path = part_path.with_name(part_path.name + PARTIAL_META_SUFFIX)
+    req_headers: dict[str, str] = {**_DOWNLOAD_HEADERS, **(headers or {})}
+
+    remote: _RemoteFile = _probe(client, url, req_headers)
+    meta: dict[str, t.Any] | None = _load_partial(
+        part_path, meta_path, remote=remote, resume=resume
+    )
+
+    try:
+        if (meta is not None and meta.get("mode") == "parallel") or (
+            meta is None
+            and max_workers > 1
+            and remote.accepts_ranges
+            and remote.size is not None
+            and remote.size > part_size
+        ):
+            _download_parallel(
+                client,
+                url,
+                part_path,
+                meta_path,
+                remote=remote,
+                headers=req_headers,
+                chunk_size=chunk_size,
+                part_size=part_size,
+                max_workers=max_workers,
+                meta=meta,
+            )
+        else:
+            _download_stream(
+                client,
+                url,
+                part_path,
+                meta_path,
+                remote=remote,
+                headers=req_headers,
+                chunk_size=chunk_size,
+                meta=meta,
+            )
+
+    except Exception as exc:
+        msg = Exception(f"Unhandled exception downloading {url}. Details: {exc}")
+        log.error(msg)
+
+        raise exc
+
+    downloaded: int = part_path.stat().st_size
+    if remote.size is not None and downloaded != remote.size:
+        raise ValueError(
+            f"Downloaded {downloaded} bytes from {url}. Expected {remote.size}. Partial file kept at '{part_path}'"
+        )
+
+    if checksum:
+        file_hash: str = get_hash_from_file(
+            filepath=part_path, algorithm=hash_algorithm
+        )
+
+        if file_hash.lower() != checksum.lower():
+            _discard_partial(part_path, meta_path)
+
+            raise ValueError(
+                f"Checksum mismatch for {url}. Expected {hash_algorithm} {checksum}, got {file_hash}"
+            )
+
+    os.replace(part_path, dest)
+    meta_path.unlink(missing_ok=True)
+    log.debug(f"Downloaded {url} to '{dest}' ({downloaded} bytes)")
+
+    return dest
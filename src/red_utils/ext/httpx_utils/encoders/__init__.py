@@ -3,4 +3,4 @@
 from __future__ import annotations
 
 from . import json_encoders
-from .json_encoders import DateTimeEncoder
+from .json_encoders import JSON_BACKEND, DateTimeEncoder, json_dumps, json_loads
@@ -2,4 +2,10 @@
 
 from __future__ import annotations
 
-from ._encoders import DateTimeEncoder
+from ._encoders import (
+    JSON_BACKEND,
+    DateTimeEncoder,
+    encode_default,
+    json_dumps,
+    json_loads,
+)
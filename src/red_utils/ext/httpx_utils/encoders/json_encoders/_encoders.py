@@ -4,15 +4,155 @@ import logging
 
 log = logging.getLogger("red_utils.ext.httpx_utils.encoders.json_encoders")
 
-from datetime import datetime
+from dataclasses import fields, is_dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from importlib.util import find_spec
 import json
 import typing as t
+from uuid import UUID
+
+from red_utils.core.dataclass_utils.mixins import DictMixin
 
 import pendulum
 
+if find_spec("orjson"):
+    import orjson
+
+## Name of the JSON backend used by `json_dumps()`/`json_loads()` when none is passed
+JSON_BACKEND: str = "orjson" if find_spec("orjson") else "json"
+VALID_JSON_BACKENDS: list[str] = ["orjson", "json"]
+
+
+def encode_default(o: t.Any) -> t.Any:
+    """Convert an object the JSON backend can't serialize into one it can.
+
+    Description:
+        Used as the `default` hook of every JSON backend, so both backends produce the same output:
+            `datetime`/`date`/`time` & `pendulum.DateTime` are ISO-formatted strings, `UUID` & `Decimal` are
+            strings, and dataclasses (including `DictMixin` classes) are dicts of their fields.
+
+        `orjson` serializes `datetime`, `UUID` & dataclasses natively, without calling this hook.
+
+    Raises:
+        TypeError: When `o` can't be converted.
+
+    """
+    if isinstance(o, (datetime, date, time)):
+        ## pendulum.DateTime is a datetime subclass
+        return o.isoformat()
+    elif isinstance(o, (UUID, Decimal)):
+        return str(o)
+    elif isinstance(o, DictMixin):
+        return o.as_dict()
+    elif is_dataclass(o) and not isinstance(o, type):
+        return {f.name: getattr(o, f.name) for f in fields(o)}
+
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _get_backend(backend: str | None) -> str:
+    backend: str = (backend or JSON_BACKEND).lower()
+    assert backend in VALID_JSON_BACKENDS, ValueError(
+        f"Invalid JSON backend: '{backend}'. Must be one of {VALID_JSON_BACKENDS}"
+    )
+
+    if backend == "orjson" and not find_spec("orjson"):
+        raise ImportError(
+            "The 'orjson' JSON backend was requested, but orjson is not installed."
+        )
+
+    return backend
+
+
+def json_dumps(obj: t.Any = None, backend: str | None = None) -> bytes:
+    """Encode an object as compact UTF-8 JSON bytes, ready for `build_request(content=...)`.
+
+    Description:
+        Uses `orjson` when it is installed, and the stdlib `json` module otherwise. See `encode_default()`
+            for the types handled beyond the JSON primitives.
+
+        Non-`str` dict keys (`int`, `float`, `bool`, `None`) are encoded as strings by both backends. Objects
+            `orjson` refuses but the stdlib encoder accepts, i.e. integers beyond 64 bits, are re-encoded
+            with the stdlib encoder, so anything `httpx`'s own `json=` encoding accepts is encoded.
+
+        The one difference in output: `orjson` encodes `NaN` & infinite floats as `null`, valid JSON, where the
+            stdlib encoder writes the non-standard `NaN`/`Infinity` tokens.
+
+    Usage:
+    ``` py linenums="1"
+    req = build_request(
+        method="POST",
+        url="https://example.com/events",
+        headers={"Content-Type": "application/json"},
+        content=json_dumps({"id": uuid4(), "ts": pendulum.now()}),
+    )
+    ```
+
+    Params:
+        obj (Any): The object to encode.
+        backend (str|None): Force a backend, `"orjson"` or `"json"`. Defaults to `JSON_BACKEND`.
+
+    Returns:
+        (bytes): The encoded JSON.
+
+    """
+    backend: str = _get_backend(backend)
+
+    if backend == "orjson":
+        try:
+            return orjson.dumps(
+                obj, default=encode_default, option=orjson.OPT_NON_STR_KEYS
+            )
+        except TypeError as exc:
+            log.debug(
+                f"orjson could not encode object, retrying with json. Details: {exc}"
+            )
+
+            backend = "json"
+
+    try:
+        return json.dumps(
+            obj, default=encode_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    except Exception as exc:
+        msg = Exception(
+            f"Unhandled exception encoding JSON with backend '{backend}'. Details: {exc}"
+        )
+        log.error(msg)
+
+        raise exc
+
+
+def json_loads(
+    content: t.Union[bytes, bytearray, str] = None, backend: str | None = None
+) -> t.Any:
+    """Decode JSON `content` with the fastest installed backend. See `json_dumps()`."""
+    backend: str = _get_backend(backend)
+
+    try:
+        if backend == "orjson":
+            return orjson.loads(content)
+
+        return json.loads(content)
+
+    except Exception as exc:
+        msg = Exception(
+            f"Unhandled exception decoding JSON with backend '{backend}'. Details: {exc}"
+        )
+        log.error(msg)
+
+        raise exc
+
 
 class DateTimeEncoder(json.JSONEncoder):
-    """Handle encoding a `datetime.datetime` or `pendulum.DateTime` as an ISO-formatted string."""
+    """Handle encoding a `datetime.datetime` or `pendulum.DateTime` as an ISO-formatted string.
+
+    Description:
+        Prefer `json_dumps()`, which avoids calling this (pure-Python) hook for every datetime when
+            `orjson` is installed.
+    """
 
     def default(self, o) -> str | json.Any:
         if isinstance(o, datetime):
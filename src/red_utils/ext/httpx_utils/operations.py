@@ -8,6 +8,7 @@ log = logging.getLogger("red_utils.ext.httpx_utils")
 from .constants import (
     default_headers,
 )
+from .encoders import json_dumps
 from .validators import (
     validate_client,
     validate_headers,
@@ -195,6 +196,8 @@ def build_request(
         files (list): List of files to send with request.
         data (Any): <UNDOCUMENTED>
         contents (bytes): Byte-encoded request content.
+        json (Any): An object to send as the JSON body. Encoded with `json_dumps()`, which uses `orjson` when
+            installed and handles datetimes, UUIDs, Decimals & dataclasses.
         params (dict): URL params for request. Pass each param as a key/value pair, like:
             `{"api_key": api_key, "days": 15, "page": 2}`
         headers (dict): Headers for request.
@@ -205,6 +208,13 @@ def build_request(
     method: str = method.upper()
     method = validate_method(method=method)
 
+    if json is not None and content is None:
+        ## Encode JSON bodies ourselves, instead of httpx's stdlib json.dumps()
+        content = json_dumps(json)
+        headers = httpx.Headers(headers)
+        headers.setdefault("Content-Type", "application/json")
+        json = None
+
     try:
         _request: httpx.Request = httpx.Request(
             method=method,
@@ -0,0 +1,14 @@
+"""Iterate over paginated APIs, prefetching pages ahead of the caller."""
+
+from __future__ import annotations
+
+from ._paginate import apaginate, paginate
+from ._strategies import (
+    CursorPagination,
+    LinkHeaderPagination,
+    OffsetPagination,
+    PageNumberPagination,
+    PaginationStrategy,
+    copy_request,
+    get_path,
+)
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.httpx_utils.pagination")
+
+import asyncio
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import typing as t
+
+from ._strategies import PaginationStrategy
+
+import httpx
+
+## A page's request, response, decoded body & records
+Page = tuple[httpx.Request, httpx.Response, t.Any, list[t.Any]]
+
+
+def _validate(
+    request: httpx.Request,
+    strategy: PaginationStrategy,
+    prefetch: int,
+    max_pages: int | None,
+) -> None:
+    assert isinstance(request, httpx.Request), TypeError(
+        f"Expected request to be an httpx.Request object. Got type: ({type(request)})"
+    )
+    assert isinstance(strategy, PaginationStrategy), TypeError(
+        f"strategy must be a PaginationStrategy. Got type: ({type(strategy)})"
+    )
+    assert isinstance(prefetch, int) and prefetch >= 0, ValueError(
+        f"prefetch must be a non-negative int. Got: ({prefetch})"
+    )
+    assert max_pages is None or max_pages > 0, ValueError(
+        f"max_pages must be a positive int or None. Got: ({max_pages})"
+    )
+
+
+def _done_future(fn: t.Callable[[], Page]) -> Future:
+    """Run `fn()` now, returning its result in a completed `Future`."""
+    future: Future = Future()
+
+    try:
+        future.set_result(fn())
+    except Exception as exc:
+        future.set_exception(exc)
+
+    return future
+
+
+def paginate(
+    client: httpx.Client = None,
+    request: httpx.Request = None,
+    strategy: PaginationStrategy = None,
+    prefetch: int = 2,
+    max_pages: int | None = None,
+    raise_for_status: bool = True,
+    follow_redirects: bool = False,
+) -> t.Iterator[t.Any]:
+    """Yield the records from every page of a paginated API.
+
+    Description:
+        While the caller consumes one page's records, up to `prefetch` more pages are requested (and decoded)
+            in background threads, hiding each page's round-trip. Predictable strategies (offset/page number)
+            keep `prefetch` pages in flight at once. Sequential strategies (cursor/Link header) request the next
+            page as soon as the previous one arrives, before its records are yielded.
+
+        Records are always yielded in page order. Pages prefetched past the last page are discarded.
+
+    Params:
+        client (httpx.Client): The client to send requests with. Must be thread-safe when `prefetch > 0`,
+            which `httpx.Client` is.
+        request (httpx.Request): The request for the first page.
+        strategy (PaginationStrategy): How to build each page's request & find its records.
+        prefetch (int): [Default: 2] Number of pages to request ahead of the caller. `0` fetches one page at a time.
+        max_pages (int|None): Stop after this many pages.
+        raise_for_status (bool): [Default: True] Raise `httpx.HTTPStatusError` on an error response.
+        follow_redirects (bool): [Default: False] Follow redirects when requesting a page.
+
+    Returns:
+        (Iterator[Any]): Each record, across all pages.
+
+    """
+    _validate(request, strategy, prefetch, max_pages)
+
+    def _fetch(page_request: httpx.Request) -> Page:
+        res: httpx.Response = client.send(
+            request=page_request, follow_redirects=follow_redirects
+        )
+        if raise_for_status:
+            res.raise_for_status()
+
+        body: t.Any = strategy.decode(response=res)
+
+        return page_request, res, body, strategy.get_records(response=res, body=body)
+
+    pool: ThreadPoolExecutor | None = (
+        ThreadPoolExecutor(
+            max_workers=prefetch + 1, thread_name_prefix="red-utils-paginate"
+        )
+        if prefetch
+        else None
+    )
+
+    def _submit(page_request: httpx.Request) -> Future:
+        if pool is None:
+            return _done_future(lambda: _fetch(page_request))
+
+        return pool.submit(_fetch, page_request)
+
+    pending: deque[Future] = deque()
+
+    try:
+        if strategy.predictable:
+            next_page: int = 0
+
+            def _fill(size: int) -> None:
+                nonlocal next_page
+
+                while len(pending) < size and (
+                    max_pages is None or next_page < max_pages
+                ):
+                    pending.append(
+                        _submit(strategy.page_request(request, page=next_page))
+                    )
+                    next_page += 1
+
+            ## The first page, plus `prefetch` pages ahead of it
+            _fill(prefetch + 1)
+
+            while pending:
+                _, res, _, records = pending.popleft().result()
+
+                if strategy.is_last_page(response=res, records=records):
+                    yield from records
+                    break
+
+                if prefetch:
+                    _fill(prefetch)
+
+                yield from records
+
+                if not prefetch:
+                    _fill(1)
+
+        else:
+            pages: int = 0
+            pending.append(_submit(request))
+
+            while pending:
+                page_request, res, body, records = pending.popleft().result()
+                pages += 1
+
+                next_request: httpx.Request | None = None
+                if max_pages is None or pages < max_pages:
+                    next_request = strategy.next_request(
+                        request=page_request,
+                        response=res,
+                        records=records,
+                        body=body,
+                    )
+
+                ## Request the next page before handing over this page's records
+                if next_request is not None and prefetch:
+                    pending.append(_submit(next_request))
+
+                yield from records
+
+                if next_request is not None and not prefetch:
+                    pending.append(_submit(next_request))
+
+    finally:
+        for future in pending:
+            future.cancel()
+
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+async def apaginate(
+    client: httpx.AsyncClient = None,
+    request: httpx.Request = None,
+    strategy: PaginationStrategy = None,
+    prefetch: int = 2,
+    max_pages: int | None = None,
+    raise_for_status: bool = True,
+    follow_redirects: bool = False,
+) -> t.AsyncIterator[t.Any]:
+    """Async version of `paginate()`, for an `httpx.AsyncClient`. Prefetched pages are requested in tasks."""
+    _validate(request, strategy, prefetch, max_pages)
+
+    async def _fetch(page_request: httpx.Request) -> Page:
+        res: httpx.Response = await client.send(
+            request=page_request, follow_redirects=follow_redirects
+        )
+        if raise_for_status:
+            res.raise_for_status()
+
+        body: t.Any = strategy.decode(response=res)
+
+        return page_request, res, body, strategy.get_records(response=res, body=body)
+
+    pending: deque[asyncio.Task] = deque()
+
+    try:
+        if strategy.predictable:
+            next_page: int = 0
+
+            def _fill(size: int) -> None:
+                nonlocal next_page
+
+                while len(pending) < size and (
+                    max_pages is None or next_page < max_pages
+                ):
+                    pending.append(
+                        asyncio.create_task(
+                            _fetch(strategy.page_request(request, page=next_page))
+                        )
+                    )
+                    next_page += 1
+
+            ## The first page, plus `prefetch` pages ahead of it
+            _fill(prefetch + 1)
+
+            while pending:
+                _, res, _, records = await pending.popleft()
+
+                if strategy.is_last_page(response=res, records=records):
+                    for record in records:
+                        yield record
+                    break
+
+                if prefetch:
+                    _fill(prefetch)
+
+                for record in records:
+                    yield record
+
+                if not prefetch:
+                    _fill(1)
+
+        else:
+            pages: int = 0
+            pending.append(asyncio.create_task(_fetch(request)))
+
+            while pending:
+                page_request, res, body, records = await pending.popleft()
+                pages += 1
+
+                next_request = None
+                if max_pages is None or pages < max_pages:
+                    next_request = strategy.next_request(
+                        request=page_request,
+                        response=res,
+                        records=records,
+                        body=body,
+                    )
+
+                if next_request is not None and prefetch:
+                    pending.append(asyncio.create_task(_fetch(next_request)))
+
+                for record in records:
+                    yield record
+
+                if next_request is not None and not prefetch:
+                    pending.append(asyncio.create_task(_fetch(next_request)))
+
+    finally:
+        for task in pending:
+            task.cancel()
+
+        await asyncio.gather(*pending, return_exceptions=True)
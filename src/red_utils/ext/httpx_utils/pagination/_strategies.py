@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.httpx_utils.pagination")
+
+import typing as t
+
+from ..decoders import decode_res_content
+
+import httpx
+
+
+def get_path(data: t.Any = None, path: str | None = None) -> t.Any:
+    """Return the value at a dotted `path` in decoded JSON, i.e. `"meta.next_cursor"`.
+
+    Description:
+        Numeric path parts index into lists, i.e. `"results.0.id"`. Returns `None` if any part is missing.
+    """
+    if not path:
+        return data
+
+    for part in path.split("."):
+        if isinstance(data, dict):
+            data = data.get(part)
+        elif isinstance(data, list) and part.lstrip("-").isdigit():
+            try:
+                data = data[int(part)]
+            except IndexError:
+                return None
+        else:
+            return None
+
+    return data
+
+
+def copy_request(
+    request: httpx.Request = None,
+    url: httpx.URL | str | None = None,
+    params: dict[str, t.Any] | None = None,
+) -> httpx.Request:
+    """Copy a request, with a new `url` and/or merged query `params`.
+
+    Description:
+        The `Host` header is dropped & rebuilt from the new URL, so a URL on another host (i.e. from a
+            `Link` header) is not sent with the original request's `Host`.
+    """
+    url: httpx.URL = httpx.URL(url) if url is not None else request.url
+    if params:
+        url = url.copy_merge_params(params)
+
+    headers: httpx.Headers = request.headers.copy()
+    headers.pop("Host", None)
+
+    return httpx.Request(
+        method=request.method,
+        url=url,
+        headers=headers,
+        content=request.read() if request.method not in ("GET", "HEAD") else None,
+        extensions=request.extensions,
+    )
+
+
+class PaginationStrategy:
+    """Base class for pagination strategies.
+
+    Description:
+        A strategy is either "predictable", when the request for any page can be built from the
+            first request alone (i.e. offset/page-number pagination), or sequential, when each
+            page's request depends on the previous response (i.e. cursor/Link-header pagination).
+
+        Predictable strategies implement `page_request()` & `is_last_page()`, and many pages can be
+            requested at once. Sequential strategies implement `next_request()`, and the next page can
+            only be requested once the previous one arrives.
+
+        Each page's body is decoded once, with `decode()`, and the decoded body is passed to both
+            `get_records()` & `next_request()`.
+
+    Params:
+        records_path (str|None): Dotted path to the list of records in each page's JSON body, i.e. `"data.items"`.
+            When `None`, the body itself must be a list.
+    """
+
+    predictable: bool = False
+
+    def __init__(self, records_path: str | None = None):
+        self.records_path: str | None = records_path
+
+    def decode(self, response: httpx.Response = None) -> t.Any:
+        """Decode a page's response body."""
+        return decode_res_content(res=response)
+
+    def get_records(
+        self, response: httpx.Response = None, body: t.Any = None
+    ) -> list[t.Any]:
+        """Return a page's records from its decoded `body`, decoding `response` when `body` is not passed."""
+        if body is None:
+            body = self.decode(response)
+
+        records: t.Any = get_path(body, self.records_path)
+
+        if records is None:
+            return []
+        if not isinstance(records, list):
+            raise TypeError(
+                f"Expected a list of records at records_path '{self.records_path}'. Got type: ({type(records)})"
+            )
+
+        return records
+
+    def page_request(
+        self, request: httpx.Request = None, page: int = 0
+    ) -> httpx.Request:
+        """Build the request for the `page`th page (starting at 0) of a predictable strategy."""
+        raise NotImplementedError()
+
+    def is_last_page(
+        self, response: httpx.Response = None, records: list[t.Any] = None
+    ) -> bool:
+        """Return `True` if no pages come after this one, for predictable strategies."""
+        raise NotImplementedError()
+
+    def next_request(
+        self,
+        request: httpx.Request = None,
+        response: httpx.Response = None,
+        records: list[t.Any] = None,
+        body: t.Any = None,
+    ) -> httpx.Request | None:
+        """Build the request for the page after `response`, or return `None` on the last page.
+
+        Description:
+            `body` is the page's decoded body, when the strategy needs it & the caller already decoded it.
+        """
+        raise NotImplementedError()
+
+
+class OffsetPagination(PaginationStrategy):
+    """Paginate with offset & limit query params, i.e. `?offset=200&limit=100`.
+
+    Description:
+        Pages are predictable, so they can be prefetched concurrently. A page with fewer
+            than `page_size` records is the last page.
+
+    Params:
+        page_size (int): [Default: 100] Number of records requested per page.
+        offset_param (str): [Default: offset] Query param for the offset.
+        limit_param (str|None): [Default: limit] Query param for the page size. `None` to not send one.
+        start (int): [Default: 0] Offset of the first page.
+        records_path (str|None): See `PaginationStrategy`.
+    """
+
+    predictable: bool = True
+
+    def __init__(
+        self,
+        page_size: int = 100,
+        offset_param: str = "offset",
+        limit_param: str | None = "limit",
+        start: int = 0,
+        records_path: str | None = None,
+    ):
+        super().__init__(records_path=records_path)
+
+        assert isinstance(page_size, int) and page_size > 0, ValueError(
+            f"page_size must be a positive int. Got: ({page_size})"
+        )
+
+        self.page_size: int = page_size
+        self.offset_param: str = offset_param
+        self.limit_param: str | None = limit_param
+        self.start: int = start
+
+    def page_request(
+        self, request: httpx.Request = None, page: int = 0
+    ) -> httpx.Request:
+        params: dict[str, int] = {self.offset_param: self.start + page * self.page_size}
+        if self.limit_param:
+            params[self.limit_param] = self.page_size
+
+        return copy_request(request=request, params=params)
+
+    def is_last_page(
+        self, response: httpx.Response = None, records: list[t.Any] = None
+    ) -> bool:
+        return len(records) < self.page_size
+
+
+class PageNumberPagination(PaginationStrategy):
+    """Paginate with a page number query param, i.e. `?page=3&per_page=50`.
+
+    Description:
+        Pages are predictable, so they can be prefetched concurrently. An empty page, or a page
+            with fewer than `page_size` records when `page_size` is set, is the last page.
+
+    Params:
+        page_param (str): [Default: page] Query param for the page number.
+        first_page (int): [Default: 1] Number of the first page.
+        page_size (int|None): Number of records requested per page, sent as `size_param`.
+        size_param (str|None): [Default: per_page] Query param for the page size.
+        records_path (str|None): See `PaginationStrategy`.
+    """
+
+    predictable: bool = True
+
+    def __init__(
+        self,
+        page_param: str = "page",
+        first_page: int = 1,
+        page_size: int | None = None,
+        size_param: str | None = "per_page",
+        records_path: str | None = None,
+    ):
+        super().__init__(records_path=records_path)
+
+        self.page_param: str = page_param
+        self.first_page: int = first_page
+        self.page_size: int | None = page_size
+        self.size_param: str | None = size_param
+
+    def page_request(
+        self, request: httpx.Request = None, page: int = 0
+    ) -> httpx.Request:
+        params: dict[str, int] = {self.page_param: self.first_page + page}
+        if self.page_size and self.size_param:
+            params[self.size_param] = self.page_size
+
+        return copy_request(request=request, params=params)
+
+    def is_last_page(
+        self, response: httpx.Response = None, records: list[t.Any] = None
+    ) -> bool:
+        if not records:
+            return True
+
+        return self.page_size is not None and len(records) < self.page_size
+
+
+class CursorPagination(PaginationStrategy):
+    """Paginate with a cursor returned in each page's JSON body, i.e. `{"data": [...], "next": "abc"}`.
+
+    Params:
+        cursor_path (str): [Default: next_cursor] Dotted path to the next page's cursor in the JSON body.
+        cursor_param (str): [Default: cursor] Query param the cursor is sent as.
+        records_path (str|None): See `PaginationStrategy`.
+    """
+
+    def __init__(
+        self,
+        cursor_path: str = "next_cursor",
+        cursor_param: str = "cursor",
+        records_path: str | None = None,
+    ):
+        super().__init__(records_path=records_path)
+
+        self.cursor_path: str = cursor_path
+        self.cursor_param: str = cursor_param
+
+    def next_request(
+        self,
+        request: httpx.Request = None,
+        response: httpx.Response = None,
+        records: list[t.Any] = None,
+        body: t.Any = None,
+    ) -> httpx.Request | None:
+        if body is None:
+            body = self.decode(response)
+
+        cursor: t.Any = get_path(body, self.cursor_path)
+        if not cursor or not records:
+            return None
+
+        return copy_request(request=request, params={self.cursor_param: cursor})
+
+
+class LinkHeaderPagination(PaginationStrategy):
+    """Paginate by following the `Link` response header (RFC 8288), i.e. `<https://...?page=2>; rel="next"`.
+
+    Params:
+        rel (str): [Default: next] Link relation of the next page.
+        records_path (str|None): See `PaginationStrategy`.
+    """
+
+    def __init__(self, rel: str = "next", records_path: str | None = None):
+        super().__init__(records_path=records_path)
+
+        self.rel: str = rel
+
+    def next_request(
+        self,
+        request: httpx.Request = None,
+        response: httpx.Response = None,
+        records: list[t.Any] = None,
+        body: t.Any = None,
+    ) -> httpx.Request | None:
+        link: dict[str, str] | None = response.links.get(self.rel)
+        if not link or not link.get("url"):
+            return None
+
+        ## Link URLs can be relative to the page's URL
+        return copy_request(request=request, url=response.url.join(link["url"]))
@@ -1,3 +1,19 @@
 from __future__ import annotations
 
+from ._rate_limit_transports import (
+    VALID_RATE_LIMIT_SCOPES,
+    AsyncRateLimitTransport,
+    RateLimiter,
+    RateLimitTransport,
+    TokenBucket,
+)
+from ._retry_transports import (
+    CONNECT_ERRORS,
+    IDEMPOTENT_METHODS,
+    RETRY_STATUS_CODES,
+    AsyncRetryTransport,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryTransport,
+)
 from ._transports import get_cache_transport
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.httpx_utils.transports")
+
+import asyncio
+import threading
+import time
+import typing as t
+
+import httpx
+
+## Options for RateLimiter's `per` param
+VALID_RATE_LIMIT_SCOPES: list[str] = ["global", "host", "route"]
+
+
+class TokenBucket:
+    """A thread-safe token bucket.
+
+    Description:
+        Holds up to `capacity` tokens, refilled at `rate` tokens per second. Callers `reserve()` a token
+            and are told how long to wait for it. Reservations can drive the bucket negative, so callers
+            that arrive while it is empty are queued in arrival order instead of racing for the next token.
+
+    Params:
+        rate (int|float): Tokens added per second, i.e. the sustained requests per second.
+        capacity (int|float|None): Maximum tokens the bucket can hold, i.e. the allowed burst. Defaults to `rate`.
+    """
+
+    def __init__(
+        self,
+        rate: t.Union[int, float] = None,
+        capacity: t.Union[int, float] | None = None,
+    ):
+        assert rate and rate > 0, ValueError(
+            f"rate must be a positive number. Got: ({rate})"
+        )
+
+        self.rate: float = float(rate)
+        self.capacity: float = float(capacity if capacity is not None else max(rate, 1))
+        assert self.capacity >= 1, ValueError(
+            f"capacity must be at least 1. Got: ({capacity})"
+        )
+
+        self._tokens: float = self.capacity
+        self._updated: float = time.monotonic()
+        self._lock: threading.Lock = threading.Lock()
+
+    def reserve(self, tokens: int = 1) -> float:
+        """Take `tokens` from the bucket, returning the number of seconds to wait before using them."""
+        with self._lock:
+            now: float = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= tokens
+
+            if self._tokens >= 0:
+                return 0.0
+
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """Client-side rate limiter, keyed per host or per route.
+
+    Description:
+        Holds one `TokenBucket` per key. A single `RateLimiter` can be shared by any number of sync & async
+            transports/controllers in a process, and all of them will be held to the same rate.
+
+    Params:
+        rate (int|float): Default requests per second for each key.
+        burst (int|float|None): Default burst size for each key. Defaults to `rate`.
+        per (str): [Default: "host"] How requests are grouped into buckets. One of `VALID_RATE_LIMIT_SCOPES`:
+            `global` (one bucket for all requests), `host` (one bucket per URL host) or `route`
+            (one bucket per method, host & path).
+        limits (dict[str, tuple[int|float, int|float|None]]|None): Per-key `(rate, burst)` overrides,
+            i.e. `{"api.example.com": (2, 5)}`.
+        key_func (Callable[[httpx.Request], str]|None): Custom function to compute a request's bucket key.
+            Overrides `per`.
+
+    Usage:
+    ``` py linenums="1"
+    limiter = RateLimiter(rate=10, per="host", limits={"slow-api.example.com": (1, 1)})
+
+    with HTTPXController(rate_limiter=limiter) as ctl:
+        ...
+    ```
+    """
+
+    def __init__(
+        self,
+        rate: t.Union[int, float] = None,
+        burst: t.Union[int, float] | None = None,
+        per: str = "host",
+        limits: (
+            dict[str, tuple[t.Union[int, float], t.Union[int, float] | None]] | None
+        ) = None,
+        key_func: t.Callable[[httpx.Request], str] | None = None,
+    ):
+        assert rate and rate > 0, ValueError(
+            f"rate must be a positive number. Got: ({rate})"
+        )
+        assert per in VALID_RATE_LIMIT_SCOPES, ValueError(
+            f"Invalid per: {per}. Must be one of {VALID_RATE_LIMIT_SCOPES}"
+        )
+
+        self.rate: t.Union[int, float] = rate
+        self.burst: t.Union[int, float] | None = burst
+        self.per: str = per
+        self.limits: dict[str, tuple] = limits or {}
+        self.key_func: t.Callable[[httpx.Request], str] | None = key_func
+
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def get_key(self, request: httpx.Request = None) -> str:
+        """Return the bucket key for a request."""
+        if self.key_func:
+            return self.key_func(request)
+
+        match self.per:
+            case "global":
+                return "*"
+            case "host":
+                return request.url.host
+            case "route":
+                return f"{request.method} {request.url.host}{request.url.path}"
+
+    def get_bucket(self, key: str = None) -> TokenBucket:
+        """Return the `TokenBucket` for a key, creating it on first use."""
+        bucket: TokenBucket | None = self._buckets.get(key)
+        if bucket:
+            return bucket
+
+        with self._lock:
+            if key not in self._buckets:
+                rate, burst = self.limits.get(key, (self.rate, self.burst))
+                self._buckets[key] = TokenBucket(rate=rate, capacity=burst)
+
+            return self._buckets[key]
+
+    def reserve(self, request: httpx.Request = None) -> float:
+        """Reserve a token for a request, returning the number of seconds to wait before sending it."""
+        return self.get_bucket(self.get_key(request)).reserve()
+
+    def acquire(self, request: httpx.Request = None) -> None:
+        """Block until a request is allowed to be sent."""
+        delay: float = self.reserve(request)
+        if delay > 0:
+            log.debug(f"Rate limited, waiting {delay:.3f}s to send {request.url}")
+            time.sleep(delay)
+
+    async def aacquire(self, request: httpx.Request = None) -> None:
+        """Wait (without blocking the event loop) until a request is allowed to be sent."""
+        delay: float = self.reserve(request)
+        if delay > 0:
+            log.debug(f"Rate limited, waiting {delay:.3f}s to send {request.url}")
+            await asyncio.sleep(delay)
+
+
+class RateLimitTransport(httpx.BaseTransport):
+    """An `httpx` transport that waits for a `RateLimiter` before sending each request.
+
+    Description:
+        When combined with a `RetryTransport`, put the rate limiter on the inside, i.e.
+            `RetryTransport(transport=RateLimitTransport(limiter=limiter))`, so retries are rate limited too.
+
+    Params:
+        transport (httpx.BaseTransport|None): The transport to send requests with. Defaults to `httpx.HTTPTransport`.
+        limiter (RateLimiter): The (possibly shared) rate limiter to wait on.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport | None = None,
+        limiter: RateLimiter = None,
+    ) -> None:
+        assert isinstance(limiter, RateLimiter), TypeError(
+            f"limiter must be a RateLimiter. Got type: ({type(limiter)})"
+        )
+
+        self.transport: httpx.BaseTransport = transport or httpx.HTTPTransport()
+        self.limiter: RateLimiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.limiter.acquire(request)
+
+        return self.transport.handle_request(request)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRateLimitTransport(httpx.AsyncBaseTransport):
+    """Async version of `RateLimitTransport`, for `httpx.AsyncClient`s.
+
+    Params:
+        transport (httpx.AsyncBaseTransport|None): The transport to send requests with. Defaults to `httpx.AsyncHTTPTransport`.
+        limiter (RateLimiter): The (possibly shared) rate limiter to wait on.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport | None = None,
+        limiter: RateLimiter = None,
+    ) -> None:
+        assert isinstance(limiter, RateLimiter), TypeError(
+            f"limiter must be a RateLimiter. Got type: ({type(limiter)})"
+        )
+
+        self.transport: httpx.AsyncBaseTransport = (
+            transport or httpx.AsyncHTTPTransport()
+        )
+        self.limiter: RateLimiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.limiter.aacquire(request)
+
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
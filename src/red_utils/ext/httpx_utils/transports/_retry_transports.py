@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.httpx_utils.transports")
+
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+import typing as t
+
+import httpx
+
+## Methods that are safe to send more than once
+IDEMPOTENT_METHODS: list[str] = ["DELETE", "GET", "HEAD", "OPTIONS", "PUT", "TRACE"]
+## Response status codes that will be retried
+RETRY_STATUS_CODES: list[int] = [429, 500, 502, 503, 504]
+## Transport errors raised before the request reached the server. Safe to retry for any method.
+CONNECT_ERRORS: tuple[t.Type[Exception], ...] = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of sending a request when a host's circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker.
+
+    Description:
+        After `failure_threshold` consecutive failures to a host, the host's circuit "opens" and
+            requests to it fail fast with `CircuitOpenError` for `recovery_timeout` seconds. Once
+            the timeout passes, a single trial request is let through ("half-open"). A success closes
+            the circuit, a failure re-opens it.
+
+        A single `CircuitBreaker` can be shared by multiple transports/controllers. It is thread-safe.
+
+    Params:
+        failure_threshold (int): [Default: 5] Consecutive failures before a host's circuit opens.
+        recovery_timeout (int|float): [Default: 30] Seconds to wait before letting a trial request through.
+    """
+
+    def __init__(
+        self, failure_threshold: int = 5, recovery_timeout: t.Union[int, float] = 30
+    ):
+        assert isinstance(failure_threshold, int) and failure_threshold > 0, ValueError(
+            f"failure_threshold must be a positive int. Got: ({failure_threshold})"
+        )
+
+        self.failure_threshold: int = failure_threshold
+        self.recovery_timeout: t.Union[int, float] = recovery_timeout
+
+        self._failures: dict[str, int] = {}
+        self._opened_at: dict[str, float] = {}
+        self._trial_in_flight: set[str] = set()
+        self._lock: threading.Lock = threading.Lock()
+
+    def state(self, host: str = None) -> str:
+        """Return a host's circuit state, one of `closed`, `open` or `half-open`."""
+        with self._lock:
+            return self._state(host)
+
+    def _state(self, host: str) -> str:
+        opened_at: float | None = self._opened_at.get(host)
+
+        if opened_at is None:
+            return "closed"
+        if time.monotonic() - opened_at >= self.recovery_timeout:
+            return "half-open"
+
+        return "open"
+
+    def before_request(self, host: str = None) -> None:
+        """Raise `CircuitOpenError` if a request to `host` should not be sent."""
+        with self._lock:
+            state: str = self._state(host)
+
+            if state == "closed":
+                return
+            if state == "half-open" and host not in self._trial_in_flight:
+                self._trial_in_flight.add(host)
+                return
+
+        raise CircuitOpenError(f"Circuit breaker is open for host '{host}'")
+
+    def record_success(self, host: str = None) -> None:
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._trial_in_flight.discard(host)
+
+    def record_failure(self, host: str = None) -> None:
+        with self._lock:
+            self._trial_in_flight.discard(host)
+            failures: int = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+
+            if failures >= self.failure_threshold or host in self._opened_at:
+                if host not in self._opened_at:
+                    log.warning(
+                        f"Opening circuit breaker for host '{host}' after {failures} consecutive failures"
+                    )
+                self._opened_at[host] = time.monotonic()
+
+
+class _RetryPolicy:
+    """Retry decisions shared by the sync & async retry transports."""
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: t.Union[int, float] = 0.5,
+        max_backoff: t.Union[int, float] = 30,
+        jitter: bool = True,
+        retry_status_codes: list[int] | None = None,
+        retry_methods: list[str] | None = None,
+        respect_retry_after: bool = True,
+        max_retry_after: t.Union[int, float] = 60,
+        circuit_breaker: CircuitBreaker | None = None,
+    ):
+        assert isinstance(max_retries, int) and max_retries >= 0, ValueError(
+            f"max_retries must be a non-negative int. Got: ({max_retries})"
+        )
+
+        self.max_retries: int = max_retries
+        self.backoff_factor: t.Union[int, float] = backoff_factor
+        self.max_backoff: t.Union[int, float] = max_backoff
+        self.jitter: bool = jitter
+        self.retry_status_codes: list[int] = (
+            RETRY_STATUS_CODES if retry_status_codes is None else retry_status_codes
+        )
+        self.retry_methods: list[str] = [
+            m.upper()
+            for m in (IDEMPOTENT_METHODS if retry_methods is None else retry_methods)
+        ]
+        self.respect_retry_after: bool = respect_retry_after
+        self.max_retry_after: t.Union[int, float] = max_retry_after
+        self.circuit_breaker: CircuitBreaker | None = circuit_breaker
+
+    def _can_retry_exception(
+        self, request: httpx.Request, exc: Exception, attempt: int
+    ) -> bool:
+        if attempt >= self.max_retries or isinstance(exc, CircuitOpenError):
+            return False
+        if isinstance(exc, CONNECT_ERRORS):
+            return True
+
+        return isinstance(exc, httpx.TransportError) and (
+            request.method in self.retry_methods
+        )
+
+    def _can_retry_response(
+        self, request: httpx.Request, response: httpx.Response, attempt: int
+    ) -> bool:
+        return (
+            attempt < self.max_retries
+            and response.status_code in self.retry_status_codes
+            and request.method in self.retry_methods
+        )
+
+    def _retry_after(self, response: httpx.Response | None) -> float | None:
+        if response is None or not self.respect_retry_after:
+            return None
+
+        value: str | None = response.headers.get("Retry-After")
+        if not value:
+            return None
+
+        try:
+            seconds: float = float(value)
+        except ValueError:
+            try:
+                retry_at: datetime = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                log.warning(f"Ignoring unparseable Retry-After header: '{value}'")
+                return None
+
+            seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+
+        return max(0.0, min(seconds, self.max_retry_after))
+
+    def _backoff(self, attempt: int, response: httpx.Response | None = None) -> float:
+        retry_after: float | None = self._retry_after(response)
+        if retry_after is not None:
+            return retry_after
+
+        delay: float = min(self.max_backoff, self.backoff_factor * (2**attempt))
+
+        ## "Full jitter", spreads out retries from many clients failing at once
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def _before_request(self, request: httpx.Request) -> None:
+        if self.circuit_breaker:
+            self.circuit_breaker.before_request(request.url.host)
+
+    def _record(self, request: httpx.Request, failed: bool) -> None:
+        if not self.circuit_breaker:
+            return
+
+        if failed:
+            self.circuit_breaker.record_failure(request.url.host)
+        else:
+            self.circuit_breaker.record_success(request.url.host)
+
+    @staticmethod
+    def _is_failure(response: httpx.Response) -> bool:
+        return response.status_code >= 500
+
+
+class RetryTransport(_RetryPolicy, httpx.BaseTransport):
+    """An `httpx` transport that retries failed requests with exponential backoff.
+
+    Description:
+        Wraps another transport (an `httpx.HTTPTransport` by default). Connection errors are retried
+            for any method; other transport errors & responses with a status in `retry_status_codes`
+            are only retried for methods in `retry_methods` (idempotent methods by default).
+            A `Retry-After` response header overrides the computed backoff.
+
+        Can be wrapped by a `hishel.CacheTransport`, i.e. `get_cache_transport(transport=RetryTransport())`,
+            so only cache misses reach the retry logic.
+
+    Params:
+        transport (httpx.BaseTransport|None): The transport to send requests with.
+        max_retries (int): [Default: 3] Maximum number of retries after the first attempt.
+        backoff_factor (int|float): [Default: 0.5] Backoff before retry `n` is `backoff_factor * 2**n` seconds.
+        max_backoff (int|float): [Default: 30] Maximum backoff (in seconds) between retries.
+        jitter (bool): [Default: True] Randomize each backoff between 0 and the computed delay.
+        retry_status_codes (list[int]|None): Response status codes to retry. Defaults to `RETRY_STATUS_CODES`.
+        retry_methods (list[str]|None): Methods that can be retried. Defaults to `IDEMPOTENT_METHODS`.
+        respect_retry_after (bool): [Default: True] Wait for the duration of a response's `Retry-After` header.
+        max_retry_after (int|float): [Default: 60] Maximum time (in seconds) to honor a `Retry-After` header for.
+        circuit_breaker (CircuitBreaker|None): An optional, possibly shared, per-host circuit breaker.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport | None = None, **kwargs) -> None:
+        super().__init__(**kwargs)
+
+        self.transport: httpx.BaseTransport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempt: int = 0
+
+        while True:
+            self._before_request(request)
+
+            try:
+                response: httpx.Response = self.transport.handle_request(request)
+
+            except Exception as exc:
+                self._record(request, failed=True)
+
+                if not self._can_retry_exception(request, exc, attempt):
+                    raise
+
+                delay: float = self._backoff(attempt)
+                log.warning(
+                    f"[Retry {attempt + 1}/{self.max_retries}] {request.method} {request.url} failed, retrying in {delay:.2f}s. Details: {exc}"
+                )
+
+            else:
+                self._record(request, failed=self._is_failure(response))
+
+                if not self._can_retry_response(request, response, attempt):
+                    return response
+
+                delay: float = self._backoff(attempt, response=response)
+                log.warning(
+                    f"[Retry {attempt + 1}/{self.max_retries}] {request.method} {request.url} returned [{response.status_code}], retrying in {delay:.2f}s"
+                )
+                response.close()
+
+            attempt += 1
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRetryTransport(_RetryPolicy, httpx.AsyncBaseTransport):
+    """Async version of `RetryTransport`, for `httpx.AsyncClient`s.
+
+    Params:
+        transport (httpx.AsyncBaseTransport|None): The transport to send requests with. Defaults to `httpx.AsyncHTTPTransport`.
+        **kwargs: Retry options, see `RetryTransport`.
+    """
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport | None = None, **kwargs
+    ) -> None:
+        super().__init__(**kwargs)
+
+        self.transport: httpx.AsyncBaseTransport = (
+            transport or httpx.AsyncHTTPTransport()
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt: int = 0
+
+        while True:
+            self._before_request(request)
+
+            try:
+                response: httpx.Response = await self.transport.handle_async_request(
+                    request
+                )
+
+            except Exception as exc:
+                self._record(request, failed=True)
+
+                if not self._can_retry_exception(request, exc, attempt):
+                    raise
+
+                delay: float = self._backoff(attempt)
+                log.warning(
+                    f"[Retry {attempt + 1}/{self.max_retries}] {request.method} {request.url} failed, retrying in {delay:.2f}s. Details: {exc}"
+                )
+
+            else:
+                self._record(request, failed=self._is_failure(response))
+
+                if not self._can_retry_response(request, response, attempt):
+                    return response
+
+                delay: float = self._backoff(attempt, response=response)
+                log.warning(
+                    f"[Retry {attempt + 1}/{self.max_retries}] {request.method} {request.url} returned [{response.status_code}], retrying in {delay:.2f}s"
+                )
+                await response.aclose()
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -18,6 +18,8 @@ def get_cache_transport(
     cert: t.Union[
         str, tuple[str, str | None], tuple[str, str | None, str | None]
     ] = None,
+    transport: httpx.BaseTransport | None = None,
+    storage: hishel.BaseStorage | None = None,
 ) -> hishel.CacheTransport:
     """Return an initialized hishel.CacheTransport.
 
@@ -27,11 +29,18 @@ def get_cache_transport(
         verify (bool): [default: True] Verify SSL certificates on requests sent with this transport.
         retries (int): [default: 0] Number of times to retry requests sent with this transport.
         cert (valid HTTPX Cert): An optional SSL certificate to send with requests.
+        transport (httpx.BaseTransport|None): [default: None] A transport for the cache to send requests with on a
+            cache miss, i.e. a `RetryTransport`. When `None`, an `httpx.HTTPTransport` is built from `verify`, `cert`
+            & `retries`.
+        storage (hishel.BaseStorage|None): [default: None] Storage for cached responses, i.e. a `DiskCacheStorage`.
+            When `None`, a `hishel.FileStorage` is created in `cache_dir` (`cache_dir` & `ttl` are ignored otherwise).
 
     """
     # Create a cache instance with hishel
-    cache_storage = hishel.FileStorage(base_path=cache_dir, ttl=ttl)
-    cache_transport = httpx.HTTPTransport(verify=verify, cert=cert, retries=retries)
+    cache_storage = storage or hishel.FileStorage(base_path=cache_dir, ttl=ttl)
+    cache_transport = transport or httpx.HTTPTransport(
+        verify=verify, cert=cert, retries=retries
+    )
 
     try:
         # Create an HTTP cache transport
@@ -2,13 +2,39 @@
 
 from __future__ import annotations
 
-from . import classes, constants, operations, validators
+from . import (
+    batch,
+    classes,
+    constants,
+    ext_types,
+    operations,
+    record_store,
+    streams,
+    validators,
+)
+from .batch import deserialize_many, serialize_many
 from .classes import SerialFunctionResponse
+from .ext_types import (
+    DEFAULT_EXT_TYPES,
+    ExtTypeRegistry,
+    ext_default,
+    ext_hook,
+    register_dataclass,
+)
 from .operations import (
     ensure_path,
     msgpack_deserialize,
     msgpack_deserialize_file,
+    msgpack_load_mmap,
+    msgpack_packb,
     msgpack_serialize,
     msgpack_serialize_file,
+    msgpack_unpackb,
+)
+from .record_store import MsgpackRecordStore
+from .streams import (
+    MsgpackRecordWriter,
+    iter_msgpack_records,
+    write_msgpack_records,
 )
 from .validators import valid_operations
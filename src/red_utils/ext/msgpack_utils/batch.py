@@ -0,0 +1,172 @@
+"""Pack & unpack many objects at once, optionally across a process pool.
+
+`msgpack_serialize()`/`msgpack_deserialize()` build a response wrapper & a new packer for every object. The
+functions in this module reuse one `msgpack.Packer` (or one set of unpack options) per batch, return plain
+`bytes`/objects in input order, and raise on the first failure.
+"""
+
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.msgpack_utils")
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+import typing as t
+
+from .constants import DEFAULT_BATCH_CHUNK_SIZE
+from .ext_types import ext_default, ext_hook as default_ext_hook
+
+import msgpack
+
+
+def _chunks(items: t.Iterable[t.Any], chunk_size: int) -> t.Iterator[list[t.Any]]:
+    iterator: t.Iterator[t.Any] = iter(items)
+
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def _pack_chunk(
+    objs: t.Iterable[t.Any], default: t.Callable[[t.Any], t.Any] | None = None
+) -> list[bytes]:
+    packer: msgpack.Packer = msgpack.Packer(
+        default=default or ext_default, use_bin_type=True
+    )
+    pack = packer.pack
+
+    return [pack(obj) for obj in objs]
+
+
+def _unpack_chunk(
+    packed: t.Iterable[t.Union[bytes, bytearray, memoryview]],
+    ext_hook: t.Callable[[int, bytes], t.Any] | None = None,
+) -> list[t.Any]:
+    hook: t.Callable[[int, bytes], t.Any] = ext_hook or default_ext_hook
+    unpackb = msgpack.unpackb
+
+    return [
+        unpackb(data, raw=False, strict_map_key=False, ext_hook=hook) for data in packed
+    ]
+
+
+def _run_chunked(
+    fn: t.Callable[[list[t.Any], t.Any], list[t.Any]],
+    items: t.Iterable[t.Any],
+    hook: t.Any,
+    workers: int,
+    chunk_size: int,
+) -> list[t.Any]:
+    """Run `fn` on `chunk_size` slices of `items` in a pool of `workers` processes, joining results in order."""
+    results: list[t.Any] = []
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_result in executor.map(
+                fn, _chunks(items, chunk_size), repeat(hook)
+            ):
+                results.extend(chunk_result)
+    except Exception as exc:
+        msg = Exception(
+            f"Unhandled exception running {fn.__name__} on {workers} worker processes. Details: {exc}"
+        )
+        log.error(msg)
+
+        raise exc
+
+    return results
+
+
+def serialize_many(
+    objs: t.Iterable[t.Any] = None,
+    default: t.Callable[[t.Any], t.Any] | None = None,
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+) -> list[bytes]:
+    """Serialize each object of an iterable to msgpack bytes, reusing one packer.
+
+    Description:
+        Packs like `msgpack_packb()`, without a `SerialFunctionResponse` per object. When `workers` is
+            more than 1, `objs` is split into `chunk_size` chunks & packed in a pool of `workers` processes,
+            one packer per chunk. Sending objects to & from the pool costs about as much as packing them, so
+            a pool only pays off for large batches of objects that are expensive to encode, i.e. nested
+            `DictMixin` dataclasses.
+
+    Usage:
+    ``` py linenums="1"
+    packed: list[bytes] = serialize_many(records)
+    packed = serialize_many(records, workers=4)
+    ```
+
+    Params:
+        objs (Iterable): The objects to serialize
+        default (Callable|None): Called with objects msgpack can't serialize, returning a serializable object.
+            Defaults to `ext_types.ext_default`. Must be picklable (i.e. a module-level function) when
+            `workers` is more than 1.
+        workers (int|None): [Default: None] Number of processes to pack with. `None` or `1` packs in this process.
+        chunk_size (int): [Default: 1000] Objects sent to a worker process at a time.
+
+    Returns:
+        (list[bytes]): The packed objects, in the order of `objs`
+
+    Raises:
+        TypeError: When an object contains a type msgpack (and `default`) can't serialize
+
+    """
+    assert objs is not None, ValueError("Missing objects to serialize")
+    assert workers is None or (isinstance(workers, int) and workers > 0), ValueError(
+        f"workers must be a positive int. Got: ({workers})"
+    )
+    assert isinstance(chunk_size, int) and chunk_size > 0, ValueError(
+        f"chunk_size must be a positive int. Got: ({chunk_size})"
+    )
+
+    if not workers or workers == 1:
+        return _pack_chunk(objs, default)
+
+    return _run_chunked(_pack_chunk, objs, default, workers, chunk_size)
+
+
+def deserialize_many(
+    packed: t.Iterable[t.Union[bytes, bytearray, memoryview]] = None,
+    ext_hook: t.Callable[[int, bytes], t.Any] | None = None,
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+) -> list[t.Any]:
+    """Deserialize each of an iterable of msgpack bytes, i.e. the output of `serialize_many()`.
+
+    Description:
+        Unpacks like `msgpack_unpackb()`, without a response `dict` per object. When `workers` is more
+            than 1, `packed` is split into `chunk_size` chunks & unpacked in a pool of `workers` processes.
+
+    Params:
+        packed (Iterable[bytes]): The packed objects
+        ext_hook (Callable|None): Called with the code & data of each msgpack `ExtType`, returning the decoded object.
+            Defaults to `ext_types.ext_hook`. Must be picklable when `workers` is more than 1.
+        workers (int|None): [Default: None] Number of processes to unpack with. `None` or `1` unpacks in this process.
+        chunk_size (int): [Default: 1000] Objects sent to a worker process at a time.
+
+    Returns:
+        (list[Any]): The unpacked objects, in the order of `packed`. Arrays unpack as lists.
+
+    """
+    assert packed is not None, ValueError("Missing packed bytes to deserialize")
+    assert workers is None or (isinstance(workers, int) and workers > 0), ValueError(
+        f"workers must be a positive int. Got: ({workers})"
+    )
+    assert isinstance(chunk_size, int) and chunk_size > 0, ValueError(
+        f"chunk_size must be a positive int. Got: ({chunk_size})"
+    )
+
+    if not workers or workers == 1:
+        return _unpack_chunk(packed, ext_hook)
+
+    ## memoryviews can't be pickled to send to a worker
+    return _run_chunked(
+        _unpack_chunk,
+        (bytes(data) if isinstance(data, memoryview) else data for data in packed),
+        ext_hook,
+        workers,
+        chunk_size,
+    )
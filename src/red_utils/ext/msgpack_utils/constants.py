@@ -1 +1,10 @@
 from __future__ import annotations
+
+## Bytes read from a file per refill of a streaming Unpacker's buffer
+DEFAULT_READ_SIZE: int = 1024 * 1024
+## Largest single record (in bytes) a streaming Unpacker will buffer
+DEFAULT_MAX_BUFFER_SIZE: int = 64 * 1024 * 1024
+## Size (in bytes) of the file buffer used when writing records
+DEFAULT_WRITE_BUFFER_SIZE: int = 1024 * 1024
+## Objects sent to a worker process at a time by serialize_many()/deserialize_many()
+DEFAULT_BATCH_CHUNK_SIZE: int = 1000
@@ -0,0 +1,311 @@
+"""`ExtType` encoders & decoders for types msgpack can't serialize natively.
+
+Every `msgpack_utils` function that packs or unpacks data uses `DEFAULT_EXT_TYPES` unless given its own
+`default`/`ext_hook`, so `datetime`, `pendulum.DateTime`, `date`, `time`, `UUID`, `Path` & registered
+`DictMixin` dataclass values round-trip as themselves.
+"""
+
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.msgpack_utils")
+
+from dataclasses import fields, is_dataclass
+from datetime import date, datetime, time
+from importlib.util import find_spec
+from pathlib import Path
+import typing as t
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from red_utils.core.dataclass_utils.mixins import DictMixin
+
+import msgpack
+
+## ExtType codes used by DEFAULT_EXT_TYPES. Codes 0-127 are free for applications, keep these stable.
+EXT_DATETIME: int = 1
+EXT_DATE: int = 2
+EXT_TIME: int = 3
+EXT_UUID: int = 4
+EXT_PATH: int = 5
+EXT_DICTMIXIN: int = 6
+EXT_PENDULUM_DATETIME: int = 7
+
+ExtEncoder = t.Callable[[t.Any], bytes]
+ExtDecoder = t.Callable[[bytes], t.Any]
+
+
+class ExtTypeRegistry:
+    """A set of msgpack `ExtType` encoders & decoders, looked up by type & ext code.
+
+    Description:
+        Pass `registry.default` as a packer's `default`, and `registry.ext_hook` as an unpacker's `ext_hook`.
+            Encoders are found with one dict lookup on the object's exact type. A subclass of a registered
+            type uses the encoder of its nearest registered base class, found the first time it is seen, then
+            cached.
+
+        `DictMixin` dataclasses are only packed & unpacked once registered with `register_dataclass()`.
+            Class names read from packed data are looked up among registered classes, never imported, so
+            unpacking untrusted data can't import or run arbitrary code.
+
+        ExtTypes with an unregistered code unpack as `msgpack.ExtType` objects.
+
+    Usage:
+    ``` py linenums="1"
+    registry = ExtTypeRegistry()
+    registry.register(10, Decimal, lambda d: str(d).encode(), lambda b: Decimal(b.decode()))
+
+    packed = msgpack_packb(value, default=registry.default)
+    msgpack_unpackb(packed, ext_hook=registry.ext_hook)
+    ```
+    """
+
+    def __init__(self):
+        ## Registered types, plus resolved subclasses of registered types (None when nothing matched)
+        self._encoders: dict[type, tuple[int, ExtEncoder] | None] = {}
+        self._registered: dict[type, tuple[int, ExtEncoder]] = {}
+        self._base_encoders: dict[type, tuple[int, ExtEncoder]] = {}
+        self._decoders: dict[int, ExtDecoder] = {}
+        self._dataclasses: dict[str, type] = {}
+
+    def register(
+        self,
+        code: int = None,
+        cls: type = None,
+        encode: ExtEncoder = None,
+        decode: ExtDecoder = None,
+        subclasses: bool = True,
+    ) -> None:
+        """Register an encoder & decoder for a type.
+
+        Params:
+            code (int): The ExtType code (0-127) to pack `cls` values with
+            cls (type): The type to encode
+            encode (Callable): Converts a `cls` value to `bytes`
+            decode (Callable): Converts those `bytes` back to a value
+            subclasses (bool): [Default: True] Also encode subclasses of `cls`
+        """
+        assert isinstance(code, int) and 0 <= code <= 127, ValueError(
+            f"Ext code must be an int between 0 and 127. Got: ({code})"
+        )
+        assert code not in self._decoders or self._decoders[code] is decode, ValueError(
+            f"Ext code {code} is already registered"
+        )
+
+        self._registered[cls] = (code, encode)
+        self._decoders[code] = decode
+        if subclasses:
+            self._base_encoders[cls] = (code, encode)
+
+        ## Subclasses resolved before this registration may now resolve to a nearer base
+        self._encoders = dict(self._registered)
+
+    def register_dataclass(self, cls: type = None) -> type:
+        """Allow a `DictMixin` dataclass to be packed & unpacked as an ExtType. Usable as a decorator.
+
+        Usage:
+        ``` py linenums="1"
+        @DEFAULT_EXT_TYPES.register_dataclass
+        @dataclass
+        class User(DictMixin):
+            name: str = None
+        ```
+        """
+        assert is_dataclass(cls) and issubclass(cls, DictMixin), TypeError(
+            f"{cls} is not a DictMixin dataclass"
+        )
+        self._dataclasses[_qualified_name(cls)] = cls
+
+        return cls
+
+    def _resolve(self, cls: type) -> tuple[int, ExtEncoder] | None:
+        entry: tuple[int, ExtEncoder] | None = None
+
+        ## Nearest registered base class first
+        for base in cls.__mro__:
+            entry = self._base_encoders.get(base)
+            if entry is not None:
+                break
+
+        self._encoders[cls] = entry
+
+        return entry
+
+    def default(self, obj: t.Any) -> msgpack.ExtType:
+        """Pack a registered type as an ExtType. Used as msgpack's `default` hook.
+
+        Raises:
+            TypeError: When `obj`'s type is not registered
+
+        """
+        _type: type = type(obj)
+
+        try:
+            entry: tuple[int, ExtEncoder] | None = self._encoders[_type]
+        except KeyError:
+            entry = self._resolve(_type)
+
+        if entry is None:
+            raise TypeError(f"Cannot serialize {_type.__name__!r} object with msgpack")
+
+        return msgpack.ExtType(entry[0], entry[1](obj))
+
+    def ext_hook(self, code: int, data: bytes) -> t.Any:
+        """Decode the ExtTypes of registered types. Used as msgpack's `ext_hook`."""
+        decode: ExtDecoder | None = self._decoders.get(code)
+
+        return decode(data) if decode is not None else msgpack.ExtType(code, data)
+
+    def _pack(self, obj: t.Any) -> bytes:
+        return msgpack.packb(obj, default=self.default, use_bin_type=True)
+
+    def _unpack(self, data: bytes) -> t.Any:
+        return msgpack.unpackb(
+            data, raw=False, strict_map_key=False, ext_hook=self.ext_hook
+        )
+
+    def _dataclass_type(self, name: str) -> type:
+        """Find the registered `DictMixin` dataclass named `name`.
+
+        Raises:
+            TypeError: When no dataclass is registered as `name`
+
+        """
+        cls: type | None = self._dataclasses.get(name)
+        if cls is None:
+            raise TypeError(
+                f"Refusing to unpack {name!r}: not a registered DictMixin dataclass. Register it with register_dataclass()."
+            )
+
+        return cls
+
+    def encode_dataclass(self, obj: DictMixin) -> bytes:
+        """Pack a registered `DictMixin` dataclass as its qualified class name & init fields, packing nested values as ExtTypes.
+
+        Raises:
+            TypeError: When `obj`'s class is not registered, so it could not be unpacked
+
+        """
+        name: str = _qualified_name(type(obj))
+        if self._dataclasses.get(name) is not type(obj):
+            raise TypeError(
+                f"Cannot serialize {name!r} with msgpack: not a registered DictMixin dataclass. Register it with register_dataclass()."
+            )
+
+        return self._pack(
+            [name, {f.name: getattr(obj, f.name) for f in fields(obj) if f.init}]
+        )
+
+    def decode_dataclass(self, data: bytes) -> DictMixin:
+        name, _fields = self._unpack(data)
+
+        return self._dataclass_type(name)(**_fields)
+
+
+def _qualified_name(cls: type) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def encode_datetime(value: datetime) -> bytes:
+    """Pack a `datetime` as its ISO format, followed by `|` & its time zone name when it has one.
+
+    Description:
+        ISO format alone would decode zone-aware values with a fixed UTC offset, losing their zone.
+    """
+    key: str | None = getattr(value.tzinfo, "key", None)
+
+    return f"{value.isoformat()}|{key}".encode() if key else value.isoformat().encode()
+
+
+def decode_datetime(data: bytes) -> datetime:
+    iso, _, key = data.decode().partition("|")
+    value: datetime = datetime.fromisoformat(iso)
+
+    ## Same instant & wall time (including DST fold), in the named zone instead of a fixed offset
+    return value.astimezone(ZoneInfo(key)) if key else value
+
+
+def encode_date(value: date) -> bytes:
+    return value.isoformat().encode()
+
+
+def decode_date(data: bytes) -> date:
+    return date.fromisoformat(data.decode())
+
+
+def encode_time(value: time) -> bytes:
+    return value.isoformat().encode()
+
+
+def decode_time(data: bytes) -> time:
+    return time.fromisoformat(data.decode())
+
+
+def encode_uuid(value: UUID) -> bytes:
+    return value.bytes
+
+
+def decode_uuid(data: bytes) -> UUID:
+    return UUID(bytes=bytes(data))
+
+
+def encode_path(value: Path) -> bytes:
+    return str(value).encode()
+
+
+def decode_path(data: bytes) -> Path:
+    return Path(data.decode())
+
+
+def _default_registry() -> ExtTypeRegistry:
+    registry: ExtTypeRegistry = ExtTypeRegistry()
+
+    registry.register(EXT_DATETIME, datetime, encode_datetime, decode_datetime)
+    registry.register(EXT_DATE, date, encode_date, decode_date)
+    registry.register(EXT_TIME, time, encode_time, decode_time)
+    registry.register(EXT_UUID, UUID, encode_uuid, decode_uuid)
+    registry.register(EXT_PATH, Path, encode_path, decode_path)
+    registry.register(
+        EXT_DICTMIXIN, DictMixin, registry.encode_dataclass, registry.decode_dataclass
+    )
+
+    if find_spec("pendulum"):
+        import pendulum
+
+        def decode_pendulum_datetime(data: bytes) -> pendulum.DateTime:
+            value: datetime = decode_datetime(data)
+
+            ## pendulum.instance() would assume UTC for naive values
+            return pendulum.DateTime(
+                value.year,
+                value.month,
+                value.day,
+                value.hour,
+                value.minute,
+                value.second,
+                value.microsecond,
+                tzinfo=(
+                    pendulum.timezone(value.tzinfo.key)
+                    if isinstance(value.tzinfo, ZoneInfo)
+                    else value.tzinfo
+                ),
+                fold=value.fold,
+            )
+
+        registry.register(
+            EXT_PENDULUM_DATETIME,
+            pendulum.DateTime,
+            encode_datetime,
+            decode_pendulum_datetime,
+        )
+
+    return registry
+
+
+## The registry msgpack_utils functions use by default
+DEFAULT_EXT_TYPES: ExtTypeRegistry = _default_registry()
+
+ext_default: t.Callable[[t.Any], msgpack.ExtType] = DEFAULT_EXT_TYPES.default
+ext_hook: t.Callable[[int, bytes], t.Any] = DEFAULT_EXT_TYPES.ext_hook
+register_dataclass: t.Callable[[type], type] = DEFAULT_EXT_TYPES.register_dataclass
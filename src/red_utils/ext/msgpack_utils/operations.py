@@ -4,13 +4,16 @@ import logging
 
 log = logging.getLogger("red_utils.ext.msgpack_utils")
 
+import mmap
 from pathlib import Path
+import typing as t
 from typing import Union
 from uuid import uuid4
 
 from red_utils.core.constants import SERIALIZE_DIR
 
 from .classes import SerialFunctionResponse
+from .ext_types import ext_default, ext_hook as default_ext_hook
 
 import msgpack
 
@@ -64,6 +67,106 @@ def ensure_path(dir: Union[str, Path] = None) -> bool:
         return True
 
 
+def msgpack_packb(
+    obj: t.Any = None, default: t.Callable[[t.Any], t.Any] | None = None
+) -> bytes:
+    """Serialize any msgpack-compatible object to bytes.
+
+    Description:
+        Unlike `msgpack_serialize()`, returns the bytes directly & raises on failure, for hot paths
+            like cache serializers. Binary data is packed with msgpack's `bin` type, so `bytes`
+            round-trip as `bytes`. `datetime`, `UUID`, `Path` & registered `DictMixin` values are packed as
+            ExtTypes (see `ext_types`).
+
+    Params:
+        obj (Any): The object to serialize
+        default (Callable|None): Called with objects msgpack can't serialize, returning a serializable object.
+            Defaults to `ext_types.ext_default`.
+
+    Returns:
+        (bytes): The packed object
+
+    Raises:
+        TypeError: When `obj` contains a type msgpack (and `default`) can't serialize
+
+    """
+    return msgpack.packb(obj, default=default or ext_default, use_bin_type=True)
+
+
+def msgpack_unpackb(
+    packed: t.Union[bytes, bytearray, memoryview] = None,
+    ext_hook: t.Callable[[int, bytes], t.Any] | None = None,
+) -> t.Any:
+    """Deserialize bytes packed by `msgpack_packb()`.
+
+    Params:
+        packed (bytes): The packed bytes
+        ext_hook (Callable|None): Called with the code & data of each msgpack `ExtType`, returning the decoded object.
+            Defaults to `ext_types.ext_hook`.
+
+    Returns:
+        (Any): The unpacked object. Arrays unpack as lists.
+
+    """
+    return msgpack.unpackb(
+        packed,
+        raw=False,
+        strict_map_key=False,
+        ext_hook=ext_hook or default_ext_hook,
+    )
+
+
+def msgpack_load_mmap(
+    filename: t.Union[str, Path] = None,
+    raw: bool = False,
+    use_list: bool = True,
+    strict_map_key: bool = True,
+    ext_hook: t.Callable[[int, bytes], t.Any] | None = None,
+) -> t.Any:
+    """Memory-map a msgpack file & unpack it, without copying the file into a `bytes` object.
+
+    Description:
+        The file is mapped read-only & unpacked straight from a `memoryview` of the mapping. Its pages are
+            read from the OS page cache on demand, so peak memory is the unpacked objects alone, and worker
+            processes loading the same snapshot share one copy of the file's pages.
+
+    Params:
+        filename (str|Path): The path to a file with serialized data to load
+        raw (bool): [Default: False] Unpack msgpack `str` as `bytes`, instead of decoding them as UTF-8
+        use_list (bool): [Default: True] Unpack arrays as lists. `False` unpacks them as (smaller) tuples.
+        strict_map_key (bool): [Default: True] Only allow `str` & `bytes` map keys
+        ext_hook (Callable|None): Called with the code & data of each msgpack `ExtType`, returning the decoded object
+
+    Returns:
+        (Any): The unpacked object
+
+    Raises:
+        FileNotFoundError: When `filename` does not exist
+        ValueError: When the file is empty or not valid msgpack
+
+    """
+    if not filename:
+        raise ValueError("Must pass a file name/path to deserialize")
+
+    if not Path(filename).exists():
+        raise FileNotFoundError(f"Could not find file: {filename}")
+
+    with open(filename, "rb") as infile:
+        if Path(filename).stat().st_size == 0:
+            raise ValueError(f"Cannot deserialize empty file: {filename}")
+
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            ## The view must be released before the mapping is closed
+            with memoryview(mapped) as view:
+                return msgpack.unpackb(
+                    view,
+                    raw=raw,
+                    use_list=use_list,
+                    strict_map_key=strict_map_key,
+                    ext_hook=ext_hook or default_ext_hook,
+                )
+
+
 def msgpack_serialize(
     _json: dict = None,
 ) -> SerialFunctionResponse:  # -> dict[str, Union[bool, str, bytes, None]]:
@@ -83,7 +186,7 @@ def msgpack_serialize(
         raise ValueError("Missing Python dict data to serialize")
 
     try:
-        packed = msgpack.packb(_json)
+        packed = msgpack.packb(_json, default=ext_default)
 
         # return_obj = {"success": True, "detail": {"message": packed}}
         return_obj: SerialFunctionResponse = SerialFunctionResponse(
@@ -139,7 +242,7 @@ def msgpack_serialize_file(
     if _json:
         try:
             with open(f"{filename}", "wb") as outfile:
-                packed = msgpack.packb(_json)
+                packed = msgpack.packb(_json, default=ext_default)
                 outfile.write(packed)
 
             # return_obj = {
@@ -159,6 +262,9 @@ def msgpack_serialize_file(
 
 def msgpack_deserialize_file(
     filename: str = None,
+    use_mmap: bool = False,
+    raw: bool = False,
+    use_list: bool = True,
 ) -> (
     SerialFunctionResponse
 ):  ## dict[str, Union[bool, str, dict[str, Union[str, dict]]]]:
@@ -166,6 +272,10 @@ def msgpack_deserialize_file(
 
     Params:
         filename (str): The path to a file with serialized data to load
+        use_mmap (bool): [Default: False] Memory-map the file instead of reading it into memory.
+            See `msgpack_load_mmap()`.
+        raw (bool): [Default: False] Unpack msgpack `str` as `bytes`
+        use_list (bool): [Default: True] Unpack arrays as lists, instead of tuples
 
     Returns:
         (dict): A dict with 2 keys, `'success'` and `'detail'`.
@@ -181,9 +291,15 @@ def msgpack_deserialize_file(
         raise FileNotFoundError(f"Could not find file: {filename}")
 
     try:
-        with open(f"{filename}", "rb") as infile:
-            in_bytes = infile.read()
-            unpacked = msgpack.unpackb(in_bytes)
+        if use_mmap:
+            unpacked = msgpack_load_mmap(filename, raw=raw, use_list=use_list)
+
+        else:
+            with open(f"{filename}", "rb") as infile:
+                in_bytes = infile.read()
+                unpacked = msgpack.unpackb(
+                    in_bytes, raw=raw, use_list=use_list, ext_hook=default_ext_hook
+                )
 
         return_obj = {
             "success": True,
@@ -231,7 +347,7 @@ def msgpack_deserialize(
         )
 
     try:
-        unpacked = msgpack.unpackb(packed_str)
+        unpacked = msgpack.unpackb(packed_str, ext_hook=default_ext_hook)
 
         return_obj = {
             "success": True,
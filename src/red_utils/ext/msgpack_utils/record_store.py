@@ -0,0 +1,473 @@
+"""An append-only msgpack record file with sidecar indexes, for reading any record without unpacking the ones before it.
+
+A store at `records.msgpack` is made of:
+
+- `records.msgpack`: The records, a plain msgpack record file (readable with `iter_msgpack_records()`).
+- `records.msgpack.idx`: The byte offset of each record, as little-endian unsigned 64-bit integers. Record `n`'s
+    offset is at byte `n * 8`.
+- `records.msgpack.keys`: When the store has a `key`, a msgpack record file of `[key, record number]` pairs.
+
+The data file is the source of truth. Both indexes are only ever appended after the record they point to,
+and are checked against the data file (and repaired) whenever the store is opened.
+"""
+
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.msgpack_utils")
+
+from array import array
+from contextlib import AbstractContextManager
+import os
+from pathlib import Path
+import sys
+import typing as t
+
+from .constants import DEFAULT_READ_SIZE, DEFAULT_WRITE_BUFFER_SIZE
+from .ext_types import ext_default, ext_hook
+from .operations import ensure_path
+
+import msgpack
+
+## Suffixes of a record store's index files
+INDEX_SUFFIX: str = ".idx"
+KEYS_SUFFIX: str = ".keys"
+
+RecordKey = t.Union[str, int, bytes]
+
+
+def _read_offsets(path: Path) -> array:
+    """Read an offset index, ignoring a partially written trailing entry."""
+    offsets: array = array("Q")
+    if not path.exists():
+        return offsets
+
+    data: bytes = path.read_bytes()
+    usable: int = len(data) - len(data) % offsets.itemsize
+    offsets.frombytes(data[:usable])
+
+    if sys.byteorder == "big":
+        offsets.byteswap()
+
+    return offsets
+
+
+def _offsets_bytes(offsets: t.Iterable[int]) -> bytes:
+    _offsets: array = array("Q", offsets)
+    if sys.byteorder == "big":
+        _offsets.byteswap()
+
+    return _offsets.tobytes()
+
+
+def _scan_records(
+    path: Path, start: int = 0, read_size: int = DEFAULT_READ_SIZE
+) -> t.Iterator[tuple[int, int, t.Any]]:
+    """Yield the `(offset, end, record)` of each complete record in a data file, from byte `start`."""
+    with open(path, "rb") as infile:
+        infile.seek(start)
+        unpacker: msgpack.Unpacker = msgpack.Unpacker(
+            infile,
+            read_size=read_size,
+            raw=False,
+            strict_map_key=False,
+            ext_hook=ext_hook,
+        )
+
+        offset: int = start
+        for record in unpacker:
+            end: int = start + unpacker.tell()
+
+            yield offset, end, record
+
+            offset = end
+
+
+class MsgpackRecordStore(AbstractContextManager):
+    """An append-only msgpack record file, indexed by record number & (optionally) by key.
+
+    Description:
+        `get(n)` & `get_by_key(key)` look the record's byte range up in an in-memory index, then read &
+            unpack that record alone with a single `os.pread()`. Their cost does not depend on the number
+            of records.
+
+        Appends are crash-safe. A record is written to the data file before its index entries. On open,
+            index entries for records missing from the data file are dropped, records missing from the
+            indexes are re-indexed, and a torn record at the end of the data file (from a crash mid-write) is
+            truncated away. `rebuild_index()` rebuilds both indexes from the data file alone.
+
+        With `fsync=True`, `flush()` (called on close) fsyncs the data file before the indexes, so a power
+            loss can't leave index entries pointing past the end of the data.
+
+        A store has one writer at a time. Any number of readers can open it with `readonly=True`, and
+            see the records flushed before they opened it.
+
+    Params:
+        path (str|Path): The data file. The index files are created next to it.
+        key (str|Callable|None): Index records by key. A `str` reads the key from each (dict) record, a callable is
+            called with each record. Keys must be `str`, `int` or `bytes`. When keys repeat, the latest record wins.
+        readonly (bool): [Default: False] Open for reading only. Indexes are checked, but not repaired on disk.
+        fsync (bool): [Default: False] fsync the data file, then the indexes, on every `flush()`.
+        buffer_size (int): [Default: 1MiB] Size (in bytes) of the write buffers.
+
+    Usage:
+    ``` py linenums="1"
+    with MsgpackRecordStore("replay/events.msgpack", key="event_id") as store:
+        store.append({"event_id": "abc", "payload": ...})
+
+    with MsgpackRecordStore("replay/events.msgpack", key="event_id", readonly=True) as store:
+        store[0]
+        store.get_by_key("abc")
+    ```
+    """
+
+    def __init__(
+        self,
+        path: t.Union[str, Path] = None,
+        key: t.Union[str, t.Callable[[t.Any], RecordKey], None] = None,
+        readonly: bool = False,
+        fsync: bool = False,
+        buffer_size: int = DEFAULT_WRITE_BUFFER_SIZE,
+    ):
+        assert path is not None, ValueError("Missing a path for the record store")
+
+        self.path: Path = Path(f"{path}")
+        self.index_path: Path = Path(f"{self.path}{INDEX_SUFFIX}")
+        self.keys_path: Path = Path(f"{self.path}{KEYS_SUFFIX}")
+        self.key: t.Union[str, t.Callable[[t.Any], RecordKey], None] = key
+        self.readonly: bool = readonly
+        self.fsync: bool = fsync
+        self.buffer_size: int = buffer_size
+
+        self._offsets: array = array("Q")
+        self._keys: dict[RecordKey, int] = {}
+        ## Byte offset of the end of the last record
+        self._end: int = 0
+
+        self._packer: msgpack.Packer = msgpack.Packer(
+            default=ext_default, use_bin_type=True
+        )
+        self._reader: t.BinaryIO | None = None
+        self._data: t.BinaryIO | None = None
+        self._index: t.BinaryIO | None = None
+        self._keys_file: t.BinaryIO | None = None
+        self._dirty: bool = False
+
+    def __enter__(self) -> t.Self:
+        self.open()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.close()
+
+        if exc_val:
+            log.error(f"({exc_type}): {exc_val}")
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, number: int) -> t.Any:
+        return self.get(number)
+
+    def __contains__(self, key: RecordKey) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> t.Iterator[t.Any]:
+        """Stream every record, in the order they were appended."""
+        self._flush_data()
+
+        ## Stop at the last indexed record, ignoring a torn record left by a crashed writer
+        for _, end, record in _scan_records(self.path):
+            if end > self._end:
+                return
+
+            yield record
+
+    def _record_key(self, record: t.Any) -> RecordKey:
+        _key = self.key(record) if callable(self.key) else record[self.key]
+        assert isinstance(_key, (str, int, bytes)), TypeError(
+            f"Record keys must be str, int or bytes, not {type(_key)}"
+        )
+
+        return _key
+
+    def open(self) -> None:
+        """Load & check the indexes, repairing them (and the data file) unless `readonly`."""
+        if not self.readonly:
+            ensure_path(self.path.parent)
+            self.path.touch(exist_ok=True)
+
+        elif not self.path.exists():
+            raise FileNotFoundError(f"Could not find record store: {self.path}")
+
+        try:
+            self._reader = open(self.path, "rb", buffering=0)
+
+            self._load()
+
+            if not self.readonly:
+                self._data = open(self.path, "ab", buffering=self.buffer_size)
+                self._index = open(self.index_path, "ab", buffering=self.buffer_size)
+                if self.key is not None:
+                    self._keys_file = open(
+                        self.keys_path, "ab", buffering=self.buffer_size
+                    )
+
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception opening record store '{self.path}'. Details: {exc}"
+            )
+            log.error(msg)
+
+            self.close()
+
+            raise exc
+
+    def _load(self) -> None:
+        size: int = self.path.stat().st_size
+        offsets: array = _read_offsets(self.index_path)
+        indexed: int = len(offsets)
+
+        ## Drop entries pointing past the data, i.e. the data write was lost but the index write wasn't
+        while offsets and offsets[-1] >= size:
+            offsets.pop()
+
+        ## The last indexed record is re-read, to find its end & any records after it
+        start: int = offsets.pop() if offsets else 0
+        end: int = start
+        ## Keys of the scanned records, by record number
+        found: dict[int, RecordKey] = {}
+
+        for offset, end, record in _scan_records(self.path, start=start):
+            offsets.append(offset)
+            if self.key is not None:
+                found[len(offsets) - 1] = self._record_key(record)
+
+        self._offsets = offsets
+        self._end = end
+
+        repaired: bool = (
+            not self.index_path.exists()
+            or self.index_path.stat().st_size != indexed * offsets.itemsize
+            or len(offsets) != indexed
+        )
+
+        if end < size:
+            log.warning(
+                f"Record store '{self.path}' ends with a torn record ({size - end} bytes)"
+                + ("" if self.readonly else ", truncating it")
+            )
+            if not self.readonly:
+                os.truncate(self.path, end)
+
+        if self.key is not None:
+            repaired = self._load_keys(found) or repaired
+
+        if repaired:
+            if offsets:
+                log.info(
+                    f"Re-indexed record store '{self.path}' ({len(offsets)} records)"
+                )
+
+            if not self.readonly:
+                self._write_indexes()
+
+    def _load_keys(self, found: dict[int, RecordKey]) -> bool:
+        """Load the key index, adding keys of records it is missing. Returns `True` if it needed repairs."""
+        count: int = len(self._offsets)
+        covered: int = 0
+        repaired: bool = not self.keys_path.exists()
+        end: int = 0
+
+        if self.keys_path.exists():
+            for _, end, (_key, number) in _scan_records(self.keys_path):
+                if number >= count:
+                    repaired = True
+
+                    continue
+
+                self._keys[_key] = number
+                covered = max(covered, number + 1)
+
+            ## A torn entry at the end of the key index
+            repaired = repaired or end < self.keys_path.stat().st_size
+
+        ## Records appended after the last key index entry. Re-read any that were not just scanned.
+        for number in range(covered, count):
+            _key: RecordKey = (
+                found[number] if number in found else self._record_key(self.get(number))
+            )
+            self._keys[_key] = number
+            repaired = True
+
+        return repaired
+
+    def _write_indexes(self) -> None:
+        """Replace the index files with the in-memory indexes, atomically."""
+        tmp_index: Path = Path(f"{self.index_path}.tmp")
+        tmp_index.write_bytes(_offsets_bytes(self._offsets))
+        os.replace(tmp_index, self.index_path)
+
+        if self.key is not None:
+            tmp_keys: Path = Path(f"{self.keys_path}.tmp")
+            with open(tmp_keys, "wb") as outfile:
+                ## Ordered by record number, so the latest record of a repeated key is written last
+                for _key, number in sorted(
+                    self._keys.items(), key=lambda item: item[1]
+                ):
+                    outfile.write(self._packer.pack([_key, number]))
+            os.replace(tmp_keys, self.keys_path)
+
+    def rebuild_index(self) -> int:
+        """Rebuild both indexes from the data file alone.
+
+        Returns:
+            (int): The number of records indexed
+
+        """
+        assert not self.readonly, ValueError(
+            "Cannot rebuild the index of a read-only store"
+        )
+
+        self._flush_data()
+
+        for handle in (self._index, self._keys_file):
+            if handle is not None:
+                handle.close()
+
+        self.index_path.unlink(missing_ok=True)
+        self.keys_path.unlink(missing_ok=True)
+        self._offsets = array("Q")
+        self._keys = {}
+        self._end = 0
+
+        self._load()
+
+        self._index = open(self.index_path, "ab", buffering=self.buffer_size)
+        if self.key is not None:
+            self._keys_file = open(self.keys_path, "ab", buffering=self.buffer_size)
+
+        return len(self._offsets)
+
+    def append(self, record: t.Any = None) -> int:
+        """Append a record.
+
+        Returns:
+            (int): The record's number
+
+        Raises:
+            TypeError: When `record` contains a type msgpack can't serialize
+
+        """
+        assert self._data is not None, ValueError(
+            "MsgpackRecordStore is not open for writing. Use it in a 'with' statement, without readonly=True."
+        )
+
+        _key: RecordKey | None = (
+            self._record_key(record) if self.key is not None else None
+        )
+        packed: bytes = self._packer.pack(record)
+        number: int = len(self._offsets)
+
+        ## Data before index, so the index never points at a record that was not written
+        self._data.write(packed)
+        self._index.write(_offsets_bytes((self._end,)))
+        if self._keys_file is not None:
+            self._keys_file.write(self._packer.pack([_key, number]))
+            self._keys[_key] = number
+
+        self._offsets.append(self._end)
+        self._end += len(packed)
+        self._dirty = True
+
+        return number
+
+    def extend(self, records: t.Iterable[t.Any] = None) -> int:
+        """Append each record of an iterable.
+
+        Returns:
+            (int): The number of records appended
+
+        """
+        assert records is not None, ValueError("Missing records to append")
+
+        appended: int = 0
+        for record in records:
+            self.append(record)
+            appended += 1
+
+        return appended
+
+    def _flush_data(self) -> None:
+        """Make appended records visible to reads."""
+        if self._dirty and self._data is not None:
+            self._data.flush()
+            self._dirty = False
+
+    def flush(self) -> None:
+        """Write buffered records & index entries to disk (fsyncing them, with `fsync=True`)."""
+        self._flush_data()
+
+        for handle in (self._data, self._index, self._keys_file):
+            if handle is None:
+                continue
+
+            handle.flush()
+            if self.fsync:
+                os.fsync(handle.fileno())
+
+    def get(self, number: int = None) -> t.Any:
+        """Read & unpack record `number`. Negative numbers count from the last record.
+
+        Raises:
+            IndexError: When there is no record `number`
+
+        """
+        assert self._reader is not None, ValueError(
+            "MsgpackRecordStore is not open. Use it in a 'with' statement."
+        )
+
+        count: int = len(self._offsets)
+        if number < 0:
+            number += count
+        if not 0 <= number < count:
+            raise IndexError(
+                f"Record {number} out of range (store has {count} records)"
+            )
+
+        self._flush_data()
+
+        start: int = self._offsets[number]
+        end: int = self._offsets[number + 1] if number + 1 < count else self._end
+
+        return msgpack.unpackb(
+            os.pread(self._reader.fileno(), end - start, start),
+            raw=False,
+            strict_map_key=False,
+            ext_hook=ext_hook,
+        )
+
+    def get_by_key(self, key: RecordKey = None, default: t.Any = None) -> t.Any:
+        """Read & unpack the latest record with `key`, or return `default`."""
+        assert self.key is not None, ValueError(
+            "Record store has no key index. Pass key= when creating it."
+        )
+
+        number: int | None = self._keys.get(key)
+
+        return default if number is None else self.get(number)
+
+    def keys(self) -> t.KeysView[RecordKey]:
+        return self._keys.keys()
+
+    def close(self) -> None:
+        if self._data is not None:
+            self.flush()
+
+        for attr in ("_data", "_index", "_keys_file", "_reader"):
+            handle: t.BinaryIO | None = getattr(self, attr)
+            if handle is not None:
+                handle.close()
+                setattr(self, attr, None)
@@ -0,0 +1,223 @@
+"""Stream records to & from msgpack files, one record at a time.
+
+A record file is a plain concatenation of msgpack objects, one per record, so it can be appended to & read
+back without holding the whole file in memory.
+"""
+
+from __future__ import annotations
+
+import logging
+
+log = logging.getLogger("red_utils.ext.msgpack_utils")
+
+from contextlib import AbstractContextManager
+from pathlib import Path
+import typing as t
+
+from .constants import (
+    DEFAULT_MAX_BUFFER_SIZE,
+    DEFAULT_READ_SIZE,
+    DEFAULT_WRITE_BUFFER_SIZE,
+)
+from .ext_types import ext_default, ext_hook as default_ext_hook
+from .operations import ensure_path
+
+import msgpack
+
+
+class MsgpackRecordWriter(AbstractContextManager):
+    """Append records to a msgpack record file through a single, reused `msgpack.Packer`.
+
+    Description:
+        Each record is packed & written as it arrives, so memory use is bounded by the largest record, not
+            the file. Writes go through a `buffer_size` file buffer, so many small records are flushed in
+            large writes.
+
+    Params:
+        path (str|Path): The record file to write. Parent directories are created.
+        append (bool): [Default: False] Append to an existing file instead of truncating it.
+        default (Callable|None): Called with objects msgpack can't serialize, returning a serializable object.
+            Defaults to `ext_types.ext_default`.
+        buffer_size (int): [Default: 1MiB] Size (in bytes) of the file write buffer.
+
+    Usage:
+    ``` py linenums="1"
+    with MsgpackRecordWriter("dumps/users.msgpack") as writer:
+        for user in fetch_users():
+            writer.write(user)
+    ```
+    """
+
+    def __init__(
+        self,
+        path: t.Union[str, Path] = None,
+        append: bool = False,
+        default: t.Callable[[t.Any], t.Any] | None = None,
+        buffer_size: int = DEFAULT_WRITE_BUFFER_SIZE,
+    ):
+        assert path is not None, ValueError("Missing a path to write records to")
+
+        self.path: Path = Path(f"{path}")
+        self.append: bool = append
+        self.buffer_size: int = buffer_size
+
+        self.count: int = 0
+        self.bytes_written: int = 0
+
+        self._packer: msgpack.Packer = msgpack.Packer(
+            default=default or ext_default, use_bin_type=True
+        )
+        self._file: t.BinaryIO | None = None
+
+    def __enter__(self) -> t.Self:
+        ensure_path(self.path.parent)
+
+        try:
+            self._file = open(
+                self.path, "ab" if self.append else "wb", buffering=self.buffer_size
+            )
+        except Exception as exc:
+            msg = Exception(
+                f"Unhandled exception opening record file '{self.path}'. Details: {exc}"
+            )
+            log.error(msg)
+
+            raise exc
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.close()
+
+        if exc_val:
+            log.error(f"({exc_type}): {exc_val}")
+
+    def write(self, record: t.Any = None) -> int:
+        """Pack & write one record.
+
+        Returns:
+            (int): The number of bytes written
+
+        Raises:
+            TypeError: When `record` contains a type msgpack (and `default`) can't serialize
+
+        """
+        assert self._file is not None, ValueError(
+            "MsgpackRecordWriter is not open. Use it in a 'with' statement."
+        )
+
+        packed: bytes = self._packer.pack(record)
+        self._file.write(packed)
+
+        self.count += 1
+        self.bytes_written += len(packed)
+
+        return len(packed)
+
+    def write_many(self, records: t.Iterable[t.Any] = None) -> int:
+        """Pack & write each record of an iterable, consuming it lazily.
+
+        Returns:
+            (int): The number of records written
+
+        """
+        assert records is not None, ValueError("Missing records to write")
+
+        written: int = 0
+        for record in records:
+            self.write(record)
+            written += 1
+
+        return written
+
+    def flush(self) -> None:
+        """Flush buffered records to the file."""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def write_msgpack_records(
+    records: t.Iterable[t.Any] = None,
+    path: t.Union[str, Path] = None,
+    append: bool = False,
+    default: t.Callable[[t.Any], t.Any] | None = None,
+) -> int:
+    """Write an iterable of records to a msgpack record file, one record at a time.
+
+    Params:
+        records (Iterable): The records to write. Consumed lazily, i.e. a generator.
+        path (str|Path): The record file to write
+        append (bool): [Default: False] Append to an existing file instead of truncating it.
+        default (Callable|None): Called with objects msgpack can't serialize, returning a serializable object.
+            Defaults to `ext_types.ext_default`.
+
+    Returns:
+        (int): The number of records written
+
+    """
+    with MsgpackRecordWriter(path=path, append=append, default=default) as writer:
+        return writer.write_many(records)
+
+
+def iter_msgpack_records(
+    path: t.Union[str, Path] = None,
+    read_size: int = DEFAULT_READ_SIZE,
+    max_buffer_size: int = DEFAULT_MAX_BUFFER_SIZE,
+    ext_hook: t.Callable[[int, bytes], t.Any] | None = None,
+) -> t.Iterator[t.Any]:
+    """Lazily yield each record of a msgpack record file.
+
+    Description:
+        The file is read `read_size` bytes at a time into a `msgpack.Unpacker`, which holds at most
+            `max_buffer_size` bytes, so memory use is bounded by the largest record, not the file. A
+            record larger than `max_buffer_size` raises `msgpack.BufferFull`.
+
+        A truncated record at the end of the file (i.e. from a writer that was interrupted) is skipped
+            with a warning, after yielding every complete record before it.
+
+    Params:
+        path (str|Path): The record file to read
+        read_size (int): [Default: 1MiB] Bytes read from the file per refill of the buffer.
+        max_buffer_size (int): [Default: 64MiB] Largest record (in bytes) that can be read.
+        ext_hook (Callable|None): Called with the code & data of each msgpack `ExtType`, returning the decoded object.
+            Defaults to `ext_types.ext_hook`.
+
+    Returns:
+        (Iterator[Any]): The records, in the order they were written. Arrays unpack as lists.
+
+    """
+    assert path is not None, ValueError("Missing a path to read records from")
+    path = Path(f"{path}")
+
+    if not path.exists():
+        raise FileNotFoundError(f"Could not find file: {path}")
+
+    with open(path, "rb") as infile:
+        unpacker: msgpack.Unpacker = msgpack.Unpacker(
+            infile,
+            read_size=min(read_size, max_buffer_size),
+            max_buffer_size=max_buffer_size,
+            raw=False,
+            strict_map_key=False,
+            ext_hook=ext_hook or default_ext_hook,
+        )
+
+        ## Offset of the end of the last complete record
+        end: int = 0
+
+        for record in unpacker:
+            end = unpacker.tell()
+
+            yield record
+
+        ## The Unpacker stops quietly when the file ends part-way through a record
+        size: int = path.stat().st_size
+        if end < size:
+            log.warning(
+                f"Ignoring truncated record at the end of '{path}' ({size - end} bytes)"
+            )
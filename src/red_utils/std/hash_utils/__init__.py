@@ -2,4 +2,4 @@
 
 from __future__ import annotations
 
-from .operations import get_hash_from_str
+from .operations import get_hash_from_file, get_hash_from_str
@@ -5,6 +5,8 @@ import logging
 log = logging.getLogger("red_utils.std.hash_utils")
 
 import hashlib
+from pathlib import Path
+import typing as t
 
 
 def get_hash_from_str(input_str: str = None, encoding: str = "utf-8") -> str:
@@ -54,6 +56,60 @@ def get_hash_from_str(input_str: str = None, encoding: str = "utf-8") -> str:
     return hash
 
 
+def get_hash_from_file(
+    filepath: t.Union[str, Path] = None,
+    algorithm: str = "sha256",
+    chunk_size: int = 1024 * 1024,
+) -> str:
+    """Return the hex digest of a file's contents.
+
+    Description:
+        The file is read `chunk_size` bytes at a time, so files of any size can be hashed
+            without loading them into memory.
+
+    Params:
+        filepath (str|Path): Path to the file to hash
+        algorithm (str): [Default: sha256] Any algorithm supported by `hashlib.new()`, i.e. `md5`, `sha1`, `sha256`
+        chunk_size (int): Number of bytes to read at a time
+
+    Returns:
+        (str): The file's hex digest
+
+    Raises:
+        ValueError: When input validation fails
+        FileNotFoundError: When `filepath` does not exist
+
+    """
+    if not filepath:
+        raise ValueError("Missing filepath")
+
+    if algorithm not in hashlib.algorithms_available:
+        raise ValueError(
+            f"Unsupported hash algorithm: {algorithm}. Must be one of {sorted(hashlib.algorithms_available)}"
+        )
+
+    filepath: Path = Path(f"{filepath}")
+    if not filepath.is_file():
+        raise FileNotFoundError(f"Could not find file '{filepath}'")
+
+    hasher = hashlib.new(algorithm)
+
+    try:
+        with open(filepath, "rb") as f:
+            while chunk := f.read(chunk_size):
+                hasher.update(chunk)
+
+    except Exception as exc:
+        msg = Exception(
+            f"Unhandled exception hashing file '{filepath}'. Details: {exc}"
+        )
+        log.error(msg)
+
+        raise exc
+
+    return hasher.hexdigest()
+
+
 if __name__ == "__main__":
     log.info(f"Hashlib demo start")
 
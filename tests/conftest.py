@@ -10,4 +10,5 @@ pytest_plugins = [
     "tests.fixtures.ext.time_fixtures",
     "tests.fixtures.ext.sqla_fixtures",
     "tests.fixtures.ext.httpx_fixtures",
+    "tests.fixtures.ext.diskcache_fixtures",
 ]
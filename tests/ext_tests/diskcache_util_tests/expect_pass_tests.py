@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+import threading
+import time
+
+from red_utils.ext import diskcache_utils
+
+import diskcache
+from pytest import mark, xfail
+
+
+@mark.diskcache_utils
+def test_batch_operations(diskcache_controller: diskcache_utils.DiskCacheController):
+    items: dict[str, int] = {f"key-{i}": i + 1 for i in range(25)}
+
+    written: int = diskcache_controller.set_many(items, tag="batch", chunk_size=10)
+    assert written == 25, f"Expected 25 items written, got {written}"
+
+    vals: dict = diskcache_controller.get_many(["key-0", "key-24", "missing"])
+    assert vals["key-0"] == 1 and vals["key-24"] == 25
+    assert (
+        vals["missing"] is diskcache_utils.MISSING
+    ), "Cache miss was not marked MISSING"
+
+    assert diskcache_controller.delete_many(["key-0", "key-1"], tag="other") == 0
+    deleted: int = diskcache_controller.delete_many(
+        (f"key-{i}" for i in range(10)), tag="batch", chunk_size=4
+    )
+    assert deleted == 10, f"Expected 10 keys deleted, got {deleted}"
+    assert not diskcache_controller.check_key_exists("key-9")
+    assert diskcache_controller.check_key_exists("key-10")
+
+
+@mark.diskcache_utils
+def test_get_many_reads_without_write_lock(tmp_path: Path):
+    items: dict = {"int": 1, "str": "value", "file": "x" * 50_000, ("tuple", 1): [1]}
+
+    with (
+        diskcache.Cache(tmp_path) as writer,
+        diskcache.Cache(tmp_path, timeout=0.1) as reader,
+    ):
+        diskcache_utils.set_many(cache=writer, items=items)
+        writer.set("expired", 1, expire=-1)
+
+        ## Another connection holding the write lock doesn't block reads
+        with writer.transact():
+            vals: dict = diskcache_utils.get_many(
+                cache=reader, keys=[*items, "expired"]
+            )
+        assert vals == {**items, "expired": diskcache_utils.MISSING}
+
+        ## Eviction policies that update keys on read fall back to cache.get()
+        reader.reset("eviction_policy", "least-recently-used")
+        assert diskcache_utils.get_many(cache=reader, keys=list(items)) == items
+
+
+@mark.diskcache_utils
+def test_fanout_controller(tmp_path: Path):
+    with diskcache_utils.FanoutDiskCacheController(
+        cache_directory=tmp_path / "fanout", shards=4
+    ) as ctl:
+        assert ctl.set(key="single", val="value")
+        assert ctl.get(key="single") == "value"
+
+        keys: list[str] = [f"key-{i}" for i in range(50)]
+        assert ctl.set_many({key: key.upper() for key in keys}, chunk_size=16) == 50
+        assert list(ctl.get_many(keys)) == keys, "get_many() did not keep key order"
+        assert ctl.delete_many(keys[:10]) == 10
+        assert ctl.get_many(keys[:1])["key-0"] is diskcache_utils.MISSING
+
+    shard_dirs: list[str] = sorted(p.name for p in (tmp_path / "fanout").iterdir())
+    assert shard_dirs == [
+        "000",
+        "001",
+        "002",
+        "003",
+    ], f"Unexpected shards: {shard_dirs}"
+
+
+@mark.diskcache_utils
+def test_l1_tier_invalidation(tmp_path: Path):
+    cache_dir: Path = tmp_path / "two-tier"
+
+    with (
+        diskcache_utils.DiskCacheController(
+            cache_directory=cache_dir, l1_maxsize=2, l1_sync_interval=0
+        ) as writer,
+        diskcache_utils.DiskCacheController(
+            cache_directory=cache_dir, l1_maxsize=2, l1_sync_interval=0
+        ) as reader,
+    ):
+        writer.set(key="hot", val="v1")
+        assert reader.get(key="hot") == "v1"
+        assert reader.get(key="hot") == "v1"
+
+        ## A write by another controller invalidates the reader's in-memory copy
+        writer.set(key="hot", val="v2")
+        assert reader.get(key="hot") == "v2", "L1 tier served a stale value"
+
+        stats: dict = reader.tier_stats()
+        assert stats["l1"]["hits"] == 1, f"Unexpected L1 stats: {stats['l1']}"
+        assert stats["disk"]["hits"] == 2, f"Unexpected disk stats: {stats['disk']}"
+
+        for key in ("a", "b", "c"):
+            writer.set(key=key, val=key)
+        assert len(writer.l1) == 2, "L1 tier grew past l1_maxsize"
+
+        ## clear() can't reset the version counter, so the reader never mistakes a new write for one it saw
+        writer.clear()
+        writer.set(key="hot", val="v3")
+        assert reader.get(key="hot") == "v3"
+        writer.clear()
+        writer.set(key="x", val=1)
+        assert reader.get(key="hot") is None, "L1 tier served a cleared value"
+
+    ## Writes by controllers without an L1 tier, and by diskcache_utils functions, invalidate too
+    with (
+        diskcache_utils.DiskCacheController(cache_directory=cache_dir) as plain,
+        diskcache_utils.DiskCacheController(
+            cache_directory=cache_dir, l1_maxsize=2, l1_sync_interval=0
+        ) as reader,
+    ):
+        plain.set(key="hot", val="v4")
+        assert reader.get(key="hot") == "v4"
+        plain.delete(key="hot")
+        assert reader.get(key="hot") is None
+        diskcache_utils.set_val(cache=plain.cache, key="hot", val="v5")
+        assert reader.get(key="hot") == "v5"
+        diskcache_utils.set_many(cache=plain.cache, items={"hot": "v6"})
+        assert reader.get(key="hot") == "v6"
+
+
+@mark.diskcache_utils
+def test_cached_decorator_stampede_lock(tmp_path: Path):
+    calls: list[int] = []
+
+    with diskcache.Cache(tmp_path / "memoize") as cache:
+
+        @diskcache_utils.cached(
+            cache,
+            expire=diskcache_utils.TimeoutConf(unit="minutes", amount=5),
+            ignore=["session"],
+        )
+        def slow_square(x: int, session: object = None) -> int:
+            calls.append(x)
+            time.sleep(0.1)
+
+            return x * x
+
+        threads: list[threading.Thread] = [
+            threading.Thread(
+                target=slow_square, args=(4,), kwargs={"session": object()}
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [4], f"Expected one computation, got {len(calls)}"
+        assert slow_square(x=4) == 16, "Keyword call did not share the cached value"
+
+        @diskcache_utils.cached(cache, stampede="lock")
+        async def async_lookup(name: str) -> None:
+            calls.append(name)
+            await asyncio.sleep(0.05)
+
+        async def _gather():
+            return await asyncio.gather(*(async_lookup("a") for _ in range(5)))
+
+        assert asyncio.run(_gather()) == [None] * 5
+        assert calls.count("a") == 1, "None results were not cached"
+
+        assert slow_square.invalidate(4)
+        slow_square(4)
+        assert calls.count(4) == 2, "Invalidated value was not recomputed"
+
+
+@mark.diskcache_utils
+def test_msgpack_disks_round_trip(tmp_path: Path):
+    from red_utils.ext.diskcache_utils import disks
+
+    values: dict = {
+        "text": "value",
+        "bytes": b"\x00\x01",
+        "int": 7,
+        "float": 1.5,
+        "list": [1, "two", None, True],
+        "dict": {"nested": [0] * 2000, 1: "int key"},
+        "none": None,
+        ## msgpack would return tuples as lists, so these fall back to pickle
+        "tuple_key": {(1, 2): "a"},
+        "tuple": [1, (2, 3)],
+    }
+
+    with diskcache.Cache(tmp_path / "pickled") as cache:
+        cache.set("pickled", {"written": "by the default Disk"})
+
+    for disk in (disks.MsgpackDisk, disks.ZlibMsgpackDisk, disks.LzmaMsgpackDisk):
+        with diskcache.Cache(tmp_path / disk.__name__, disk=disk) as cache:
+            for key, val in values.items():
+                cache.set(key, val)
+
+            assert {
+                key: cache.get(key) for key in values
+            } == values, f"{disk.__name__} did not round-trip"
+
+        with diskcache.Cache(tmp_path / "pickled", disk=disk) as cache:
+            assert cache.get("pickled") == {"written": "by the default Disk"}
+
+    packed: bytes = disks.ZlibMsgpackDisk(str(tmp_path)).encode({"nested": [0] * 2000})
+    assert len(packed) < 100, f"Large value was not compressed ({len(packed)} bytes)"
+
+
+@mark.diskcache_utils
+def test_cache_instrumentation_snapshot(tmp_path: Path):
+    with diskcache_utils.DiskCacheController(
+        cache_directory=tmp_path, instrument=True, diskcache_stats=True
+    ) as ctl:
+        ctl.set("present", "value")
+        ctl.get("present")
+        ctl.get("absent")
+        ctl.get_many(["present", "absent", "also-absent"])
+        ctl.delete("present")
+
+        snapshot: diskcache_utils.CacheStatsSnapshot = ctl.stats_snapshot(check=True)
+
+    assert snapshot.counters["sets"] == 1
+    assert snapshot.counters["hits"] == 2, snapshot.counters
+    assert snapshot.counters["misses"] == 3, snapshot.counters
+    assert snapshot.counters["deletes"] == 1
+    assert snapshot.hit_rate == 2 / 5
+
+    assert snapshot.latency["get"]["count"] == 2
+    assert 0 < snapshot.latency["get"]["p50_us"] <= snapshot.latency["get"]["max_us"]
+    assert snapshot.diskcache["hits"] >= 1 and snapshot.diskcache["misses"] >= 1
+    assert snapshot.warnings == []
+
+    histogram = diskcache_utils.LatencyHistogram()
+    for seconds in (0.000_001, 0.000_003, 0.000_004, 0.002):
+        histogram.record(seconds)
+    assert histogram.percentile(50) == 5
+    assert histogram.percentile(100) == 2000
+
+
+@mark.diskcache_utils
+def test_async_controller(tmp_path: Path):
+    async def _run() -> None:
+        async with diskcache_utils.AsyncDiskCacheController(
+            cache_directory=tmp_path, l1_maxsize=16, max_workers=2
+        ) as cache:
+            assert await cache.set_many({f"key-{i}": i + 1 for i in range(20)}) == 20
+
+            ## Reads overlap on the pool, while the loop keeps running other tasks
+            ticks: list[int] = []
+
+            async def _tick() -> None:
+                for i in range(5):
+                    ticks.append(i)
+                    await asyncio.sleep(0)
+
+            values, _ = await asyncio.gather(
+                asyncio.gather(*(cache.get(f"key-{i}") for i in range(20))),
+                _tick(),
+            )
+            assert values == list(range(1, 21))
+            assert ticks == list(range(5))
+
+            ## Served from the L1 tier, without a thread
+            assert await cache.get("key-19") == 20
+            assert cache.tier_stats()["l1"]["hits"] >= 1
+
+            assert await cache.delete_many(["key-0", "key-1"]) == 2
+            assert await cache.get("key-0") is None
+            assert (await cache.get_many(["key-1", "key-2"]))["key-2"] == 3
+
+        assert cache._executor is None
+
+    asyncio.run(_run())
+
+
+@mark.diskcache_utils
+def test_tag_groups_and_sweeper(
+    diskcache_controller: diskcache_utils.DiskCacheController,
+):
+    diskcache_controller.set_many({f"a-{i}": i + 1 for i in range(5)}, tag="tenant-a")
+    diskcache_controller.set_many({f"b-{i}": i + 1 for i in range(3)}, tag="tenant-b")
+
+    assert diskcache_controller.evict_tags(["tenant-a", "missing"]) == 5
+    assert diskcache_controller.get("a-0") is None
+    assert diskcache_controller.get("b-0") == 1
+
+    assert diskcache_controller.touch_tag("tenant-b", expire=3600, slice_size=2) == 3
+    _, expire_time = diskcache_controller.cache.get("b-2", expire_time=True)
+    assert expire_time is not None and expire_time > time.time() + 3500
+
+    assert diskcache_controller.expire_older_than(3600) == 0
+    assert diskcache_controller.expire_older_than(0) == 3
+
+    cache: diskcache.Cache = diskcache_controller.cache
+    for i in range(5):
+        cache.set(f"expiring-{i}", i, expire=0.01)
+    time.sleep(0.02)
+
+    sweeper = diskcache_utils.CacheSweeper(cache, slice_size=2, max_slices=1, pause=0)
+    result: diskcache_utils.SweepResult = sweeper.sweep()
+    assert (result.expired, result.done) == (2, False), result
+
+    with sweeper:
+        deadline: float = time.monotonic() + 5
+        while sweeper.totals.expired < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    assert not sweeper.running
+    assert sweeper.totals.expired == 5
+    assert len(cache) == 0
@@ -1,8 +1,19 @@
 from __future__ import annotations
 
+import asyncio
+from email.utils import formatdate
+import hashlib
+import json
 from pathlib import Path
+import threading
+import time
 
-from pytest import mark, xfail
+from red_utils.ext import httpx_utils
+
+import httpx
+import pytest
+
+from pytest import mark, raises, xfail
 
 
 @mark.httpx_utils
@@ -15,3 +26,575 @@ def test_httpx_tmpdir(httpx_tmp_cache: Path):
         raise FileNotFoundError(f"Could not find path '{httpx_tmp_cache}'")
     else:
         return True
+
+
+@mark.httpx_utils
+def test_async_controller_gather_requests():
+    in_flight: dict[str, int] = {"now": 0, "max": 0}
+
+    async def _handler(request: httpx.Request) -> httpx.Response:
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+
+        return httpx.Response(200, json={"path": request.url.path})
+
+    async def _run() -> list[httpx.Response]:
+        async with httpx_utils.AsyncHTTPXController(
+            transport=httpx.MockTransport(_handler), max_concurrency=3
+        ) as ctl:
+            reqs = (ctl.new_request(url=f"https://example.com/{i}") for i in range(10))
+
+            return await ctl.gather_requests(reqs)
+
+    responses = asyncio.run(_run())
+
+    assert [res.json()["path"] for res in responses] == [f"/{i}" for i in range(10)]
+    assert (
+        in_flight["max"] <= 3
+    ), f"Expected at most 3 requests in flight, got {in_flight['max']}"
+
+
+@mark.httpx_utils
+def test_decode_res_content_strategies():
+    data: dict = {"name": "café"}
+    body: str = json.dumps(data, ensure_ascii=False)
+
+    httpx_utils.decoders.reset_decode_stats()
+
+    utf8_res = httpx.Response(200, content=body.encode("utf-8"))
+    bom_res = httpx.Response(200, content=body.encode("utf-16"))
+    declared_res = httpx.Response(
+        200,
+        content=body.encode("cp1252"),
+        headers={"Content-Type": "application/json; charset=cp1252"},
+    )
+
+    for res in [utf8_res, bom_res, declared_res]:
+        assert httpx_utils.decoders.decode_res_content(res=res) == data
+
+    stats: dict[str, int] = httpx_utils.decoders.get_decode_stats()
+    assert stats["utf-8"] == 1, f"Expected 1 utf-8 decode, got {stats}"
+    assert stats["bom"] == 1, f"Expected 1 BOM decode, got {stats}"
+    assert stats["content-type"] == 1, f"Expected 1 Content-Type decode, got {stats}"
+    assert stats["detected"] == 0, f"Expected no chardet detection, got {stats}"
+
+
+@mark.httpx_utils
+def test_stream_decoders():
+    records: list[dict] = [{"id": i, "name": f"record-{i}"} for i in range(100)]
+
+    ndjson_res = httpx.Response(
+        200, content="\n".join(json.dumps(r) for r in records).encode("utf-8")
+    )
+    array_res = httpx.Response(200, content=json.dumps(records).encode("utf-8"))
+
+    ## Small chunks force records to be split across reads
+    assert (
+        list(httpx_utils.decoders.iter_ndjson(res=ndjson_res, chunk_size=7)) == records
+    )
+    assert (
+        list(httpx_utils.decoders.iter_json_array(res=array_res, chunk_size=7))
+        == records
+    )
+
+    ## Items spanning many chunks, with brackets, quotes & escapes inside strings
+    items: list = [
+        {"text": 'a "quoted" ] } [ { \\ string', "nested": [[1, [2, {"x": "]"}]]] * 50},
+        'top-level \\" string ]',
+        -1.5e-7,
+        None,
+        ["é", "\u2028"],
+    ]
+    for ensure_ascii in (True, False):
+        tricky_res = httpx.Response(
+            200, content=json.dumps(items, ensure_ascii=ensure_ascii).encode("utf-8")
+        )
+        assert (
+            list(httpx_utils.decoders.iter_json_array(res=tricky_res, chunk_size=5))
+            == items
+        )
+
+    with pytest.raises(ValueError):
+        list(
+            httpx_utils.decoders.iter_json_array(
+                res=httpx.Response(200, content=b'[{"a": [1, 2'), chunk_size=3
+            )
+        )
+
+
+@mark.httpx_utils
+def test_retry_transport_and_circuit_breaker():
+    attempts: dict[str, int] = {"count": 0}
+
+    def _flaky(request: httpx.Request) -> httpx.Response:
+        attempts["count"] += 1
+        if attempts["count"] < 3:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+
+        return httpx.Response(200)
+
+    with httpx_utils.HTTPXController(
+        transport=httpx.MockTransport(_flaky), retries=3
+    ) as ctl:
+        res = ctl.send_request(ctl.new_request(url="https://example.com/"))
+
+    assert res.status_code == 200, f"Expected retries to succeed, got {res.status_code}"
+    assert attempts["count"] == 3, f"Expected 3 attempts, got {attempts['count']}"
+
+    def _down(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("Connection refused")
+
+    breaker = httpx_utils.CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    transport = httpx_utils.RetryTransport(
+        transport=httpx.MockTransport(_down),
+        max_retries=5,
+        backoff_factor=0,
+        circuit_breaker=breaker,
+    )
+
+    with httpx.Client(transport=transport) as client:
+        with pytest.raises(httpx_utils.CircuitOpenError):
+            client.get("https://down.example.com/")
+
+    assert breaker.state("down.example.com") == "open"
+
+
+@mark.httpx_utils
+def test_rate_limiter_shared_bucket(httpx_echo_transport: httpx.MockTransport):
+    limiter = httpx_utils.RateLimiter(rate=50, burst=1, per="host")
+
+    start: float = time.monotonic()
+    ## Two controllers sharing a limiter are held to one rate
+    for _ in range(2):
+        with httpx_utils.HTTPXController(
+            transport=httpx_echo_transport, rate_limiter=limiter
+        ) as ctl:
+            for _ in range(5):
+                ctl.send_request(ctl.new_request(url="https://example.com/"))
+    elapsed: float = time.monotonic() - start
+
+    ## 10 requests at 50/s with a burst of 1 take at least 9 * 0.02s
+    assert elapsed >= 0.17, f"Expected requests to be rate limited, took {elapsed}s"
+
+
+@mark.httpx_utils
+def test_client_registry_keeps_transport_open():
+    class _TrackedTransport(httpx.MockTransport):
+        closed: bool = False
+
+        def close(self) -> None:
+            self.closed = True
+
+    transport = _TrackedTransport(lambda request: httpx.Response(200))
+    registry = httpx_utils.ClientRegistry(idle_timeout=60)
+
+    for _ in range(3):
+        with httpx_utils.HTTPXController(
+            transport=transport, client_registry=registry
+        ) as ctl:
+            ctl.send_request(ctl.new_request(url="https://example.com/"))
+
+    assert not transport.closed, "Pooled transport was closed when a controller exited"
+    assert len(registry) == 1, f"Expected 1 pooled transport, got {len(registry)}"
+
+    registry.shutdown()
+    assert transport.closed, "Pooled transport was not closed on registry shutdown"
+
+
+@mark.httpx_utils
+def test_controller_applies_pool_limits():
+    with httpx_utils.HTTPXController(
+        max_connections=7, max_keepalive_connections=3, keepalive_expiry=12
+    ) as ctl:
+        pool = ctl.client._transport._pool
+
+        assert pool._max_connections == 7, "max_connections was not applied"
+        assert pool._max_keepalive_connections == 3
+        assert pool._keepalive_expiry == 12
+
+    with pytest.raises(AssertionError):
+        httpx_utils.HTTPXController(http1=False, http2=False)
+
+
+@mark.httpx_utils
+def test_singleflight_coalesces_requests():
+    upstream_calls: dict[str, int] = {"count": 0}
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        upstream_calls["count"] += 1
+        time.sleep(0.1)
+
+        return httpx.Response(200, json={"path": request.url.path})
+
+    group = httpx_utils.SingleFlight()
+    results: list[dict] = []
+
+    def _fetch() -> None:
+        with httpx_utils.HTTPXController(
+            transport=httpx.MockTransport(_handler), singleflight=group
+        ) as ctl:
+            results.append(
+                ctl.send_request(ctl.new_request(url="https://example.com/a")).json()
+            )
+
+    threads: list[threading.Thread] = [
+        threading.Thread(target=_fetch) for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [{"path": "/a"}] * 5
+    assert (
+        upstream_calls["count"] == 1
+    ), f"Expected 1 upstream request, got {upstream_calls['count']}"
+
+
+@mark.httpx_utils
+def test_singleflight_streams_uncoalesced_requests():
+    upstream_calls: dict[str, int] = {"count": 0}
+    chunks_sent: list[int] = []
+
+    class _Stream(httpx.SyncByteStream):
+        def __iter__(self):
+            for i in range(3):
+                chunks_sent.append(i)
+                yield b"x" * 10
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        upstream_calls["count"] += 1
+        time.sleep(0.1)
+
+        return httpx.Response(200, stream=_Stream())
+
+    transport = httpx_utils.controllers.SingleFlightTransport(
+        transport=httpx.MockTransport(_handler)
+    )
+
+    ## A request nobody joined is streamed, not read into memory first
+    with httpx.Client(transport=transport) as client:
+        with client.stream("GET", "https://example.com/a") as res:
+            assert chunks_sent == []
+            assert res.read() == b"x" * 30
+
+    ## Range requests & opted-out requests are never coalesced
+    def _fetch(headers: dict, extensions: dict) -> None:
+        with httpx.Client(transport=transport) as client:
+            client.get("https://example.com/a", headers=headers, extensions=extensions)
+
+    for headers, extensions in (
+        ({"Range": "bytes=0-9"}, {}),
+        ({}, {"singleflight": False}),
+    ):
+        upstream_calls["count"] = 0
+        threads: list[threading.Thread] = [
+            threading.Thread(target=_fetch, args=(headers, extensions))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert upstream_calls["count"] == 3, (headers, extensions)
+
+
+@mark.httpx_utils
+def test_diskcache_storage_serves_cached_responses(tmp_path: Path):
+    upstream_calls: dict[str, int] = {"count": 0}
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        upstream_calls["count"] += 1
+
+        return httpx.Response(
+            200,
+            headers={"Cache-Control": "max-age=60", "Date": formatdate(usegmt=True)},
+            json={"path": request.url.path},
+        )
+
+    storage = httpx_utils.DiskCacheStorage(directory=tmp_path, shards=2, ttl=60)
+    transport = httpx_utils.get_cache_transport(
+        transport=httpx.MockTransport(_handler), storage=storage
+    )
+
+    with httpx.Client(transport=transport) as client:
+        responses: list[httpx.Response] = [
+            client.get("https://example.com/a") for _ in range(3)
+        ]
+
+    assert [res.json() for res in responses] == [{"path": "/a"}] * 3
+    assert [res.extensions["from_cache"] for res in responses] == [False, True, True]
+    assert (
+        upstream_calls["count"] == 1
+    ), f"Expected 1 upstream request, got {upstream_calls['count']}"
+
+
+class _CountingCursorPagination(httpx_utils.CursorPagination):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.decodes: int = 0
+
+    def decode(self, response: httpx.Response = None):
+        self.decodes += 1
+
+        return super().decode(response=response)
+
+
+@mark.httpx_utils
+def test_paginate_strategies():
+    records: list[int] = list(range(45))
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+
+        if "offset" in params:
+            offset, limit = int(params["offset"]), int(params["limit"])
+
+            return httpx.Response(200, json={"data": records[offset : offset + limit]})
+
+        cursor: int = int(params.get("cursor", 0))
+        next_cursor: int | None = cursor + 10 if cursor + 10 < len(records) else None
+
+        return httpx.Response(
+            200,
+            json={"data": records[cursor : cursor + 10], "next_cursor": next_cursor},
+        )
+
+    with httpx_utils.HTTPXController(transport=httpx.MockTransport(_handler)) as ctl:
+        req: httpx.Request = ctl.new_request(url="https://example.com/items")
+
+        by_offset: list[int] = list(
+            ctl.paginate(
+                request=req,
+                strategy=httpx_utils.OffsetPagination(
+                    page_size=10, records_path="data"
+                ),
+                prefetch=3,
+            )
+        )
+        cursor_strategy = _CountingCursorPagination(records_path="data")
+        by_cursor: list[int] = list(ctl.paginate(request=req, strategy=cursor_strategy))
+
+    assert by_offset == records, f"Offset pagination returned {by_offset}"
+    assert by_cursor == records, f"Cursor pagination returned {by_cursor}"
+    ## One decode per page, shared by get_records() & next_request()
+    assert cursor_strategy.decodes == 5, f"Decoded {cursor_strategy.decodes} times"
+
+    ## A Link header pointing at another host is sent with that host's Host header
+    hosts: list[str] = []
+
+    def _link_handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.headers["Host"])
+        headers = (
+            {"Link": '<https://other.example.com/items?page=2>; rel="next"'}
+            if request.url.host == "example.com"
+            else {}
+        )
+
+        return httpx.Response(200, json=[request.url.host], headers=headers)
+
+    with httpx_utils.HTTPXController(
+        transport=httpx.MockTransport(_link_handler)
+    ) as ctl:
+        by_link: list[str] = list(
+            ctl.paginate(
+                request=ctl.new_request(url="https://example.com/items"),
+                strategy=httpx_utils.LinkHeaderPagination(),
+            )
+        )
+
+    assert by_link == ["example.com", "other.example.com"]
+    assert hosts == ["example.com", "other.example.com"], hosts
+
+
+@mark.httpx_utils
+def test_download_resumes_and_splits_ranges(tmp_path: Path):
+    body: bytes = bytes(range(256)) * 400
+    ranges: list[str | None] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        headers: dict[str, str] = {"Accept-Ranges": "bytes", "ETag": '"v1"'}
+        if request.method == "HEAD":
+            return httpx.Response(
+                200, headers={**headers, "Content-Length": str(len(body))}
+            )
+
+        range_header: str | None = request.headers.get("Range")
+        ranges.append(range_header)
+        if not range_header:
+            return httpx.Response(200, headers=headers, content=body)
+
+        assert request.headers.get("If-Range") == '"v1"'
+        start, _, end = range_header.removeprefix("bytes=").partition("-")
+        end: int = int(end) if end else len(body) - 1
+
+        return httpx.Response(206, headers=headers, content=body[int(start) : end + 1])
+
+    checksum: str = hashlib.sha256(body).hexdigest()
+    ## A partial file (& its sidecar) left by an interrupted download
+    (tmp_path / "resumed.bin.part").write_bytes(body[:1000])
+    (tmp_path / "resumed.bin.part.meta").write_text(
+        json.dumps({"mode": "stream", "validator": '"v1"', "size": len(body)})
+    )
+
+    with httpx_utils.HTTPXController(transport=httpx.MockTransport(_handler)) as ctl:
+        split = ctl.download(
+            url="https://example.com/split.bin",
+            dest=tmp_path,
+            checksum=checksum,
+            part_size=40_000,
+        )
+        resumed = ctl.download(
+            url="https://example.com/resumed.bin",
+            dest=tmp_path / "resumed.bin",
+            checksum=checksum,
+        )
+
+    assert split.read_bytes() == body
+    assert resumed.read_bytes() == body
+    assert ranges == [
+        "bytes=0-39999",
+        "bytes=40000-79999",
+        "bytes=80000-102399",
+        "bytes=1000-",
+    ], f"Unexpected range requests: {ranges}"
+    assert not list(tmp_path.glob("*.part*")), "Partial files were not cleaned up"
+
+
+@mark.httpx_utils
+def test_download_discards_unverifiable_partials(tmp_path: Path):
+    body: bytes = bytes(range(256)) * 400
+    etag: dict[str, str] = {"value": '"v1"'}
+    ranges: list[str | None] = []
+    fail_range: list[str] = ["bytes=40000-79999"]
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        headers: dict[str, str] = {"Accept-Ranges": "bytes", "ETag": etag["value"]}
+        if request.method == "HEAD":
+            return httpx.Response(
+                200, headers={**headers, "Content-Length": str(len(body))}
+            )
+
+        range_header: str | None = request.headers.get("Range")
+        ranges.append(range_header)
+        if range_header in fail_range:
+            fail_range.clear()
+            return httpx.Response(503)
+        if not range_header:
+            return httpx.Response(200, headers=headers, content=body)
+
+        start, _, end = range_header.removeprefix("bytes=").partition("-")
+        end: int = int(end) if end else len(body) - 1
+
+        return httpx.Response(206, headers=headers, content=body[int(start) : end + 1])
+
+    checksum: str = hashlib.sha256(body).hexdigest()
+    dest: Path = tmp_path / "file.bin"
+    part: Path = tmp_path / "file.bin.part"
+
+    with httpx_utils.HTTPXController(transport=httpx.MockTransport(_handler)) as ctl:
+
+        def _download(**kwargs) -> Path:
+            ranges.clear()
+
+            return ctl.download(
+                url="https://example.com/file.bin",
+                dest=dest,
+                checksum=checksum,
+                **{"part_size": 40_000, "max_workers": 1, **kwargs},
+            )
+
+        ## An interrupted parallel download leaves a full-size, partly zero-filled file
+        with raises(httpx.HTTPError):
+            _download(max_workers=2)
+        assert part.stat().st_size == len(body)
+        assert not dest.exists()
+
+        ## Resuming only requests the ranges that did not finish
+        assert _download().read_bytes() == body
+        assert ranges == ["bytes=40000-79999"], f"Unexpected range requests: {ranges}"
+
+        ## A partial written under another version of the file is discarded
+        dest.unlink()
+        part.write_bytes(body[:1000])
+        (tmp_path / "file.bin.part.meta").write_text(
+            json.dumps({"mode": "stream", "validator": '"v0"', "size": len(body)})
+        )
+        assert _download(part_size=len(body)).read_bytes() == body
+        assert ranges == [None], f"Unexpected range requests: {ranges}"
+
+        ## As is a partial without a recorded validator, or one larger than the file
+        for partial, validator in ((body[:1000], None), (body + b"extra", '"v1"')):
+            dest.unlink()
+            part.write_bytes(partial)
+            if validator:
+                (tmp_path / "file.bin.part.meta").write_text(
+                    json.dumps(
+                        {"mode": "stream", "validator": validator, "size": len(body)}
+                    )
+                )
+            assert _download(part_size=len(body)).read_bytes() == body
+            assert ranges == [None], f"Unexpected range requests: {ranges}"
+
+
+@mark.httpx_utils
+def test_json_dumps_backends():
+    from dataclasses import dataclass
+    from datetime import datetime, timezone
+    from decimal import Decimal
+    from uuid import UUID
+
+    import pendulum
+
+    @dataclass
+    class _Event:
+        id: UUID
+        ts: datetime
+
+    payload = {
+        "event": _Event(id=UUID(int=1), ts=datetime(2024, 1, 1, tzinfo=timezone.utc)),
+        "local": pendulum.datetime(2024, 1, 1, 12),
+        "amount": Decimal("1.10"),
+    }
+
+    encoded: bytes = httpx_utils.json_dumps(payload)
+    assert encoded == httpx_utils.json_dumps(
+        payload, backend="json"
+    ), "JSON backends produced different output"
+    assert httpx_utils.json_loads(encoded) == {
+        "event": {
+            "id": "00000000-0000-0000-0000-000000000001",
+            "ts": "2024-01-01T00:00:00+00:00",
+        },
+        "local": "2024-01-01T12:00:00+00:00",
+        "amount": "1.10",
+    }
+
+    req: httpx.Request = httpx_utils.build_request(
+        method="POST", url="https://example.com/", json=payload
+    )
+    assert req.content == encoded
+    assert req.headers["Content-Type"] == "application/json"
+
+    ## Payloads the stdlib encoder accepts, orjson natively doesn't
+    for value in ({1: "a", 2.5: "b", None: "c"}, {"x": 2**70}):
+        encoded = httpx_utils.json_dumps(value)
+        assert encoded == httpx_utils.json_dumps(value, backend="json")
+        assert (
+            httpx_utils.build_request(
+                method="POST", url="https://example.com/", json=value
+            ).content
+            == encoded
+        )
+
+    assert httpx_utils.json_loads(httpx_utils.json_dumps({"x": 2**70})) == {"x": 2**70}
+    assert httpx_utils.json_dumps({"x": float("nan")}, backend="json") == b'{"x":NaN}'
+    if httpx_utils.encoders.json_encoders.JSON_BACKEND == "orjson":
+        assert httpx_utils.json_dumps({"x": float("nan")}) == b'{"x":null}'
+
+    with raises(TypeError):
+        httpx_utils.json_dumps({(1, 2): "a"})
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timezone
+import logging
+from pathlib import Path
+import sys
+from uuid import UUID, uuid4
+from zoneinfo import ZoneInfo
+
+from red_utils.core.dataclass_utils.mixins import DictMixin
+from red_utils.ext import msgpack_utils
+
+import msgpack
+import pendulum
+from pytest import LogCaptureFixture, MonkeyPatch, mark, raises
+
+
+@msgpack_utils.register_dataclass
+@dataclass
+class ExtInner(DictMixin):
+    when: datetime = None
+    path: Path = None
+
+
+@msgpack_utils.register_dataclass
+@dataclass
+class ExtOuter(DictMixin):
+    name: str = None
+    inner: ExtInner = None
+    ids: list[UUID] = field(default_factory=list)
+
+
+@mark.msgpack_utils
+def test_stream_records(tmp_path: Path, caplog: LogCaptureFixture):
+    path: Path = tmp_path / "dumps" / "records.msgpack"
+    records: list[dict] = [
+        {"id": i, "name": f"record-{i}", "blob": b"\x00" * i, "tags": ["a", "b"]}
+        for i in range(1000)
+    ]
+
+    assert msgpack_utils.write_msgpack_records((r for r in records[:600]), path) == 600
+
+    with msgpack_utils.MsgpackRecordWriter(path, append=True) as writer:
+        for record in records[600:]:
+            writer.write(record)
+
+    assert writer.count == 400
+
+    ## A small read size forces many refills of the Unpacker's buffer
+    reader = msgpack_utils.iter_msgpack_records(path, read_size=256)
+    assert next(reader) == records[0]
+    assert list(reader) == records[1:]
+
+    with open(path, "ab") as outfile:
+        outfile.write(b"\x84\xa2id")
+
+    with caplog.at_level(logging.WARNING):
+        assert len(list(msgpack_utils.iter_msgpack_records(path))) == 1000
+
+    assert "truncated record" in caplog.text
+
+
+@mark.msgpack_utils
+def test_load_mmap(tmp_path: Path):
+    snapshot: dict = {"rows": [{"id": i, "blob": b"\x01" * 64} for i in range(100)]}
+    path: Path = tmp_path / "snapshot.msgpack"
+    path.write_bytes(msgpack_utils.msgpack_packb(snapshot))
+
+    assert msgpack_utils.msgpack_load_mmap(path) == snapshot
+
+    as_tuples = msgpack_utils.msgpack_load_mmap(path, use_list=False)
+    assert isinstance(as_tuples["rows"], tuple)
+
+    raw = msgpack_utils.msgpack_load_mmap(path, raw=True)
+    assert b"rows" in raw
+
+    res = msgpack_utils.msgpack_deserialize_file(str(path), use_mmap=True)
+    assert res.success and res.detail == snapshot
+
+    (tmp_path / "empty.msgpack").touch()
+    assert not msgpack_utils.msgpack_deserialize_file(
+        str(tmp_path / "empty.msgpack"), use_mmap=True
+    ).success
+
+
+@mark.msgpack_utils
+def test_record_store_random_access_and_recovery(tmp_path: Path):
+    path: Path = tmp_path / "store" / "events.msgpack"
+
+    with msgpack_utils.MsgpackRecordStore(path, key="id") as store:
+        assert store.extend({"id": f"event-{i}", "value": i} for i in range(50)) == 50
+        assert store.append({"id": "event-0", "value": "updated"}) == 50
+
+        assert store[10] == {"id": "event-10", "value": 10}
+        assert store[-1]["value"] == "updated"
+        assert store.get_by_key("event-0")["value"] == "updated"
+        assert store.get_by_key("missing") is None
+
+    ## A crashed writer: a record without index entries, then a torn record
+    with open(path, "ab") as outfile:
+        outfile.write(msgpack_utils.msgpack_packb({"id": "unindexed", "value": -1}))
+        outfile.write(b"\x82\xa2id")
+
+    with msgpack_utils.MsgpackRecordStore(path, key="id") as store:
+        assert len(store) == 52
+        assert store.get_by_key("unindexed")["value"] == -1
+        assert store.append({"id": "after-crash", "value": 52}) == 52
+
+    assert len(list(msgpack_utils.iter_msgpack_records(path))) == 53
+
+    Path(f"{path}.idx").unlink()
+    Path(f"{path}.keys").unlink()
+
+    with msgpack_utils.MsgpackRecordStore(path, key="id", readonly=True) as store:
+        assert len(store) == 53
+        assert store.get_by_key("after-crash")["value"] == 52
+        assert [record["value"] for record in store][:3] == [0, 1, 2]
+
+
+@mark.msgpack_utils
+def test_ext_types_round_trip(tmp_path: Path):
+    values: dict = {
+        "naive": datetime(2024, 1, 1, 12, 0, 0, 123456),
+        "utc": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        ## Second 01:30 of the DST fall-back
+        "zoned": datetime(
+            2024, 11, 3, 1, 30, fold=1, tzinfo=ZoneInfo("America/New_York")
+        ),
+        "pendulum": pendulum.datetime(2024, 6, 1, 9, tz="Europe/Paris"),
+        "date": date(2024, 2, 29),
+        "time": time(1, 2, 3, 4),
+        "uuid": uuid4(),
+        "path": Path("/tmp/a b"),
+        "outer": ExtOuter(
+            name="outer",
+            inner=ExtInner(when=datetime(2024, 1, 1), path=Path("x")),
+            ids=[uuid4(), uuid4()],
+        ),
+    }
+
+    unpacked: dict = msgpack_utils.msgpack_unpackb(msgpack_utils.msgpack_packb(values))
+
+    assert unpacked == values
+    assert {k: type(v) for k, v in unpacked.items()} == {
+        k: type(v) for k, v in values.items()
+    }
+    assert unpacked["zoned"].tzinfo.key == "America/New_York"
+    assert unpacked["zoned"].fold == 1
+    assert unpacked["pendulum"].timezone_name == "Europe/Paris"
+
+    ## Typed values round-trip through record files too
+    path: Path = tmp_path / "typed.msgpack"
+    msgpack_utils.write_msgpack_records([values["outer"]] * 3, path)
+    assert list(msgpack_utils.iter_msgpack_records(path)) == [values["outer"]] * 3
+
+    with raises(TypeError):
+        msgpack_utils.msgpack_packb({"value": object()})
+
+
+@mark.msgpack_utils
+def test_ext_types_refuse_unregistered_dataclasses(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+):
+    @dataclass
+    class Unregistered(DictMixin):
+        name: str = None
+
+    with raises(TypeError):
+        msgpack_utils.msgpack_packb(Unregistered(name="x"))
+
+    ## A payload naming an importable module must not import it
+    (tmp_path / "ext_side_effect.py").write_text(
+        "from dataclasses import dataclass\n"
+        "from red_utils.core.dataclass_utils.mixins import DictMixin\n"
+        "IMPORTED = True\n"
+        "@dataclass\n"
+        "class Payload(DictMixin):\n"
+        "    name: str = None\n"
+    )
+    monkeypatch.syspath_prepend(tmp_path)
+
+    packed: bytes = msgpack.packb(
+        msgpack.ExtType(
+            msgpack_utils.ext_types.EXT_DICTMIXIN,
+            msgpack.packb(["ext_side_effect:Payload", {"name": "x"}]),
+        )
+    )
+
+    with raises(TypeError):
+        msgpack_utils.msgpack_unpackb(packed)
+
+    assert "ext_side_effect" not in sys.modules
+    assert msgpack_utils.msgpack_deserialize(packed)["success"] is False
+    assert "ext_side_effect" not in sys.modules
+
+
+@mark.msgpack_utils
+def test_ext_types_subclass_resolution():
+    class Base:
+        pass
+
+    class Child(Base):
+        pass
+
+    registry = msgpack_utils.ExtTypeRegistry()
+    registry.register(10, Base, lambda v: b"base", lambda b: Base())
+
+    assert registry.default(Child()).code == 10
+
+    ## A nearer registration replaces the encoder Child already resolved to
+    registry.register(11, Child, lambda v: b"child", lambda b: Child())
+    assert registry.default(Child()).code == 11
+    assert registry.default(Base()).code == 10
+
+
+@mark.msgpack_utils
+def test_serialize_many():
+    objs: list = [
+        {"id": i, "when": datetime(2024, 1, 1, tzinfo=timezone.utc), "blob": b"\x01"}
+        for i in range(250)
+    ] + [ExtOuter(name="outer", inner=ExtInner(path=Path("x")))]
+
+    packed: list[bytes] = msgpack_utils.serialize_many(o for o in objs)
+
+    assert packed == [msgpack_utils.msgpack_packb(o) for o in objs]
+    assert msgpack_utils.deserialize_many(packed) == objs
+
+    ## Chunks of 100 across 2 processes come back in input order
+    assert msgpack_utils.serialize_many(objs, workers=2, chunk_size=100) == packed
+    assert (
+        msgpack_utils.deserialize_many(
+            [memoryview(p) for p in packed], workers=2, chunk_size=100
+        )
+        == objs
+    )
+
+    with raises(TypeError):
+        msgpack_utils.serialize_many([{"id": 1}, object()])
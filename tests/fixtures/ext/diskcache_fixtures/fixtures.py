@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from pathlib import Path
+import typing as t
+
+from red_utils.ext import diskcache_utils
+
+from pytest import fixture
+
+
+@fixture
+def diskcache_controller(
+    tmp_path: Path,
+) -> t.Generator[diskcache_utils.DiskCacheController, None, None]:
+    """An open `DiskCacheController`, backed by a cache in a temporary directory."""
+    with diskcache_utils.DiskCacheController(
+        cache_directory=tmp_path / "diskcache"
+    ) as ctl:
+        yield ctl
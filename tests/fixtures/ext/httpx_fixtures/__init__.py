@@ -1,3 +1,3 @@
 from __future__ import annotations
 
-from .fixtures import httpx_tmp_cache
+from .fixtures import httpx_echo_transport, httpx_tmp_cache
@@ -4,6 +4,8 @@ from pathlib import Path
 
 from red_utils.ext import httpx_utils
 
+import httpx
+
 from pytest import fixture
 
 
@@ -34,3 +36,15 @@ def httpx_tmp_cache(
             raise exc
 
     return CACHE_DIR
+
+
+@fixture
+def httpx_echo_transport() -> httpx.MockTransport:
+    """A mock transport that echoes the request's method & path back as JSON."""
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200, json={"method": request.method, "path": request.url.path}
+        )
+
+    return httpx.MockTransport(_handler)
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import hashlib
+from pathlib import Path
+
 from red_utils.std import hash_utils
 
 from pytest import mark, xfail
@@ -20,3 +23,14 @@ def test_hash_str(str_to_hash: str):
     assert isinstance(
         hashed, str
     ), f"Hashed string must be of type str, not ({type(hashed)})"
+
+
+@mark.hash_utils
+def test_hash_file(tmp_path: Path, str_to_hash: str):
+    filepath: Path = tmp_path / "hash_me.txt"
+    filepath.write_text(str_to_hash)
+
+    hashed = hash_utils.get_hash_from_file(filepath=filepath, chunk_size=8)
+    assert (
+        hashed == hashlib.sha256(str_to_hash.encode()).hexdigest()
+    ), f"Unexpected file hash: {hashed}"
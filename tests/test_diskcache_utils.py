@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from .ext_tests.diskcache_util_tests.expect_pass_tests import (
+    test_async_controller,
+    test_batch_operations,
+    test_cache_instrumentation_snapshot,
+    test_cached_decorator_stampede_lock,
+    test_fanout_controller,
+    test_get_many_reads_without_write_lock,
+    test_l1_tier_invalidation,
+    test_msgpack_disks_round_trip,
+    test_tag_groups_and_sweeper,
+)
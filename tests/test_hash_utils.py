@@ -5,6 +5,7 @@ from .std_tests.hash_util_tests.expect_fail_tests import (
     test_fail_str_to_hash,
 )
 from .std_tests.hash_util_tests.expect_pass_tests import (
+    test_hash_file,
     test_hash_str,
     test_validate_hash_str,
 )
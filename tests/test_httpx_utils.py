@@ -1,3 +1,19 @@
 from __future__ import annotations
 
-# from .ext_tests.httpx_util_tests.expect_pass_tests import test_httpx_tmpdir
+from .ext_tests.httpx_util_tests.expect_pass_tests import (
+    test_async_controller_gather_requests,
+    test_client_registry_keeps_transport_open,
+    test_controller_applies_pool_limits,
+    test_decode_res_content_strategies,
+    test_diskcache_storage_serves_cached_responses,
+    test_download_discards_unverifiable_partials,
+    test_download_resumes_and_splits_ranges,
+    test_paginate_strategies,
+    test_stream_decoders,
+    test_httpx_tmpdir,
+    test_json_dumps_backends,
+    test_rate_limiter_shared_bucket,
+    test_retry_transport_and_circuit_breaker,
+    test_singleflight_coalesces_requests,
+    test_singleflight_streams_uncoalesced_requests,
+)
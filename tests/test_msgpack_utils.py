@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from .ext_tests.msgpack_util_tests.expect_pass_tests import (
+    test_ext_types_refuse_unregistered_dataclasses,
+    test_ext_types_round_trip,
+    test_ext_types_subclass_resolution,
+    test_load_mmap,
+    test_record_store_random_access_and_recovery,
+    test_serialize_many,
+    test_stream_records,
+)